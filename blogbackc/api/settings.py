@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',  # revoked refresh tokens; see blogc/revocation.py
     'corsheaders',
     'storages',
 
@@ -54,6 +55,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Dev only: log requests that run more SQL queries than their view's
+# @query_budget, with the offending SQL (see blogc/query_budget.py)
+if DEBUG and config('QUERY_BUDGET_MIDDLEWARE', default=False, cast=bool):
+    MIDDLEWARE.append('blogc.query_budget.QueryBudgetMiddleware')
+
+# Username or email login with one indexed lookup; see blogc/backends.py
+AUTHENTICATION_BACKENDS = ['blogc.backends.IdentifierBackend']
+
 ROOT_URLCONF = 'api.urls'
 
 TEMPLATES = [
@@ -214,7 +223,8 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 # ==================== DRF + JWT ==================== #
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication, answering from token claims; see blogc/authentication.py
+        'blogc.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ),
@@ -224,7 +234,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer's output via orjson when installed; see blogc/renderers.py
+        'blogc.renderers.FastJSONRenderer',
     ),
 }
 
@@ -237,6 +248,7 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_USER_CLASS': 'blogc.authentication.ClaimsUser',
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -292,20 +304,37 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 
-# Cache settings (simple in-memory cache for development)
-if DEBUG:
+# Cache settings
+# Every worker process shares one cache so response-cache invalidations
+# (blogc/cache.py) are seen by all of them. By default that is a SQLite
+# file in WAL mode next to the project; set REDIS_URL to use a Redis
+# server instead (needs the `redis` package). DEBUG runs (the dev server,
+# the test suite) get a private in-memory cache unless CACHE_LOCATION or
+# REDIS_URL is set, so they never share entries with another checkout.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG and not CACHE_LOCATION:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': 'unique-snowflake',
         }
     }
 else:
-    # For production, you might want to use Redis or Memcached
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': 'unique-snowflake',
+            'BACKEND': 'blogc.cache_backends.SQLiteCache',
+            'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache.sqlite3'),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+                'CULL_FREQUENCY': 4,
+            },
         }
     }
 
@@ -313,5 +342,39 @@ else:
 BLOGC_SETTINGS = {
     'MAX_POSTS_PER_PAGE': 12,
     'MAX_COMMENTS_PER_POST': 100,
+    'COMMENTS_PER_PAGE': 20,  # first page embedded in post detail, and the comments endpoint's default
     'ALLOW_ANONYMOUS_COMMENTS': False,
+    'RESPONSE_CACHE_TIMEOUT': 300,  # seconds; see blogc/cache.py
+    'IMAGE_VARIANTS_ASYNC': True,  # resize uploads on a worker thread; see blogc/images.py
+    'IMAGE_WORKERS': 2,
+    # Spool post-create uploads to disk and push them to storage in the
+    # background; see blogc/uploads.py. Opt in with ASYNC_UPLOADS=True
+    'ASYNC_UPLOADS': config('ASYNC_UPLOADS', default=False, cast=bool),
+    'UPLOAD_SPOOL_DIR': config('UPLOAD_SPOOL_DIR', default=os.path.join(BASE_DIR, 'upload_spool')),
+    'UPLOAD_WORKERS': 2,  # 0 = upload inline once the transaction commits
+    'UPLOAD_RETRIES': 3,
+    # Buffer like toggles in memory and write them in batches; see blogc/likes.py
+    'LIKE_BUFFER': config('LIKE_BUFFER', default=False, cast=bool),
+    'LIKE_FLUSH_INTERVAL': 1.0,  # seconds
+    'LIKE_BATCH_SIZE': 500,
+    # Login/register password hashing pool; see blogc/hashing.py
+    'HASH_WORKERS': 2,  # 0 = no pool: hash via sync_to_async like a sync view
+    'HASH_QUEUE_LIMIT': 64,  # waiting beyond this gets a 503
+    # Build request.user from JWT claims instead of loading it; see blogc/authentication.py
+    'JWT_CLAIMS_USER': True,
+    'AUTH_VERSION_TTL': 30,  # seconds a process may trust its cached auth_version
+    # Refresh-token blacklist filter; see blogc/revocation.py
+    'BLACKLIST_SYNC_INTERVAL': 5,  # seconds between reads of new blacklist rows
+    'BLACKLIST_SYNC_MARGIN': 60,  # seconds a revoking transaction may take to commit; see blogc/revocation.py
+    'BLACKLIST_REBUILD_INTERVAL': 3600,
+    'BLACKLIST_PRUNE_INTERVAL': 6 * 3600,  # 0 = leave it to flushexpiredtokens
+    'BLACKLIST_FILTER_CAPACITY': 100_000,
+    'BLACKLIST_FILTER_ERROR_RATE': 0.001,
+    # Rows serialized per chunk by ?stream= list responses; see blogc/streaming.py
+    'STREAM_CHUNK_SIZE': 500,
+    # Compiled values()-based serializers for list endpoints; see blogc/projections.py
+    'PROJECTION_SERIALIZERS': True,
+    # Post summaries stored by BlogPost.save(); see blogc/excerpts.py
+    'EXCERPT_LENGTH': 200,  # characters, at most 300
+    'WORDS_PER_MINUTE': 200,
 }
\ No newline at end of file
@@ -0,0 +1,161 @@
+# async_views.py
+"""
+Async versions of the hot read endpoints, mounted under /api/async/.
+
+Under ASGI a sync DRF view holds a thread for its whole request. These
+views are coroutines instead. Rows are fetched with the async ORM
+(aiterator / afirst), and the first comment page and viewer flags are
+loaded up front. The existing serializers then run on the event loop
+over objects that are already in memory; a lazy query slipping in would
+raise SynchronousOnlyOperation rather than block. Django's async ORM
+still runs each query through sync_to_async, so a request costs a thread
+hop per query instead of a thread for its lifetime, and one process can
+keep many slow clients open.
+
+Responses are the same JSON as the sync endpoints, and anonymous GETs
+share the response cache (cache.lookup_response). Conditional GET
+(ETag/304) is only on the sync endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.urls import reverse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import CATEGORIES, GLOBAL, lookup_response, store_response
+from .fieldsets import requested_fields, selected
+from .models import BlogCategory
+from .pagination import CommentCursorPagination, LatestPostsPagination, PostCursorPagination
+from .projections import get_projection, narrow
+from .query_budget import query_budget
+from .renderers import dumps
+from .serializers import BlogCategorySerializer, BlogPostDetailSerializer, BlogPostListSerializer, CommentSerializer
+from .viewer import aviewer_flags
+from .views import CategoryPostsView, CommentListCreateView, PostViewSet
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(dumps(data), status=status_code, content_type='application/json')
+
+
+async def authenticate(request):
+    """Resolve request.user, going to a thread only when there are credentials to check."""
+    django_request = request._request
+    if 'HTTP_AUTHORIZATION' in django_request.META or settings.SESSION_COOKIE_NAME in django_request.COOKIES:
+        await sync_to_async(lambda: request.user)()
+    else:
+        request.user = AnonymousUser()
+
+
+async def page_data(paginator, queryset, request, serializer_class=BlogPostListSerializer):
+    """The paginated response body; projections.serialize_page() for async views."""
+    fieldset = requested_fields(request, serializer_class)
+    projection = get_projection(serializer_class, fieldset)
+    if projection is not None:
+        queryset = projection.values(queryset)
+    else:
+        queryset = narrow(queryset, serializer_class, fieldset)
+    page = await paginator.apaginate_queryset(queryset, request)
+    context = {'request': request, 'fieldset': fieldset}
+    if serializer_class is BlogPostListSerializer and selected(fieldset, 'liked_by_me', 'my_comments_count'):
+        context['viewer_flags'] = await aviewer_flags(request.user, [row.id for row in page])
+    if projection is not None:
+        data = projection.serialize(page, context)
+    else:
+        data = serializer_class(page, many=True, context=context).data
+    return paginator.get_paginated_response(data).data
+
+
+class AsyncReadView(View):
+    http_method_names = ['get', 'options']
+    # cache.py scopes (formatted from the URL kwargs) for anonymous GETs; None = not cached
+    cache_scopes = None
+
+    async def get(self, request, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            await authenticate(request)
+            if self.cache_scopes is None or request.user.is_authenticated:
+                return render(await self.read(request, **kwargs))
+
+            key, entry = await sync_to_async(lookup_response)(request, self.cache_scopes, kwargs)
+            if entry is not None:
+                status_code, data = entry
+                return render(data, status_code)
+            data = await self.read(request, **kwargs)
+            await sync_to_async(store_response)(key, status.HTTP_200_OK, data)
+            return render(data)
+        except APIException as exc:
+            # Same body as DRF's exception handler
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return render(detail, exc.status_code)
+
+    async def read(self, request, **kwargs):
+        """The response body."""
+        raise NotImplementedError
+
+    def post_view(self, request, action):
+        # For PostViewSet's search/ordering filters and querysets
+        return PostViewSet(request=request, action=action, kwargs=self.kwargs, format_kwarg=None)
+
+
+@query_budget(4)
+class AsyncPostListView(AsyncReadView):
+    cache_scopes = (GLOBAL,)
+
+    async def read(self, request):
+        return await page_data(PostCursorPagination(), self.post_view(request, 'list').list_queryset(), request)
+
+
+@query_budget(4)
+class AsyncLatestPostsView(AsyncReadView):
+    cache_scopes = (GLOBAL,)
+
+    async def read(self, request):
+        return await page_data(LatestPostsPagination(), self.post_view(request, 'latest').latest_queryset(), request)
+
+
+@query_budget(5)
+class AsyncPostDetailView(AsyncReadView):
+    cache_scopes = ('post:{pk}', CATEGORIES)
+
+    async def read(self, request, pk):
+        fieldset = requested_fields(request, BlogPostDetailSerializer)
+        post = await narrow(PostViewSet.queryset.filter(pk=pk), BlogPostDetailSerializer, fieldset).afirst()
+        if post is None:
+            raise NotFound('No BlogPost matches the given query.')
+        context = {'request': request, 'fieldset': fieldset}
+        if selected(fieldset, 'comments'):
+            comments = context['comments_paginator'] = CommentCursorPagination()
+            await comments.afirst_page(CommentListCreateView.post_comments(pk), request,
+                                       reverse('post-comments', args=[pk]))
+        if selected(fieldset, 'liked_by_me', 'my_comments_count'):
+            context['viewer_flags'] = await aviewer_flags(request.user, [post.pk])
+        return BlogPostDetailSerializer(post, context=context).data
+
+
+@query_budget(2)
+class AsyncCategoryListView(AsyncReadView):
+    cache_scopes = (CATEGORIES,)
+
+    async def read(self, request):
+        categories = [category async for category in BlogCategory.objects.all().aiterator()]
+        return BlogCategorySerializer(categories, many=True).data
+
+
+@query_budget(4)
+class AsyncCategoryPostsView(AsyncReadView):
+    async def read(self, request, pk):
+        return await page_data(PostCursorPagination(), CategoryPostsView.category_posts(pk), request)
+
+
+@query_budget(2)
+class AsyncCommentListView(AsyncReadView):
+    async def read(self, request, post_id):
+        return await page_data(CommentCursorPagination(), CommentListCreateView.post_comments(post_id), request,
+                               CommentSerializer)
@@ -0,0 +1,130 @@
+# authentication.py
+"""
+JWT authentication that doesn't load the user.
+
+Tokens issued by MyTokenObtainPairSerializer (and re-issued on refresh)
+carry the profile's role, is_blog_admin and auth_version as claims.
+ClaimsJWTAuthentication turns such a token into a ClaimsUser built from
+those claims, so IsBlogAdmin, IsAuthorOrReadOnly and friends are
+answered without touching auth_user or blogc_userprofile.
+
+Role changes: saving a UserProfile with a new role or admin flag bumps
+its auth_version (see signals.py), and a token whose "ver" claim doesn't
+match is refused, so the client refreshes or signs in again. Each
+process caches the current version per user for AUTH_VERSION_TTL
+seconds; that is how long another process may keep honouring an old
+token. revoke_tokens() bumps the version explicitly, e.g. after a
+queryset update() that skipped the signals.
+
+Tokens without the claims (issued before this module) and
+BLOGC_SETTINGS['JWT_CLAIMS_USER'] = False fall back to simplejwt's usual
+database lookup.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserProfile
+
+ROLE_CLAIM = 'role'
+ADMIN_CLAIM = 'is_blog_admin'
+VERSION_CLAIM = 'ver'
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def add_claims(token, user):
+    """Stamp the user's profile onto a token (refresh or access)."""
+    profile = getattr(user, 'profile', None)
+    token['username'] = user.get_username()
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token[ROLE_CLAIM] = profile.role if profile else 'user'
+    token[ADMIN_CLAIM] = bool(profile and profile.is_blog_admin)
+    token[VERSION_CLAIM] = profile.auth_version if profile else 0
+    return token
+
+
+class ClaimsProfile:
+    """Stands in for UserProfile on a ClaimsUser."""
+
+    def __init__(self, role, is_blog_admin):
+        self.role = role
+        self.is_blog_admin = is_blog_admin
+
+
+class ClaimsUser(TokenUser):
+    """request.user for a claims-bearing token; see TokenUser."""
+
+    @cached_property
+    def id(self):
+        # simplejwt writes the claim as a string
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def profile(self):
+        return ClaimsProfile(self.token.get(ROLE_CLAIM, 'user'), bool(self.token.get(ADMIN_CLAIM)))
+
+
+class AuthVersions:
+    """user_id -> current auth_version (None if the user is gone or inactive), cached briefly."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        rows = list(
+            get_user_model().objects.filter(pk=user_id, is_active=True)
+            .values_list('profile__auth_version', flat=True)
+        )
+        # No profile yet: tokens for it were stamped with version 0
+        version = (rows[0] or 0) if rows else None
+        with self._lock:
+            self._entries[user_id] = (version, now + _setting('AUTH_VERSION_TTL', 30))
+        return version
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+versions = AuthVersions()
+
+
+def revoke_tokens(user_id):
+    """Invalidate every claims token issued to a user so far."""
+    UserProfile.objects.filter(user_id=user_id).update(auth_version=F('auth_version') + 1)
+    versions.forget(user_id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not _setting('JWT_CLAIMS_USER', True) or VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        current = versions.get(user.id)
+        if current is None:
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+        if current != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed('Token is out of date, please sign in again', code='token_stale')
+        return user
@@ -1,17 +1,50 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 UserModel = get_user_model()
 
-class EmailBackend(ModelBackend):
-    def authenticate(self, request, email=None, password=None, **kwargs):
-        if email is None or password is None:
+
+class IdentifierBackend(ModelBackend):
+    """
+    Log in with a username or an email address in a single lookup.
+
+    The identifier is classified once: anything with an "@" is matched
+    against lower(email) (indexed by migration 0012) and, since Django
+    usernames may contain "@", against username in the same query.
+    Every attempt costs exactly one password hash: the user's, or a
+    dummy one when nobody matches, so timing doesn't reveal which
+    accounts exist.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        identifier = email or username or kwargs.get(UserModel.USERNAME_FIELD)
+        if not identifier or password is None:
             return None
-        try:
-            user = UserModel.objects.get(email=email)
-        except UserModel.DoesNotExist:
+
+        user = self.find_user(identifier)
+        if user is None:
+            # Nobody, or an email shared by several accounts: same cost as a
+            # real check (see ModelBackend.authenticate)
+            UserModel().set_password(password)
             return None
-        else:
-            if user.check_password(password) and self.user_can_authenticate(user):
-                return user
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
         return None
+
+    def find_user(self, identifier):
+        if '@' not in identifier:
+            return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: identifier}).first()
+
+        matches = list(
+            UserModel._default_manager
+            .alias(email_lower=Lower('email'))
+            .filter(Q(email_lower=identifier.lower()) | Q(**{UserModel.USERNAME_FIELD: identifier}))[:3]
+        )
+        for user in matches:
+            if user.get_username() == identifier:
+                return user
+        # email isn't unique on auth_user: refuse to guess between accounts
+        # (authenticate() still runs the dummy hash for None)
+        return matches[0] if len(matches) == 1 else None
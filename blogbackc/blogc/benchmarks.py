@@ -0,0 +1,56 @@
+# benchmarks.py
+"""Helpers shared by the bench_* management commands."""
+import asyncio
+
+from .metrics import percentile, summarize  # noqa: F401  (re-exported for the commands)
+
+
+def format_table(rows, columns):
+    """Render a list of dicts as a fixed-width text table."""
+    widths = {c: max(len(c), *(len(str(row.get(c, ''))) for row in rows)) for c in columns}
+    lines = ['  '.join(c.ljust(widths[c]) for c in columns)]
+    lines.append('  '.join('-' * widths[c] for c in columns))
+    for row in rows:
+        lines.append('  '.join(str(row.get(c, '')).ljust(widths[c]) for c in columns))
+    return '\n'.join(lines)
+
+
+async def asgi_request(app, host, method, url, body=b'', headers=(), client_delay=0.0):
+    """
+    Send one request straight to an ASGI application; returns the status code.
+
+    client_delay stands in for a slow client: each response message takes
+    that long to "send".
+    """
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '', 'client': ('127.0.0.1', 0), 'server': (host, 80),
+        'headers': [
+            (b'host', host.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+    }
+    sent = False
+    status = None
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Django listens for a disconnect until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif client_delay:
+            await asyncio.sleep(client_delay)
+
+    await app(scope, receive, send)
+    return status
@@ -0,0 +1,340 @@
+# benchsuite.py
+"""
+Endpoint latency suite behind `manage.py bench_endpoints`.
+
+seed_dataset() fills an empty database with a deterministic blog: the
+same seed and size always give the same users, posts (titles, content,
+timestamps, categories, published flags), comments and likes, inserted
+in the same order, so ids match across runs too. run_suite() then sends
+every ENDPOINTS entry through the test client and records, per endpoint:
+
+    p50_ms / p95_ms / p99_ms / mean_ms   over the timed requests
+    queries                              on one untimed request
+    bytes                                response body size
+    status                               of the last request
+
+Each endpoint gets one untimed warm-up request, then one more untimed
+request to count queries, then the timed requests. Endpoints that take
+an id cycle through a fixed sample of posts, categories or comments
+rather than hitting one row. Writes (likes, comments, new posts,
+logins, sign-ups) run after the reads so they don't change what the
+reads return.
+
+Every named route in blogc.urls needs an ENDPOINTS entry or a SKIPPED
+reason; uncovered_routes() lists the ones that have neither, and
+EndpointBenchTests fails on any.
+
+compare_results() checks a run against a saved baseline. A
+regression is:
+- p50 or p95 slower by more than `threshold` (a fraction) and by more
+  than min_delta_ms;
+- any extra query;
+- a response body more than `threshold` larger.
+Latencies only compare between runs on the same machine. Query counts
+and sizes compare anywhere.
+"""
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .counters import rebuild_category_stats, rebuild_post_counters
+from .excerpts import summarize as summarize_content
+from .metrics import summarize
+from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
+from .query_budget import QueryCounter, iter_endpoints
+from .search import get_search_backend
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+PASSWORD = 'bench-password'
+BASE_TIME = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+CATEGORIES = 10
+BATCH_SIZE = 5000
+SAMPLE_SIZE = 100  # ids cycled through by endpoints that take one
+# Only in the title of every RARE_EVERY-th post. Posts are drawn from WORDS, so
+# searching any of those matches nearly every post, which no real search does.
+RARE_WORD = 'zeppelin'
+RARE_EVERY = 100
+
+WORDS = (
+    'python django query index cache latency page cursor token stream async thread database '
+    'travel coffee mountain river city garden kitchen music story winter summer morning night '
+    'simple quick careful honest bright quiet heavy early local open final small common'
+).split()
+
+
+def parse_scale(value):
+    """Number of posts for '1k', '10k', '100k' or a plain number."""
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+class Dataset:
+    """What seed_dataset() created, for building request URLs and bodies."""
+
+    def __init__(self, posts, admin, reader, post_ids, category_ids, comment_ids):
+        self.posts = posts
+        self.admin = admin
+        self.reader = reader
+        self.post_ids = post_ids
+        self.category_ids = category_ids
+        self.comment_ids = comment_ids
+
+
+def _batches(objects, size=BATCH_SIZE):
+    objects = iter(objects)
+    while batch := list(itertools.islice(objects, size)):
+        yield batch
+
+
+def _insert(model, objects):
+    for batch in _batches(objects):
+        model.objects.bulk_create(batch)
+
+
+def _text(rnd, low, high):
+    return ' '.join(rnd.choices(WORDS, k=rnd.randint(low, high)))
+
+
+def seed_dataset(posts, seed=0):
+    """
+    Fill the (empty) database with `posts` posts, users, comments and likes.
+    bulk_create skips save() and the signals, so the derived columns, the
+    counters, the category stats and the search index are filled in here.
+    """
+    rnd = random.Random(seed)
+    n_users = max(10, posts // 50)
+
+    _insert(User, (User(username=f'user{i}', email=f'user{i}@bench.test', password='!',
+                        date_joined=BASE_TIME) for i in range(n_users)))
+    user_ids = list(User.objects.filter(email__endswith='@bench.test').order_by('id').values_list('id', flat=True))
+    # The first user is the admin
+    _insert(UserProfile, (UserProfile(user_id=pk, role='admin' if pk == user_ids[0] else 'user',
+                                      is_blog_admin=pk == user_ids[0]) for pk in user_ids))
+    admin = User.objects.get(pk=user_ids[0])
+    admin.set_password(PASSWORD)
+    admin.save(update_fields=['password'])
+    reader = User.objects.get(pk=user_ids[1])
+
+    _insert(BlogCategory, (BlogCategory(name=f'Category {i}', slug=f'category-{i}') for i in range(CATEGORIES)))
+    category_ids = list(BlogCategory.objects.filter(slug__startswith='category-').order_by('id')
+                        .values_list('id', flat=True))
+
+    def make_posts():
+        for i in range(posts):
+            content = '\n'.join(f'<p>{_text(rnd, 20, 80)}</p>' for _ in range(rnd.randint(1, 5)))
+            title = _text(rnd, 2, 6).capitalize() + (f' {RARE_WORD}' if i % RARE_EVERY == 0 else '')
+            yield BlogPost(
+                title=f'{title} {i}', slug=f'post-{i}', content=content,
+                author_id=rnd.choice(user_ids),
+                category_id=None if rnd.random() < 0.02 else category_ids[i % CATEGORIES],
+                published=rnd.random() < 0.9, created_at=BASE_TIME + timedelta(minutes=i),
+                **summarize_content(content),
+            )
+    _insert(BlogPost, make_posts())
+    post_rows = list(BlogPost.objects.order_by('id').values_list('id', 'created_at'))
+
+    def make_comments():
+        for post_id, created_at in post_rows:
+            for j in range(rnd.randint(0, 6)):
+                yield Comment(post_id=post_id, user_id=rnd.choice(user_ids), body=_text(rnd, 3, 30),
+                              active=rnd.random() < 0.95, created_at=created_at + timedelta(seconds=j + 1))
+    _insert(Comment, make_comments())
+
+    def make_likes():
+        for post_id, created_at in post_rows:
+            for user_id in rnd.sample(user_ids, rnd.randint(0, min(10, n_users))):
+                yield Like(post_id=post_id, user_id=user_id, created_at=created_at)
+    _insert(Like, make_likes())
+
+    rebuild_post_counters()
+    rebuild_category_stats()
+    backend = get_search_backend()
+    if backend is not None:
+        backend.rebuild()
+
+    published = list(BlogPost.objects.filter(published=True).order_by('id').values_list('id', flat=True))
+    comment_ids = list(Comment.objects.filter(active=True).order_by('id').values_list('id', flat=True))
+    return Dataset(
+        posts=posts, admin=admin, reader=reader,
+        post_ids=rnd.sample(published, min(SAMPLE_SIZE, len(published))),
+        category_ids=category_ids,
+        comment_ids=rnd.sample(comment_ids, min(SAMPLE_SIZE, len(comment_ids))),
+    )
+
+
+# Builders for an endpoint's URL kwargs and request body: function(dataset, i)
+def post_pk(dataset, i):
+    return {'pk': dataset.post_ids[i % len(dataset.post_ids)]}
+
+
+def post_id(dataset, i):
+    return {'post_id': dataset.post_ids[i % len(dataset.post_ids)]}
+
+
+def category_pk(dataset, i):
+    return {'pk': dataset.category_ids[i % len(dataset.category_ids)]}
+
+
+def comment_pk(dataset, i):
+    return {'pk': dataset.comment_ids[i % len(dataset.comment_ids)]}
+
+
+class Endpoint:
+    """One request shape: a url name from blogc.urls plus method, user, kwargs, query and body."""
+
+    def __init__(self, name, method='GET', user=None, kwargs=None, query='', body=None,
+                 expect=(200,), max_requests=None):
+        self.name = name
+        self.method = method
+        self.user = user  # None, 'reader' or 'admin'
+        self.kwargs = kwargs
+        self.query = query
+        self.body = body
+        self.expect = expect
+        self.max_requests = max_requests
+        self.label = ' '.join(filter(None, (method, name, query, f'as {user}' if user else '')))
+
+    def request(self, dataset, i):
+        url = reverse(self.name, kwargs=self.kwargs(dataset, i) if self.kwargs else None) + self.query
+        return url, self.body(dataset, i) if self.body else None
+
+
+def _new_post(dataset, i):
+    return {'title': f'Bench post {i}', 'content': f'<p>{" ".join(WORDS)}</p>',
+            'category_id': dataset.category_ids[i % len(dataset.category_ids)]}
+
+
+def _refresh(dataset, i):
+    from .views import MyTokenObtainPairSerializer
+    # Refresh tokens rotate and are blacklisted after use, so a fresh one per request
+    return {'refresh': str(MyTokenObtainPairSerializer.get_token(dataset.reader))}
+
+
+ENDPOINTS = (
+    Endpoint('api-root'),
+    Endpoint('post-list'),
+    Endpoint('post-list', query='?fields=id,title,excerpt'),
+    Endpoint('post-list', query=f'?search={RARE_WORD}'),
+    Endpoint('post-list', user='reader'),
+    Endpoint('post-latest'),
+    Endpoint('post-my-posts', user='admin'),
+    Endpoint('post-detail', kwargs=post_pk),
+    Endpoint('post-detail', kwargs=post_pk, user='reader'),
+    Endpoint('post-comments', kwargs=post_id),
+    Endpoint('comment-detail', kwargs=comment_pk, user='reader'),
+    Endpoint('category-list'),
+    Endpoint('category-detail-public', kwargs=category_pk),
+    Endpoint('category-posts', kwargs=category_pk),
+    Endpoint('category-detail-admin', kwargs=category_pk, user='admin'),
+    Endpoint('async-post-list'),
+    Endpoint('async-post-latest'),
+    Endpoint('async-post-detail', kwargs=post_pk),
+    Endpoint('async-post-comments', kwargs=post_id),
+    Endpoint('async-category-list'),
+    Endpoint('async-category-posts', kwargs=category_pk),
+    Endpoint('debug-storage'),
+    # Streams every post
+    Endpoint('debug-images', max_requests=5),
+    Endpoint('debug-cache-stats', user='admin'),
+    Endpoint('debug-upload-stats', user='admin'),
+    Endpoint('debug-hashing-stats', user='admin'),
+    # Writes
+    Endpoint('post-like', 'POST', user='reader', kwargs=post_id, expect=(200, 201)),
+    Endpoint('post-comments', 'POST', user='reader', kwargs=post_id, body=lambda d, i: {'body': f'Comment {i}'},
+             expect=(201,)),
+    Endpoint('post-list', 'POST', user='admin', body=_new_post, expect=(201,)),
+    Endpoint('category-list', 'POST', user='admin', body=lambda d, i: {'name': f'Bench {i}', 'slug': f'bench-{i}'},
+             expect=(201,)),
+    Endpoint('token_refresh', 'POST', body=_refresh),
+    Endpoint('token_obtain_pair', 'POST', body=lambda d, i: {'username': d.admin.email, 'password': PASSWORD}),
+    Endpoint('auth-register', 'POST', body=lambda d, i: {
+        'username': f'signup{i}', 'email': f'signup{i}@bench.test', 'password': PASSWORD,
+    }, expect=(201,)),
+)
+
+# url name -> why it isn't benchmarked
+SKIPPED = {
+    's3-test': 'talks to S3',
+}
+
+
+def uncovered_routes():
+    """Named routes in blogc.urls with neither an ENDPOINTS entry nor a SKIPPED reason."""
+    covered = {endpoint.name for endpoint in ENDPOINTS} | set(SKIPPED)
+    return [name for name, view_func, route in iter_endpoints() if name not in covered]
+
+
+def _client_for(dataset, host):
+    from rest_framework.test import APIClient
+    from .views import MyTokenObtainPairSerializer
+
+    clients = {None: APIClient(SERVER_NAME=host)}
+    for role in ('reader', 'admin'):
+        token = MyTokenObtainPairSerializer.get_token(getattr(dataset, role)).access_token
+        clients[role] = APIClient(SERVER_NAME=host, HTTP_AUTHORIZATION=f'Bearer {token}')
+    return clients
+
+
+def _send(client, endpoint, dataset, i):
+    url, body = endpoint.request(dataset, i)
+    started = time.perf_counter()
+    response = getattr(client, endpoint.method.lower())(url, body, format='json' if body else None)
+    size = len(b''.join(response.streaming_content) if response.streaming else response.content)
+    return time.perf_counter() - started, response.status_code, size
+
+
+def run_endpoint(client, endpoint, dataset, requests):
+    """The result dict for one endpoint."""
+    counter = itertools.count()
+    _send(client, endpoint, dataset, next(counter))
+    with QueryCounter() as queries:
+        _, status, size = _send(client, endpoint, dataset, next(counter))
+    samples = []
+    for _ in range(min(requests, endpoint.max_requests or requests)):
+        elapsed, status, size = _send(client, endpoint, dataset, next(counter))
+        samples.append(elapsed)
+        if status not in endpoint.expect:
+            break
+    result = summarize(samples)
+    result.update(queries=len(queries), bytes=size, status=status, ok=status in endpoint.expect)
+    return result
+
+
+def run_suite(dataset, requests, host='localhost', endpoints=ENDPOINTS, progress=None):
+    """{endpoint label: result} for every endpoint, in order."""
+    clients = _client_for(dataset, host)
+    results = {}
+    for endpoint in endpoints:
+        results[endpoint.label] = run_endpoint(clients[endpoint.user], endpoint, dataset, requests)
+        if progress is not None:
+            progress(endpoint.label, results[endpoint.label])
+    return results
+
+
+def compare_results(baseline, current, threshold=0.2, min_delta_ms=2.0):
+    """
+    Regressions of `current` against `baseline`, as messages. Both are
+    {scale: {endpoint label: result}}; endpoints or scales missing from
+    either side are skipped.
+    """
+    regressions = []
+    for scale, endpoints in current.items():
+        for label, result in endpoints.items():
+            base = baseline.get(scale, {}).get(label)
+            if base is None:
+                continue
+            where = f'{scale} {label}'
+            for key in ('p50_ms', 'p95_ms'):
+                delta = result[key] - base[key]
+                if delta > min_delta_ms and result[key] > base[key] * (1 + threshold):
+                    regressions.append(f'{where}: {key} {base[key]} -> {result[key]}')
+            if result['queries'] > base['queries']:
+                regressions.append(f'{where}: queries {base["queries"]} -> {result["queries"]}')
+            if result['bytes'] > base['bytes'] * (1 + threshold):
+                regressions.append(f'{where}: bytes {base["bytes"]} -> {result["bytes"]}')
+    return regressions
@@ -0,0 +1,158 @@
+# cache.py
+"""
+Read-through response cache for the public post and category endpoints.
+
+Cached entries are never deleted. Instead every entry key embeds the
+current value of one or more generation counters ("scopes"), and a write
+bumps the counters it affects, so invalidation is a single incr no matter
+how many pages were cached. Scopes:
+
+    global          anything shown in post lists (posts, likes, comments)
+    post:<id>       one post, its comments and likes
+    category:<id>   one category and the posts filed under it
+    categories      category names (category list, embedded categories)
+
+Only anonymous GETs are cached; authenticated requests bypass the cache.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+KEY_PREFIX = 'blogc'
+GLOBAL = 'global'
+CATEGORIES = 'categories'
+STAT_NAMES = ('hits', 'misses', 'invalidations')
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def _generation_key(scope):
+    return f'{KEY_PREFIX}:gen:{scope}'
+
+
+def _stat_key(name):
+    return f'{KEY_PREFIX}:stats:{name}'
+
+
+def _incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def get_generations(scopes):
+    """Current generation of each scope, fetched in one round trip."""
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed from the clock rather than 0 so an evicted counter can
+            # never come back at a value an old entry was stored under.
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    _incr(_stat_key('invalidations'), len(scopes))
+
+
+def invalidate(*scopes):
+    """
+    Bump `scopes` now and again once the current transaction commits, so a
+    reader racing the transaction can't cache the pre-commit state.
+    """
+    scopes = [scope for scope in scopes if scope]
+    bump(*scopes)
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def invalidate_post(post_id, category_id=None):
+    invalidate(GLOBAL, post_scope(post_id), category_id and category_scope(category_id))
+
+
+def invalidate_category(category_id):
+    invalidate(GLOBAL, CATEGORIES, category_scope(category_id))
+
+
+def cache_stats():
+    values = cache.get_many([_stat_key(name) for name in STAT_NAMES])
+    stats = {name: values.get(_stat_key(name), 0) for name in STAT_NAMES}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+def request_key(kind, request, scopes, kwargs):
+    """
+    Cache key for what `request` gets under the current generations of
+    `scopes`, format strings filled from `kwargs`.
+    """
+    generations = get_generations([scope.format(**kwargs) for scope in scopes])
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"{KEY_PREFIX}:{kind}:{'.'.join(map(str, generations))}:{digest}"
+
+
+def lookup_response(request, scopes, kwargs):
+    """
+    (key, (status, data) or None) for an anonymous GET, counting the hit
+    or miss. `scopes` are format strings filled from `kwargs`.
+    """
+    key = request_key('resp', request, scopes, kwargs)
+    entry = cache.get(key)
+    _incr(_stat_key('hits' if entry is not None else 'misses'))
+    return key, entry
+
+
+def store_response(key, status_code, data):
+    if status_code == 200:
+        cache.set(key, (status_code, data), response_timeout())
+
+
+def response_timeout():
+    return settings.BLOGC_SETTINGS.get('RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def cached_response(*scopes):
+    """
+    Cache a view method's Response for anonymous GETs.
+
+    `scopes` are format strings filled from the URL kwargs, e.g.
+    @cached_response('post:{pk}', CATEGORIES).
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+
+            key, entry = lookup_response(request, scopes, kwargs)
+            if entry is not None:
+                status_code, data = entry
+                return Response(data, status=status_code)
+
+            response = view_method(self, request, *args, **kwargs)
+            store_response(key, response.status_code, response.data)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,226 @@
+# cache_backends.py
+"""
+SQLiteCache: a cache shared by every worker process on one machine.
+
+LocMemCache gives each gunicorn/uvicorn worker its own private cache, so
+a generation bump in one worker (see cache.py) is invisible to the rest.
+This backend keeps entries in a single SQLite file in WAL mode instead:
+readers never block the writer, writes are serialized by SQLite, and no
+network service is needed.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'blogc.cache_backends.SQLiteCache',
+            'LOCATION': '/var/tmp/blogc-cache.sqlite3',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 4},
+        }
+    }
+
+Entries expire after their timeout (TTL). When the table grows beyond
+MAX_ENTRIES, the least recently used 1/CULL_FREQUENCY of them is
+evicted. Integers are stored natively, so incr() is one atomic UPDATE.
+
+The size is only checked every CULL_INTERVAL writes per process (by
+default 1% of MAX_ENTRIES), so a set() isn't a COUNT(*) over the whole
+table; the table may overshoot MAX_ENTRIES by that many rows per worker
+between checks.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Reads only refresh an entry's LRU timestamp when it is older than this,
+# so a hot key doesn't turn every get() into a write.
+LRU_RESOLUTION = 1.0
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._local = threading.local()
+        options = params.get('OPTIONS', params.get('options', {}))
+        self._cull_interval = max(1, int(options.get('CULL_INTERVAL', self._max_entries // 100)))
+        self._writes = 0
+
+    # ---- connection handling ----
+
+    @property
+    def _db(self):
+        # One connection per thread, reopened after fork()
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    # ---- value encoding ----
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    # ---- Django cache API ----
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._db.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            return default
+        if now - accessed > LRU_RESOLUTION:
+            self._db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(value)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        lookup = {self.make_and_validate_key(key, version=version): key for key in keys}
+        placeholders = ','.join('?' * len(lookup))
+        rows = self._db.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)',
+            (*lookup, time.time())
+        ).fetchall()
+        return {lookup[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write([(key, self._encode(value), self.get_backend_timeout(timeout))])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        self._write([
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires)
+            for key, value in data.items()
+        ])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, self._encode(value), self.get_backend_timeout(timeout), now)
+            )
+            added = cursor.rowcount == 1
+            if added:
+                self._maybe_cull(db, now, 1)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._db.execute(
+            'UPDATE cache SET value = value + ?, accessed = ? '
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) "
+            'RETURNING value',
+            (delta, now, key, now)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        exists = self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        ).fetchone()
+        if exists:
+            raise TypeError(f"Key '{key}' does not hold an integer")
+        raise ValueError(f"Key '{key}' not found")
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            self._db.execute(f'DELETE FROM cache WHERE key IN ({placeholders})', keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    # ---- internals ----
+
+    def _write(self, rows):
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                [(key, value, expires, now) for key, value, expires in rows]
+            )
+            self._maybe_cull(db, now, len(rows))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def _maybe_cull(self, db, now, written):
+        # Not locked: a racing thread can only delay the next check a little
+        self._writes += written
+        if self._writes >= self._cull_interval:
+            self._writes = 0
+            self._cull(db, now)
+
+    def _cull(self, db, now):
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            evict = count // self._cull_frequency if self._cull_frequency else count
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(evict, count - self._max_entries),)
+            )
@@ -0,0 +1,98 @@
+# conditional.py
+"""
+Conditional GET (ETag / 304) for post endpoints.
+
+The ETag is computed from one aggregate query over the rows the endpoint
+would return - max(updated_at) and the summed ids and like/comment
+counters - plus the response-cache generations from cache.py, which move
+on edits the aggregate can't see (a comment body, a category rename, a
+deleted post). No serializer runs before the 304 decision.
+
+There is no Last-Modified: likes and comments change the counters
+without touching updated_at, and the payload's liked_by_me differs per
+user, so a date can't say whether a response is still current. Only
+If-None-Match is answered.
+
+For anonymous GETs the ETag is cached under the same generations as the
+cached response (see cache.request_key), so a cache hit still makes no
+queries. Authenticated requests compute it every time.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache as default_cache
+from django.db.models import Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .cache import get_generations, request_key, response_timeout
+
+
+def queryset_state(queryset):
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    return queryset.aggregate(
+        last_modified=Max('updated_at'),
+        ids=Sum('pk'),
+        likes=Sum('likes_count'),
+        comments=Sum('comments_count'),
+    )
+
+
+def compute_etag(request, queryset, scopes=()):
+    """The ETag for `queryset` as `request` sees it."""
+    state = queryset_state(queryset)
+    last_modified = state['last_modified']
+    user_id = request.user.pk if request.user.is_authenticated else None
+    fingerprint = repr((
+        request.get_full_path(),
+        user_id,
+        last_modified.isoformat() if last_modified else None,
+        state['ids'], state['likes'], state['comments'],
+        get_generations(scopes) if scopes else (),
+    ))
+    return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+
+def conditional_response(queryset_method, *scopes, paginated=False):
+    """
+    Add an ETag to a view method's response and answer If-None-Match
+    with a 304 before the view runs.
+
+    `queryset_method` names a method on the view that takes the URL kwargs
+    and returns the queryset the response is built from. `scopes` are
+    cache.py scopes, formatted from the URL kwargs. With `paginated`, only
+    the requested page window is aggregated, so the cost doesn't grow
+    with the table.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            key = etag = None
+            if not request.user.is_authenticated:
+                key = request_key('etag', request, scopes, kwargs)
+                etag = default_cache.get(key)
+            if etag is None:
+                queryset = getattr(self, queryset_method)(**kwargs)
+                if paginated and self.paginator is not None:
+                    queryset = self.paginator.window(queryset, request)
+                etag = compute_etag(request, queryset, [scope.format(**kwargs) for scope in scopes])
+                if key is not None:
+                    default_cache.set(key, etag, response_timeout())
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            # Always revalidate; the ETag is per user
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+# counters.py
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import BlogCategory, BlogCategoryStats, BlogPost, Comment, Like
+
+
+def adjust_post_counters(post_id, likes=0, comments=0):
+    """
+    Apply a delta to a post's denormalized counters, and to its category's
+    stats row, with one UPDATE each. Callers run this inside the
+    transaction that created/deleted the row.
+    """
+    changes = {}
+    if likes:
+        changes['likes_count'] = F('likes_count') + likes
+    if comments:
+        changes['comments_count'] = F('comments_count') + comments
+    if not changes:
+        return 0
+    updated = BlogPost.objects.filter(pk=post_id).update(**changes)
+
+    stats = {}
+    if likes:
+        stats['total_likes'] = F('total_likes') + likes
+    if comments:
+        stats['total_comments'] = F('total_comments') + comments
+    BlogCategoryStats.objects.filter(category__posts=post_id).update(**stats)
+    return updated
+
+
+def apply_like_deltas(deltas):
+    """
+    Apply {post_id: likes delta} to BlogPost.likes_count and the categories'
+    total_likes. Used by blogc.likes, whose raw SQL writes skip the model
+    signals. Returns {post_id: category_id} for the posts that exist.
+    """
+    table = connection.ops.quote_name(BlogPost._meta.db_table)
+    categories = {}
+    category_deltas = defaultdict(int)
+    with connection.cursor() as cursor:
+        for post_id, delta in deltas.items():
+            if not delta:
+                continue
+            cursor.execute(
+                f'UPDATE {table} SET likes_count = likes_count + %s WHERE id = %s RETURNING category_id',
+                [delta, post_id],
+            )
+            row = cursor.fetchone()
+            if row is not None:
+                categories[post_id] = row[0]
+                if row[0]:
+                    category_deltas[row[0]] += delta
+    for category_id, delta in category_deltas.items():
+        if delta:
+            BlogCategoryStats.objects.filter(category_id=category_id).update(total_likes=F('total_likes') + delta)
+    return categories
+
+
+def _post_counter(post_id, field):
+    return Subquery(BlogPost.objects.filter(pk=post_id).values(field)[:1])
+
+
+def _shift_category_stats(category_id, post_id, sign):
+    updated = BlogCategoryStats.objects.filter(category_id=category_id).update(
+        total_posts=F('total_posts') + sign,
+        total_likes=F('total_likes') + sign * _post_counter(post_id, 'likes_count'),
+        total_comments=F('total_comments') + sign * _post_counter(post_id, 'comments_count'),
+    )
+    if not updated:
+        # No stats row yet (category created behind the signals' back)
+        transaction.on_commit(lambda: rebuild_category_stats(BlogCategory.objects.filter(pk=category_id)))
+
+
+def move_post_stats(post_id, old_category_id=None, new_category_id=None):
+    """
+    Move one post, with its likes and comments, between category stats rows.
+    Pass only `new_category_id` for a new post and only `old_category_id`
+    for a post about to be deleted (the counters are read from its row).
+    """
+    if old_category_id == new_category_id:
+        return
+    if old_category_id:
+        _shift_category_stats(old_category_id, post_id, -1)
+    if new_category_id:
+        _shift_category_stats(new_category_id, post_id, 1)
+
+
+def rebuild_post_counters(queryset=None):
+    """
+    Recompute likes_count/comments_count from the Like and Comment tables.
+    Only active comments are counted, as in signals.py.
+    """
+    if queryset is None:
+        queryset = BlogPost.objects.all()
+
+    likes = (Like.objects.filter(post=OuterRef('pk')).order_by()
+             .values('post').annotate(c=Count('pk')).values('c'))
+    comments = (Comment.objects.filter(post=OuterRef('pk'), active=True).order_by()
+                .values('post').annotate(c=Count('pk')).values('c'))
+    return queryset.update(
+        likes_count=Coalesce(Subquery(likes), 0),
+        comments_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+def rebuild_category_stats(queryset=None):
+    """Recompute BlogCategoryStats from the posts' counters, creating missing rows."""
+    if queryset is None:
+        queryset = BlogCategory.objects.all()
+
+    BlogCategoryStats.objects.bulk_create(
+        [BlogCategoryStats(category_id=pk) for pk in queryset.values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    posts = BlogPost.objects.filter(category=OuterRef('category')).order_by().values('category')
+    return BlogCategoryStats.objects.filter(category__in=queryset).update(
+        total_posts=Coalesce(Subquery(posts.annotate(c=Count('pk')).values('c')), 0),
+        total_comments=Coalesce(Subquery(posts.annotate(c=Sum('comments_count')).values('c')), 0),
+        total_likes=Coalesce(Subquery(posts.annotate(c=Sum('likes_count')).values('c')), 0),
+    )
@@ -0,0 +1,61 @@
+# excerpts.py
+"""
+Plain-text summaries of post content, stored on BlogPost by save().
+
+Lists show a short preview and a reading time for each post. Computing
+them on read means shipping the whole `content` to the client (which is
+what the frontend used to do) or stripping HTML for every row of every
+page. BlogPost.save() stores them instead:
+
+    excerpt        the first EXCERPT_LENGTH characters of the text, cut
+                   at a word boundary and ending in an ellipsis
+    word_count     words in the text
+    reading_time   minutes at WORDS_PER_MINUTE, rounded up
+
+Rows written before these columns existed are filled in by the
+backfill_excerpts command.
+"""
+import html
+import math
+import re
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+# BlogPost.excerpt's max_length; a larger EXCERPT_LENGTH is clamped to it
+MAX_EXCERPT_LENGTH = 300
+ELLIPSIS = '…'
+
+_whitespace = re.compile(r'\s+')
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def plain_text(content):
+    """`content` without tags or entities, whitespace collapsed to single spaces."""
+    return _whitespace.sub(' ', html.unescape(strip_tags(content or ''))).strip()
+
+
+def make_excerpt(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length - len(ELLIPSIS)]
+    space = cut.rfind(' ')
+    # Fall back to a hard cut when the first word alone is longer than half the excerpt
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,;:.-') + ELLIPSIS
+
+
+def summarize(content):
+    """{'excerpt', 'word_count', 'reading_time'} for a post's content."""
+    text = plain_text(content)
+    length = min(_setting('EXCERPT_LENGTH', 200), MAX_EXCERPT_LENGTH)
+    word_count = len(text.split())
+    return {
+        'excerpt': make_excerpt(text, length),
+        'word_count': word_count,
+        'reading_time': math.ceil(word_count / _setting('WORDS_PER_MINUTE', 200)),
+    }
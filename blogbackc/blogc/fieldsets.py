@@ -0,0 +1,105 @@
+# fieldsets.py
+"""
+Sparse fieldsets for the post endpoints.
+
+?fields=id,title,excerpt returns only those keys of each post, and
+?omit=image returns the default fields but them; given both, omit
+applies to what fields selected. Names are the serializer's top-level
+keys (a nested author or category comes whole), plus the extra keys a
+serializer adds itself (the detail's `comments`, which brings
+`comments_next`). An unknown name is a 400.
+
+A serializer's `optional_fields` are left out unless ?fields= names
+them: the post list only sends `content` for ?fields=...,content.
+
+The selection is a tuple of names kept in serializer order, so the same
+request always gives the same key order and the same cached projection.
+It travels in the serializer context as context["fieldset"]
+(None = the default fields), where SparseFieldsMixin drops the other fields,
+and it narrows the SQL as well: projections compile a plan reading only
+the selected columns, and instance querysets get .only() (see
+projections.narrow). A list without `content` skips the largest column
+of the table.
+"""
+from rest_framework.exceptions import ValidationError
+
+_available = {}
+
+
+class SparseFieldsMixin:
+    """
+    Serializes only the fields named in context["fieldset"], when there is
+    one, and otherwise all but `optional_fields`.
+    """
+
+    # Keys to_representation adds after the fields that a fieldset can also select
+    extra_fields = ()
+    # Fields sent only when ?fields= names them
+    optional_fields = ()
+
+    def get_fields(self):
+        fields = self.get_all_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return {name: field for name, field in fields.items() if name not in self.optional_fields}
+        return {name: field for name, field in fields.items() if name in fieldset}
+
+    def get_all_fields(self):
+        """Every field, optional ones included."""
+        return super().get_fields()
+
+    def selects(self, *names):
+        return selected(self.context.get('fieldset'), *names)
+
+
+def selected(fieldset, *names):
+    """Whether `fieldset` selects any of `names`."""
+    return fieldset is None or any(name in fieldset for name in names)
+
+
+def available_fields(serializer_class):
+    """The names ?fields= and ?omit= accept for serializer_class, in output order."""
+    names = _available.get(serializer_class)
+    if names is None:
+        fields = serializer_class().get_all_fields()
+        names = _available[serializer_class] = (
+            *(name for name, field in fields.items() if not field.write_only),
+            *serializer_class.extra_fields,
+        )
+    return names
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, serializer_class):
+    """
+    The fieldset `request` asks for, or None for the default fields. None
+    as well for serializers without SparseFieldsMixin, which ignore both
+    parameters.
+    """
+    if not issubclass(serializer_class, SparseFieldsMixin):
+        return None
+    keep, omit = _names(request, 'fields'), _names(request, 'omit')
+    if keep is None and omit is None:
+        return None
+
+    available = available_fields(serializer_class)
+    errors = {}
+    for param, names in (('fields', keep), ('omit', omit)):
+        unknown = sorted((names or set()).difference(available))
+        if unknown:
+            errors[param] = f'Unknown field(s) {", ".join(unknown)}; choose from {", ".join(available)}'
+    if errors:
+        raise ValidationError(errors)
+
+    if keep is None:
+        keep = set(available).difference(serializer_class.optional_fields)
+    fieldset = tuple(name for name in available if name in keep and name not in (omit or ()))
+    if not fieldset:
+        raise ValidationError({'fields': 'Select at least one field'})
+    return fieldset
@@ -0,0 +1,125 @@
+# hashing.py
+"""
+Password hashing off the request worker.
+
+A PBKDF2 check costs hundreds of milliseconds of CPU. Through a sync
+view, a burst of logins holds every WSGI worker for the length of a
+hash; under ASGI, Django gives each sync request its own thread, so the
+burst becomes as many hashing threads competing with reads for the CPU.
+The async login and register views (views.AsyncLoginView /
+AsyncRegisterView) instead hand their serializer work (user lookup,
+hash, token) to HashingPool, a bounded ThreadPoolExecutor, and wait on
+it without holding a thread. hashlib releases the GIL while it hashes.
+
+At most HASH_WORKERS jobs run and HASH_QUEUE_LIMIT wait; anything past
+that is refused straight away (the views answer 503 with Retry-After)
+rather than queueing without bound. With HASH_WORKERS = 0 the work runs
+through sync_to_async, as a sync view would.
+pool.stats() reports in-flight work, queue depth and timings.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import summarize
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the queue is full."""
+
+
+class HashingPool:
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._rejected = 0
+        # Recent timings in seconds
+        self._timings = {
+            'wait': deque(maxlen=1000),  # submitted -> picked up by a worker
+            'run': deque(maxlen=1000),   # time on the worker
+        }
+
+    def _get_executor(self, workers):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blogc-hashing')
+        return self._executor
+
+    def _reserve(self, workers):
+        limit = max(workers, 1) + _setting('HASH_QUEUE_LIMIT', 64)
+        with self._lock:
+            if self._running + self._queued >= limit:
+                self._rejected += 1
+                raise PoolSaturated(f'{self._running} running, {self._queued} queued')
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+    def _call(self, job, func, args, in_worker):
+        started = time.perf_counter()
+        with self._lock:
+            if job['cancelled']:
+                return None
+            job['started'] = True
+            self._queued -= 1
+            self._running += 1
+            self._timings['wait'].append(started - job['submitted'])
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._timings['run'].append(time.perf_counter() - started)
+            if in_worker:
+                close_old_connections()
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool and return its result; raises PoolSaturated when full."""
+        workers = _setting('HASH_WORKERS', 2)
+        self._reserve(workers)
+        job = {'submitted': time.perf_counter(), 'started': False, 'cancelled': False}
+        try:
+            if not workers:
+                return await sync_to_async(self._call, thread_sensitive=True)(job, func, args, False)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(workers), self._call, job, func, args, True)
+        except asyncio.CancelledError:
+            # The caller went away (a client disconnect, say) while the job
+            # was still queued: give its slot back, and skip it if a worker
+            # picks it up after all
+            with self._lock:
+                if not job['started']:
+                    job['cancelled'] = True
+                    self._queued -= 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': _setting('HASH_WORKERS', 2),
+                'queue_limit': _setting('HASH_QUEUE_LIMIT', 64),
+                'running': self._running,
+                'queued': self._queued,
+                'max_queued': self._max_queued,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                **{kind: summarize(list(samples)) for kind, samples in self._timings.items()},
+            }
+
+
+pool = HashingPool()
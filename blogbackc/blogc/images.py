@@ -0,0 +1,163 @@
+# images.py
+"""
+Resized WebP/JPEG variants of BlogPost.image.
+
+After a post is saved with a new image, process_post_image() is queued on
+a small thread pool (once the transaction commits) so the request doesn't
+wait on Pillow or the storage round trips. Variants are written next to
+the original through the same storage backend and recorded on
+BlogPost.image_variants.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .media_urls import resolver
+
+logger = logging.getLogger(__name__)
+
+# Bounding box (longest side, px) for each variant
+VARIANTS = {
+    'thumb': 320,
+    'card': 768,
+    'full': 1600,
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = settings.BLOGC_SETTINGS.get('IMAGE_WORKERS', 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blogc-images')
+    return _executor
+
+
+def variant_name(source_name, variant, ext):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/variants/{stem}_{variant}.{ext}'
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(field_file):
+    """Write every variant of `field_file` to its storage and return the mapping."""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as fh:
+        original = Image.open(fh)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    mapping = {'source': field_file.name}
+    for variant, size in VARIANTS.items():
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt in FORMATS:
+            name = variant_name(field_file.name, variant, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[fmt] = storage.save(name, ContentFile(_encode(resized, fmt)))
+        mapping[variant] = entry
+    return mapping
+
+
+def delete_variants(storage, mapping):
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            name = (mapping.get(variant) or {}).get(fmt)
+            if name:
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    logger.warning('Could not delete image variant %s: %s', name, e)
+
+
+def process_post_image(post_id, force=False):
+    """Generate variants for one post. Safe to run outside a request."""
+    from .models import BlogPost
+
+    try:
+        post = BlogPost.objects.filter(pk=post_id).first()
+        if post is None or not post.image:
+            return None
+        if not force and post.image_variants.get('source') == post.image.name:
+            return post.image_variants
+
+        old = post.image_variants
+        mapping = build_variants(post.image)
+        # Only record the result if the image wasn't replaced meanwhile
+        updated = BlogPost.objects.filter(pk=post_id, image=post.image.name).update(image_variants=mapping)
+        if old and old.get('source') != post.image.name:
+            delete_variants(post.image.storage, old)
+        if not updated:
+            # Replaced or deleted meanwhile: the variants just written belong to
+            # nothing, unless the new image's variants have the same names
+            current = BlogPost.objects.filter(pk=post_id).values_list('image', flat=True).first()
+            if not current or os.path.splitext(current)[0] != os.path.splitext(post.image.name)[0]:
+                delete_variants(post.image.storage, mapping)
+            return None
+        return mapping
+    except Exception:
+        logger.exception('Image variant generation failed for post %s', post_id)
+        return None
+
+
+def _run_in_worker(post_id):
+    try:
+        process_post_image(post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(post_id):
+    """Queue variant generation for after the current transaction commits."""
+    if settings.BLOGC_SETTINGS.get('IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, post_id))
+    else:
+        transaction.on_commit(lambda: process_post_image(post_id))
+
+
+def image_srcset(post, request=None):
+    """{variant: {"webp": url, "jpeg": url, "width": w, "height": h}} for a post, or None."""
+    return srcset_for(post.image.name, post.image_variants, post.image.storage, request)
+
+
+def srcset_for(name, variants, storage, request=None):
+    """image_srcset() from the column values (image name and image_variants)."""
+    if not name or variants.get('source') != name:
+        return None
+    srcset = {}
+    for variant in VARIANTS:
+        entry = variants.get(variant)
+        if not entry:
+            continue
+        urls = {fmt: resolver.url(entry[fmt], storage, request) for fmt in FORMATS}
+        srcset[variant] = {**urls, 'width': entry['width'], 'height': entry['height']}
+    return srcset
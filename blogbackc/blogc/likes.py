@@ -0,0 +1,254 @@
+# likes.py
+"""
+The like/unlike write path.
+
+toggle_like() flips a (post, user) like with one conditional write:
+DELETE ... RETURNING, and only if nothing was deleted, INSERT ... ON
+CONFLICT DO NOTHING RETURNING. On PostgreSQL both run as a single
+statement (a data-modifying CTE); SQLite has no writable CTEs, so there
+it is two statements in the same transaction. The counters are then
+moved by the returned delta (counters.apply_like_deltas).
+
+With BLOGC_SETTINGS['LIKE_BUFFER'] on, toggles are recorded in a
+per-process LikeBuffer instead and written in batches, every
+LIKE_FLUSH_INTERVAL seconds or once LIKE_BATCH_SIZE toggles are pending,
+so a viral post costs one transaction per batch rather than per click.
+Pending toggles live in memory: they are lost if the process is killed
+before a flush, and another worker only sees them once flushed.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import cache
+from .counters import apply_like_deltas
+from .models import BlogPost, Like
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(Like._meta.db_table), quote(BlogPost._meta.db_table)
+
+
+def _user_table():
+    # The table Like.user points at, not necessarily auth_user
+    opts = Like._meta.get_field('user').related_model._meta
+    return connection.ops.quote_name(opts.db_table), connection.ops.quote_name(opts.pk.column)
+
+
+def _now():
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+# ---- immediate path ----
+
+def _toggle_row(post_id, user_id):
+    """+1 if a like was inserted, -1 if deleted, 0 if a concurrent insert won, None if no such post."""
+    like_table, post_table = _tables()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"""
+                WITH deleted AS (
+                    DELETE FROM {like_table} WHERE post_id = %s AND user_id = %s RETURNING id
+                ), inserted AS (
+                    INSERT INTO {like_table} (post_id, user_id, created_at)
+                    SELECT %s, %s, %s
+                    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                      AND EXISTS (SELECT 1 FROM {post_table} WHERE id = %s)
+                    ON CONFLICT (post_id, user_id) DO NOTHING
+                    RETURNING id
+                )
+                SELECT (SELECT COUNT(*) FROM deleted), (SELECT COUNT(*) FROM inserted),
+                       EXISTS (SELECT 1 FROM {post_table} WHERE id = %s)
+            """, [post_id, user_id, post_id, user_id, _now(), post_id, post_id])
+            deleted, inserted, exists = cursor.fetchone()
+            if not exists:
+                return None
+            return inserted - deleted
+
+        cursor.execute(
+            f'DELETE FROM {like_table} WHERE post_id = %s AND user_id = %s RETURNING id',
+            [post_id, user_id],
+        )
+        if cursor.fetchone() is not None:
+            return -1
+        # "WHERE" keeps SQLite from reading ON CONFLICT as a join constraint
+        cursor.execute(f"""
+            INSERT INTO {like_table} (post_id, user_id, created_at)
+            SELECT %s, %s, %s WHERE EXISTS (SELECT 1 FROM {post_table} WHERE id = %s)
+            ON CONFLICT (post_id, user_id) DO NOTHING
+            RETURNING id
+        """, [post_id, user_id, _now(), post_id])
+        if cursor.fetchone() is not None:
+            return 1
+    return 0 if BlogPost.objects.filter(pk=post_id).exists() else None
+
+
+def toggle_like(post_id, user_id):
+    """Like or unlike. Returns True if the post is now liked, False if not, None if it doesn't exist."""
+    if _setting('LIKE_BUFFER', False):
+        return buffer.toggle(post_id, user_id)
+
+    with transaction.atomic():
+        delta = _toggle_row(post_id, user_id)
+        categories = apply_like_deltas({post_id: delta}) if delta else {}
+    if delta is None:
+        return None
+    if delta:
+        cache.invalidate_post(post_id, categories.get(post_id))
+    # delta 0: a concurrent request from the same user inserted it first
+    return delta >= 0
+
+
+# ---- buffered path ----
+
+# One (post_id, user_id) row of a VALUES list; the casts keep PostgreSQL
+# from typing server-side bound parameters as text. BIGINT, as the ids are
+# BigAutoFields (INTEGER is 32-bit there)
+ROW = '(CAST(%s AS BIGINT), CAST(%s AS BIGINT))'
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class LikeBuffer:
+    """Latest wanted state per (post_id, user_id), flushed in batches."""
+    chunk_size = 200  # rows per statement
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._full = threading.Event()
+
+    def toggle(self, post_id, user_id):
+        key = (post_id, user_id)
+        with self._lock:
+            liked = self._pending.get(key)
+        if liked is None:
+            liked = (
+                BlogPost.objects.filter(pk=post_id)
+                .annotate(liked=Exists(Like.objects.filter(post=OuterRef('pk'), user_id=user_id)))
+                .values_list('liked', flat=True).first()
+            )
+            if liked is None:
+                return None
+        with self._lock:
+            # Another toggle may have landed while we were reading
+            liked = not self._pending.get(key, liked)
+            self._pending[key] = liked
+            size = len(self._pending)
+
+        self._start_flusher()
+        if size >= _setting('LIKE_BATCH_SIZE', 500):
+            # The flusher writes the batch; the toggle is recorded either way,
+            # so a failing flush mustn't fail this request
+            self._full.set()
+        return liked
+
+    def pending(self, user_id, post_ids):
+        """{post_id: liked} for toggles not written yet."""
+        with self._lock:
+            return {
+                post_id: self._pending[(post_id, user_id)]
+                for post_id in post_ids if (post_id, user_id) in self._pending
+            }
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write every pending toggle. Returns the number of (post, user) pairs handled."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            with transaction.atomic():
+                deltas = self._write(batch)
+                categories = apply_like_deltas(deltas)
+        except Exception:
+            logger.exception('Flushing %s buffered likes failed; keeping them for the next flush', len(batch))
+            with self._lock:
+                for key, liked in batch.items():
+                    self._pending.setdefault(key, liked)
+            raise
+        for post_id, category_id in categories.items():
+            cache.invalidate_post(post_id, category_id)
+        return len(batch)
+
+    def _write(self, batch):
+        like_table, post_table = _tables()
+        user_table, user_pk = _user_table()
+        unlikes = [key for key, liked in batch.items() if not liked]
+        likes = [key for key, liked in batch.items() if liked]
+        deltas = Counter()
+        with connection.cursor() as cursor:
+            for chunk in _chunks(unlikes, self.chunk_size):
+                values = ', '.join([ROW] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {like_table} WHERE (post_id, user_id) IN (VALUES {values}) RETURNING post_id',
+                    [v for key in chunk for v in key],
+                )
+                for (post_id,) in cursor.fetchall():
+                    deltas[post_id] -= 1
+            now = _now()
+            for chunk in _chunks(likes, self.chunk_size):
+                values = ', '.join([ROW] * len(chunk))
+                # Skips posts/users deleted since the toggle instead of failing the batch
+                cursor.execute(f"""
+                    INSERT INTO {like_table} (post_id, user_id, created_at)
+                    SELECT v.column1, v.column2, %s FROM (VALUES {values}) AS v
+                    WHERE EXISTS (SELECT 1 FROM {post_table} p WHERE p.id = v.column1)
+                      AND EXISTS (SELECT 1 FROM {user_table} u WHERE u.{user_pk} = v.column2)
+                    ON CONFLICT (post_id, user_id) DO NOTHING
+                    RETURNING post_id
+                """, [now] + [v for key in chunk for v in key])
+                for (post_id,) in cursor.fetchall():
+                    deltas[post_id] += 1
+        return deltas
+
+    def _start_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name='blogc-likes', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            self._full.wait(_setting('LIKE_FLUSH_INTERVAL', 1.0))
+            self._full.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # logged in flush(); retried next round
+            finally:
+                close_old_connections()
+
+
+buffer = LikeBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if len(buffer):
+        try:
+            buffer.flush()
+        except Exception:
+            pass
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blogc import cache
+from blogc.excerpts import summarize
+from blogc.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = 'Fill in excerpt, word_count and reading_time for posts saved before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute every post, not just those without an excerpt')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = BlogPost.objects.all() if options['force'] else BlogPost.objects.filter(excerpt='').exclude(content='')
+        posts = posts.only('id', 'content', 'category_id').order_by('id')
+        updated = last = 0
+        # Keyset batches rather than one open cursor, since each batch writes to the rows being read
+        while batch := list(posts.filter(id__gt=last)[:options['batch_size']]):
+            for post in batch:
+                for name, value in summarize(post.content).items():
+                    setattr(post, name, value)
+            updated += self.write(batch)
+            last = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} posts'))
+
+    def write(self, posts):
+        # bulk_update skips save() and the signals, so drop the cached responses here
+        with transaction.atomic():
+            BlogPost.objects.bulk_update(posts, BlogPost.SUMMARY_FIELDS)
+            scopes = {cache.post_scope(post.pk) for post in posts}
+            scopes.update(cache.category_scope(post.category_id) for post in posts if post.category_id)
+            cache.invalidate(cache.GLOBAL, *scopes)
+        return len(posts)
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from blogc.benchmarks import asgi_request, format_table, summarize
+from blogc.models import BlogCategory, BlogPost
+from blogc.views import MyTokenObtainPairSerializer
+
+ENDPOINTS = {
+    'list': ('/api/posts/', '/api/async/posts/'),
+    'detail': ('/api/posts/{pk}/', '/api/async/posts/{pk}/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent reads with slow clients, in process: WSGI with a fixed thread pool, '
+        'ASGI on the sync views, ASGI on the async views (/api/async/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per mode')
+        parser.add_argument('--clients', type=int, default=64, help='Concurrent clients')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--client-delay', type=float, default=50.0,
+                            help='Milliseconds each client takes to receive a response')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='list')
+        parser.add_argument('--authenticated', action='store_true',
+                            help='Send a bearer token (authenticated reads skip the response cache)')
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'asgi-{token}', email=f'asgi-{token}@example.com', password=None)
+        category = BlogCategory.objects.create(name=f'ASGI {token}', slug=f'asgi-{token}')
+        posts = [
+            BlogPost.objects.create(title=f'ASGI {token} {i}', author=user, category=category,
+                                    content='Body ' * 200, published=True)
+            for i in range(40)
+        ]
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('.', '*'))), 'localhost')
+        headers = []
+        if options['authenticated']:
+            access = MyTokenObtainPairSerializer.get_token(user).access_token
+            headers.append((b'authorization', f'Bearer {access}'.encode()))
+        sync_url, async_url = (url.format(pk=posts[-1].pk) for url in ENDPOINTS[options['endpoint']])
+        delay = options['client_delay'] / 1000
+        rows = []
+
+        try:
+            rows.append(self.run_wsgi(f"WSGI, {options['threads']} threads", host, sync_url, headers, delay, options))
+            app = ASGIHandler()
+            for label, url in (('ASGI, sync view', sync_url), ('ASGI, async view', async_url)):
+                rows.append(asyncio.run(self.run_asgi(label, app, host, url, headers, delay, options)))
+        finally:
+            user.delete()
+            category.delete()
+
+        self.stdout.write(
+            f"{options['duration']}s per mode, {options['clients']} clients, "
+            f"{options['client_delay']}ms client delay, {options['endpoint']}"
+            f"{' (authenticated)' if options['authenticated'] else ''}"
+        )
+        self.stdout.write(format_table(rows, ['mode', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'errors', 'peak threads']))
+
+    def result(self, label, times, errors, elapsed, peak_threads):
+        stats = summarize(times)
+        return {
+            'mode': label,
+            'requests': stats['count'],
+            'req/s': round(stats['count'] / elapsed, 1),
+            'p50 ms': stats['p50_ms'],
+            'p99 ms': stats['p99_ms'],
+            'errors': errors,
+            'peak threads': peak_threads,
+        }
+
+    def watch_threads(self, stop):
+        """Highest threading.active_count() seen until `stop` is set."""
+        peak = [threading.active_count()]
+
+        def watch():
+            while not stop.wait(0.01):
+                peak[0] = max(peak[0], threading.active_count())
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        return peak
+
+    def run_wsgi(self, label, host, url, headers, delay, options):
+        handler = WSGIHandler()
+        path, _, query = url.partition('?')
+        extra = {f"HTTP_{name.decode().upper().replace('-', '_')}": value.decode() for name, value in headers}
+
+        def serve():
+            # One request on a worker thread, which stays busy until the slow client has the body
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                       'HTTP_HOST': host, 'wsgi.input': io.BytesIO(), **extra}
+            setup_testing_defaults(environ)
+            status = []
+            response = handler(environ, lambda s, h, exc_info=None: status.append(int(s.split()[0])))
+            try:
+                for _ in response:
+                    if delay:
+                        time.sleep(delay)
+            finally:
+                response.close()
+            return status[0]
+
+        deadline = time.perf_counter() + options['duration']
+        times = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def client(pool):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = pool.submit(serve).result()
+                with lock:
+                    times.append(time.perf_counter() - started)
+                    errors[0] += status != 200
+
+        stop = threading.Event()
+        with ThreadPoolExecutor(options['threads'], thread_name_prefix='wsgi-worker') as pool:
+            baseline = threading.active_count()
+            peak = self.watch_threads(stop)
+            started = time.perf_counter()
+            clients = [threading.Thread(target=client, args=(pool,)) for _ in range(options['clients'])]
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        stop.set()
+        # Not counting the client threads and the watcher, which belong to the load generator
+        return self.result(label, times, errors[0], elapsed, peak[0] - baseline - options['clients'] - 1)
+
+    async def run_asgi(self, label, app, host, url, headers, delay, options):
+        deadline = time.perf_counter() + options['duration']
+        times = []
+        errors = 0
+
+        async def client():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = await asgi_request(app, host, 'GET', url, headers=headers, client_delay=delay)
+                times.append(time.perf_counter() - started)
+                errors += status != 200
+
+        stop = threading.Event()
+        baseline = threading.active_count()
+        peak = self.watch_threads(stop)
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        return self.result(label, times, errors, elapsed, peak[0] - baseline - 1)
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from blogc.benchmarks import format_table
+from blogc.cache_backends import SQLiteCache
+
+
+def build_cache(name, location):
+    if name == 'locmem':
+        return LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def worker(name, location, index, processes, ops, barrier, results):
+    cache = build_cache(name, location)
+    rng = random.Random(index)
+
+    # Phase 1: every process publishes its own keys
+    for i in range(ops // 10):
+        cache.set(f'p{index}:{i}', {'value': i})
+    barrier.wait()
+
+    # Phase 2: mixed load reading the *next* process's keys
+    peer = (index + 1) % processes
+    hits = lookups = incrs = 0
+    started = time.perf_counter()
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.80:
+            lookups += 1
+            hits += cache.get(f'p{peer}:{rng.randrange(ops // 10)}') is not None
+        elif roll < 0.95:
+            cache.set(f'p{index}:{rng.randrange(ops // 10)}', {'value': roll})
+        else:
+            try:
+                cache.incr('shared-counter')
+            except ValueError:
+                cache.add('shared-counter', 0)
+                cache.incr('shared-counter')
+            incrs += 1
+    elapsed = time.perf_counter() - started
+    results.put((hits, lookups, incrs, elapsed, cache.get('shared-counter')))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark LocMemCache against the shared SQLiteCache under multi-process load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--ops', type=int, default=5000, help='Operations per process')
+
+    def handle(self, *args, **options):
+        processes, ops = options['processes'], options['ops']
+        ctx = multiprocessing.get_context('fork')
+        rows = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            location = os.path.join(tmp, 'bench-cache.sqlite3')
+            for name in ('locmem', 'sqlite'):
+                barrier, results = ctx.Barrier(processes), ctx.Queue()
+                procs = [
+                    ctx.Process(target=worker, args=(name, location, i, processes, ops, barrier, results))
+                    for i in range(processes)
+                ]
+                for proc in procs:
+                    proc.start()
+                outcomes = [results.get() for _ in procs]
+                for proc in procs:
+                    proc.join()
+
+                hits = sum(o[0] for o in outcomes)
+                lookups = sum(o[1] for o in outcomes)
+                incrs = sum(o[2] for o in outcomes)
+                slowest = max(o[3] for o in outcomes)
+                counter = build_cache(name, location).get('shared-counter') if name == 'sqlite' \
+                    else max(o[4] or 0 for o in outcomes)
+                rows.append({
+                    'backend': name,
+                    'ops/s': int(processes * ops / slowest),
+                    'cross-process hit %': round(100 * hits / max(lookups, 1), 1),
+                    'incr calls': incrs,
+                    'counter value': counter,
+                })
+
+        self.stdout.write(format_table(
+            rows, ['backend', 'ops/s', 'cross-process hit %', 'incr calls', 'counter value']
+        ))
+        self.stdout.write(
+            'A correct shared cache shows a ~100% cross-process hit rate and '
+            'a counter value equal to the number of incr calls.'
+        )
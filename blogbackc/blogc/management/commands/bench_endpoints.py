@@ -0,0 +1,100 @@
+import json
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from blogc.benchmarks import format_table
+from blogc.benchsuite import ENDPOINTS, compare_results, parse_scale, run_suite, seed_dataset, uncovered_routes
+
+COLUMNS = ['endpoint', 'p50_ms', 'p95_ms', 'p99_ms', 'queries', 'bytes', 'status']
+
+
+class Command(BaseCommand):
+    help = ('p50/p95/p99 latency, query count and response size for every route, on seeded datasets, '
+            'written to JSON and optionally checked against a baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', help='Posts to seed: 1k, 10k, 100k or a number; repeatable '
+                                                             '(default 1k)')
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', help='Only endpoints whose label contains this')
+        parser.add_argument('--cache', action='store_true',
+                            help='Keep the configured cache (anonymous GETs then mostly measure cache hits)')
+        parser.add_argument('--output', default='bench_endpoints.json')
+        parser.add_argument('--baseline', help='Results file to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results to --baseline instead')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown/growth, as a fraction')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Latency changes smaller than this never count as regressions')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline')
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f'No benchmark for {", ".join(missing)}; add them to blogc.benchsuite.ENDPOINTS '
+                               f'or SKIPPED')
+        endpoints = [e for e in ENDPOINTS if not options['only'] or options['only'] in e.label]
+
+        results = {}
+        for scale in options['scale'] or ['1k']:
+            results[scale] = self.run_scale(parse_scale(scale), endpoints, options)
+            rows = [{'endpoint': label, **result} for label, result in results[scale].items()]
+            self.stdout.write(format_table(rows, COLUMNS))
+
+        payload = {
+            'meta': {
+                'seed': options['seed'], 'requests': options['requests'], 'cache': options['cache'],
+                'database': connection.vendor, 'python': platform.python_version(),
+                'django': django.get_version(), 'machine': platform.node(),
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'results': results,
+        }
+        path = options['baseline'] if options['save_baseline'] else options['output']
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+        self.stdout.write(f'Wrote {path}')
+
+        failed = [f'{scale} {label}: {result["status"]}' for scale, endpoints in results.items()
+                  for label, result in endpoints.items() if not result['ok']]
+        if failed:
+            raise CommandError('Unexpected status: ' + '; '.join(failed))
+        if options['baseline'] and not options['save_baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare_results(baseline['results'], results, options['threshold'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}:\n'
+                                   + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
+
+    def run_scale(self, posts, endpoints, options):
+        # A fresh test database per scale, like `manage.py test`, so seeding is deterministic
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            dataset = seed_dataset(posts, options['seed'])
+            self.stdout.write(f'Seeded {posts} posts in {time.perf_counter() - started:.1f}s')
+            caches = settings.CACHES if options['cache'] else {
+                **settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }
+            with override_settings(CACHES=caches):
+                return run_suite(dataset, options['requests'], self.host(), endpoints, progress=self.progress)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def progress(self, label, result):
+        if self.verbosity > 1:
+            self.stdout.write(f"  {label}: p50 {result['p50_ms']} ms, {result['queries']} queries")
+
+    def host(self):
+        return next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('.', '*'))), 'localhost')
@@ -0,0 +1,74 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from blogc.benchmarks import format_table
+from blogc.media_urls import MediaURLResolver
+from blogc.models import BlogPost
+
+
+def legacy_url(post, request):
+    # What BlogPost*Serializer.get_image used to do for every row
+    url = post.image.url
+    if not url.startswith(('http://', 'https://')):
+        if request:
+            url = request.build_absolute_uri(url)
+        else:
+            clean_url = url.lstrip('/')
+            url = f'https://blogbackc.s3.eu-north-1.amazonaws.com/media/{clean_url}'
+    return url
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row storage.url() image URLs with the cached-prefix MediaURLResolver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        posts = [
+            BlogPost(id=i, title=f'Post {i}', image=f'post_images/photo {i}.jpg')
+            for i in range(1, options['posts'] + 1)
+        ]
+        storage = posts[0].image.storage
+        resolver = MediaURLResolver()
+        factory = RequestFactory()
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('.', '*'))), 'localhost')
+
+        def resolved_url(post, request):
+            return resolver.url(post.image.name, post.image.storage, request)
+
+        rows = []
+        for label, build in (('storage.url (legacy)', legacy_url), ('resolver', resolved_url)):
+            original_url = storage.url
+            calls = 0
+
+            def counting_url(name, *args, **kwargs):
+                nonlocal calls
+                calls += 1
+                return original_url(name, *args, **kwargs)
+
+            timings = []
+            with mock.patch.object(storage, 'url', counting_url):
+                for _ in range(options['rounds']):
+                    # A fresh request per page, like the API
+                    request = factory.get('/api/posts/', HTTP_HOST=host)
+                    started = time.perf_counter()
+                    for post in posts:
+                        build(post, request)
+                    timings.append(time.perf_counter() - started)
+            best = min(timings)
+            rows.append({
+                'path': label,
+                'ms/page (best)': round(best * 1000, 2),
+                'us/row': round(best * 1e6 / len(posts), 2),
+                'storage.url calls/page': round(calls / options['rounds'], 1),
+            })
+
+        backend = type(getattr(storage, '_wrapped', storage)).__name__
+        self.stdout.write(f'{len(posts)} posts per page, storage: {backend}')
+        self.stdout.write(format_table(rows, ['path', 'ms/page (best)', 'us/row', 'storage.url calls/page']))
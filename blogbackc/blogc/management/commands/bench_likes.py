@@ -0,0 +1,98 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+
+from blogc import likes
+from blogc.benchmarks import format_table
+from blogc.models import BlogCategory, BlogPost, Like
+
+
+def legacy_toggle(post_id, user_id):
+    # ToggleLikeView.post before blogc.likes: read, get_or_create, maybe
+    # delete (the Like signals adjust the counters)
+    post = BlogPost.objects.get(pk=post_id)
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(post=post, user_id=user_id)
+        if created:
+            return True
+        like.delete()
+        return False
+
+
+def atomic_toggle(post_id, user_id):
+    with transaction.atomic():
+        delta = likes._toggle_row(post_id, user_id)
+        if delta:
+            likes.apply_like_deltas({post_id: delta})
+    return delta
+
+
+MODES = {
+    'legacy (get_or_create)': legacy_toggle,
+    'atomic (RETURNING)': atomic_toggle,
+    'buffered': lambda post_id, user_id: likes.buffer.toggle(post_id, user_id),
+}
+
+
+class Command(BaseCommand):
+    help = 'Concurrent like/unlike throughput on one hot post: legacy vs atomic vs buffered'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--toggles', type=int, default=200, help='Toggles per worker')
+        parser.add_argument('--users-per-worker', type=int, default=5)
+
+    def handle(self, *args, **options):
+        workers, toggles = options['workers'], options['toggles']
+        token = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(username=f'like-bench-{token}-{i}', password=None)
+            for i in range(workers * options['users_per_worker'])
+        ]
+        category = BlogCategory.objects.create(name=f'Like bench {token}', slug=f'like-bench-{token}')
+        post = BlogPost.objects.create(title=f'Like bench {token}', author=users[0], category=category, content='Hot')
+        rows = []
+
+        try:
+            for label, toggle in MODES.items():
+                errors = Counter()
+
+                def run(worker):
+                    own = users[worker::workers]
+                    try:
+                        for i in range(toggles):
+                            try:
+                                toggle(post.pk, own[i % len(own)].pk)
+                            except Exception as e:
+                                errors[type(e).__name__] += 1
+                    finally:
+                        close_old_connections()
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(run, range(workers)))
+                likes.buffer.flush()
+                elapsed = time.perf_counter() - started
+
+                post.refresh_from_db()
+                rows.append({
+                    'mode': label,
+                    'toggles/s': int(workers * toggles / elapsed),
+                    'errors': ', '.join(f'{n} {name}' for name, n in errors.items()) or 0,
+                    'counter matches rows': post.likes_count == Like.objects.filter(post=post).count(),
+                })
+                # Same starting point for the next mode
+                Like.objects.filter(post=post).delete()
+                BlogPost.objects.filter(pk=post.pk).update(likes_count=0)
+        finally:
+            for user in users:
+                user.delete()
+            category.delete()
+
+        self.stdout.write(f'{workers} workers x {toggles} toggles on one post')
+        self.stdout.write(format_table(rows, ['mode', 'toggles/s', 'errors', 'counter matches rows']))
@@ -0,0 +1,115 @@
+import time
+import uuid
+from unittest import mock
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blogc.backends import IdentifierBackend
+from blogc.benchmarks import format_table
+
+
+class LegacyEmailBackend(ModelBackend):
+    # blogc.backends.EmailBackend as it was before IdentifierBackend
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def _authenticate(backends, **credentials):
+    # django.contrib.auth.authenticate() over an explicit backend list
+    for backend in backends:
+        user = backend.authenticate(None, **credentials)
+        if user is not None:
+            return user
+    return None
+
+
+def legacy_login(backends):
+    # MyTokenObtainPairSerializer.validate before IdentifierBackend: try the
+    # identifier as an email, then again as a username
+    def login(identifier, password):
+        return (_authenticate(backends, email=identifier, password=password)
+                or _authenticate(backends, username=identifier, password=password))
+    return login
+
+
+def single_pass_login(identifier, password):
+    return IdentifierBackend().authenticate(None, username=identifier, password=password)
+
+
+MODES = {
+    # What settings actually enabled: EmailBackend was never configured
+    'legacy, ModelBackend only': legacy_login([ModelBackend()]),
+    # What the serializer was written for
+    'legacy, EmailBackend + ModelBackend': legacy_login([LegacyEmailBackend(), ModelBackend()]),
+    'single pass': single_pass_login,
+}
+
+
+class Command(BaseCommand):
+    help = 'Login cost per attempt (hashes, queries, logins/s): legacy vs single-pass lookup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=20, help='Attempts per mode and case')
+
+    def handle(self, *args, **options):
+        attempts = options['attempts']
+        token = uuid.uuid4().hex[:8]
+        password = f'bench-{token}'
+        user = User.objects.create_user(
+            username=f'login-bench-{token}', email=f'Login.Bench.{token}@example.com', password=password
+        )
+        # (identifier, password) per case
+        cases = {
+            'email': (user.email, password),
+            'email (other case)': (user.email.lower(), password),
+            'email, wrong password': (user.email, 'wrong'),
+            'username': (user.username, password),
+            'unknown email': (f'nobody-{token}@example.com', password),
+        }
+        encode = PBKDF2PasswordHasher.encode
+        hashes = [0]
+
+        def counting_encode(hasher, *args, **kwargs):
+            hashes[0] += 1
+            return encode(hasher, *args, **kwargs)
+
+        rows = []
+        try:
+            with mock.patch.object(PBKDF2PasswordHasher, 'encode', counting_encode):
+                for label, login in MODES.items():
+                    for case, (identifier, secret) in cases.items():
+                        hashes[0] = 0
+                        ok = 0
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            for _ in range(attempts):
+                                ok += login(identifier, secret) is not None
+                            elapsed = time.perf_counter() - started
+                        rows.append({
+                            'mode': label,
+                            'identifier': case,
+                            'logged in': f'{ok}/{attempts}',
+                            'logins/s': round(attempts / elapsed, 1),
+                            'hashes/attempt': round(hashes[0] / attempts, 2),
+                            'queries/attempt': round(len(queries) / attempts, 2),
+                        })
+        finally:
+            user.delete()
+
+        self.stdout.write(f'{attempts} attempts per mode and identifier')
+        self.stdout.write(format_table(
+            rows, ['mode', 'identifier', 'logged in', 'logins/s', 'hashes/attempt', 'queries/attempt']
+        ))
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import include, path
+from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from blogc import hashing
+from blogc.benchmarks import asgi_request, format_table, summarize
+from blogc.models import BlogCategory, BlogPost
+from blogc.views import MyTokenObtainPairSerializer
+
+
+class LegacyLoginView(TokenObtainPairView):
+    # PublicTokenObtainPairView before AsyncLoginView: a sync DRF view
+    permission_classes = [AllowAny]
+    serializer_class = MyTokenObtainPairSerializer
+    authentication_classes = []
+
+
+# The project's routes plus the legacy login, for the duration of the run
+urlpatterns = [
+    path('', include(settings.ROOT_URLCONF)),
+    path('legacy-login/', LegacyLoginView.as_view()),
+]
+
+MODES = {
+    'no logins': None,
+    'sync login view (legacy)': '/legacy-login/',
+    'async login + hashing pool': '/api/login/',
+}
+
+
+class Command(BaseCommand):
+    help = 'p99 of GET /api/posts/ on an in-process ASGI app during a login storm: sync vs pooled login'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per mode')
+        parser.add_argument('--logins', type=int, default=16, help='Concurrent login clients')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent readers of /api/posts/')
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        password = f'storm-{token}'
+        user = User.objects.create_user(username=f'storm-{token}', email=f'storm-{token}@example.com',
+                                        password=password)
+        category = BlogCategory.objects.create(name=f'Storm {token}', slug=f'storm-{token}')
+        for i in range(20):
+            BlogPost.objects.create(title=f'Storm {token} {i}', author=user, category=category, content='Body')
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('.', '*'))), 'localhost')
+        login_body = json.dumps({'username': user.username, 'password': password}).encode()
+        rows = []
+
+        try:
+            with override_settings(ROOT_URLCONF=__name__):
+                app = ASGIHandler()
+                for label, login_url in MODES.items():
+                    rows.append(asyncio.run(self.run_mode(
+                        app, host, label, login_url, login_body, options
+                    )))
+        finally:
+            user.delete()
+            category.delete()
+
+        self.stdout.write(
+            f"{options['duration']}s per mode, {options['logins']} login clients, "
+            f"{options['readers']} readers, HASH_WORKERS={settings.BLOGC_SETTINGS.get('HASH_WORKERS', 2)}"
+        )
+        self.stdout.write(format_table(rows, [
+            'mode', 'reads', 'read p50 ms', 'read p99 ms', 'read max ms', 'logins/s', 'login errors', 'max queued',
+        ]))
+
+    async def run_mode(self, app, host, label, login_url, login_body, options):
+        deadline = time.perf_counter() + options['duration']
+        read_times = []
+        logins = {'ok': 0, 'failed': 0}
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await asgi_request(app, host, 'GET', '/api/posts/')
+                read_times.append(time.perf_counter() - started)
+
+        async def login_client():
+            while time.perf_counter() < deadline:
+                status = await asgi_request(app, host, 'POST', login_url, login_body)
+                logins['ok' if status == 200 else 'failed'] += 1
+
+        clients = [reader() for _ in range(options['readers'])]
+        if login_url:
+            clients += [login_client() for _ in range(options['logins'])]
+        started = time.perf_counter()
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - started
+
+        reads = summarize(read_times)
+        return {
+            'mode': label,
+            'reads': reads['count'],
+            'read p50 ms': reads['p50_ms'],
+            'read p99 ms': reads['p99_ms'],
+            'read max ms': round(max(read_times, default=0) * 1000, 1),
+            'logins/s': round(logins['ok'] / elapsed, 1),
+            'login errors': logins['failed'],
+            # Highest hashing-pool queue depth so far (only the async view uses the pool)
+            'max queued': hashing.pool.stats()['max_queued'] if login_url == '/api/login/' else '-',
+        }
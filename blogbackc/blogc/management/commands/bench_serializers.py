@@ -0,0 +1,96 @@
+import time
+import uuid
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blogc.benchmarks import format_table
+from blogc.counters import rebuild_category_stats
+from blogc.models import BlogCategory, BlogPost
+from blogc.projections import Projection
+from blogc.renderers import FastJSONRenderer
+from blogc.serializers import BlogPostListSerializer
+from blogc.views import CategoryPostsView
+
+
+def serializer_rows(queryset, context):
+    return BlogPostListSerializer(list(queryset), many=True, context=context).data
+
+
+def projection_rows(projection):
+    def run(queryset, context):
+        return projection.serialize(projection.values(queryset), context)
+    return run
+
+
+class Command(BaseCommand):
+    help = 'Rows/s serializing and rendering post list pages: DRF serializer vs compiled projection, json vs orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=3, help='Passes over the posts per mode')
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'proj-{token}', email=f'proj-{token}@example.com', password=None)
+        category = BlogCategory.objects.create(name=f'Projection {token}', slug=f'proj-{token}')
+        BlogPost.objects.bulk_create(
+            (BlogPost(title=f'Projection {token} {i}', slug=f'proj-{token}-{i}', author=user, category=category,
+                      content='Lorem ipsum dolor sit amet. ' * 20) for i in range(options['posts'])),
+            batch_size=2000,
+        )
+        # bulk_create skips the signals that keep the category totals
+        rebuild_category_stats(BlogCategory.objects.filter(pk=category.pk))
+        request = Request(APIRequestFactory().get('/api/posts/'))
+        request.user = AnonymousUser()
+        projection = Projection(BlogPostListSerializer)
+        modes = {
+            'serializer + json (before)': (serializer_rows, JSONRenderer()),
+            'serializer + orjson': (serializer_rows, FastJSONRenderer()),
+            'projection + json': (projection_rows(projection), JSONRenderer()),
+            'projection + orjson': (projection_rows(projection), FastJSONRenderer()),
+        }
+        rows = []
+
+        try:
+            queryset = CategoryPostsView.category_posts(category.pk).order_by('-id')
+            baseline = None
+            for label, (serialize, renderer) in modes.items():
+                elapsed, count = self.run(queryset, serialize, renderer, request, options)
+                rate = count / elapsed
+                baseline = baseline or rate
+                rows.append({
+                    'mode': label,
+                    'rows': count,
+                    'rows/s': round(rate),
+                    'speedup': f'{rate / baseline:.2f}x',
+                })
+        finally:
+            BlogPost.objects.filter(author=user).delete()
+            user.delete()
+            category.delete()
+
+        self.stdout.write(f"{options['posts']} posts in pages of {options['page_size']}, "
+                          f"{options['repeat']} passes; query + serialize + render")
+        self.stdout.write(format_table(rows, ['mode', 'rows', 'rows/s', 'speedup']))
+
+    def run(self, queryset, serialize, renderer, request, options):
+        page_size = options['page_size']
+        count = 0
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            # Keyset pages on the primary key, so the queries stay cheap and serializing dominates
+            last = None
+            while True:
+                page = queryset.filter(id__lt=last) if last else queryset
+                data = serialize(page[:page_size], {'request': request})
+                if not data:
+                    break
+                renderer.render(data)
+                count += len(data)
+                last = data[-1]['id']
+        return time.perf_counter() - started, count
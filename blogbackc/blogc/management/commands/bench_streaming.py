@@ -0,0 +1,96 @@
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blogc.benchmarks import format_table
+from blogc.counters import rebuild_category_stats
+from blogc.models import BlogCategory, BlogPost
+from blogc.serializers import BlogPostListSerializer
+from blogc.streaming import JSON, NDJSON, stream_rows
+from blogc.views import CategoryPostsView
+
+
+def materialized(queryset, request):
+    # The whole list at once, as a Response would: rows, dicts, then the rendered body
+    data = BlogPostListSerializer(list(queryset), many=True, context={'request': request}).data
+    yield JSONRenderer().render(data)
+
+
+def streamed(fmt):
+    def run(queryset, request):
+        return stream_rows(
+            queryset, lambda rows: BlogPostListSerializer(rows, many=True, context={'request': request}).data, fmt
+        )
+    return run
+
+
+MODES = {
+    'materialized (Response)': materialized,
+    'stream json': streamed(JSON),
+    'stream ndjson': streamed(NDJSON),
+}
+
+
+class Command(BaseCommand):
+    help = 'Peak memory (tracemalloc) and time to first byte serving every post: materialized vs streamed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50_000)
+        parser.add_argument('--content-size', type=int, default=2000, help='Characters of content per post')
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'stream-{token}', password=None)
+        category = BlogCategory.objects.create(name=f'Stream {token}', slug=f'stream-{token}')
+        content = ('Lorem ipsum dolor sit amet. ' * (options['content_size'] // 28 + 1))[:options['content_size']]
+        BlogPost.objects.bulk_create(
+            (BlogPost(title=f'Stream {token} {i}', slug=f'stream-{token}-{i}', author=user,
+                      category=category, content=content) for i in range(options['posts'])),
+            batch_size=2000,
+        )
+        # bulk_create skips the signals that keep the category totals
+        rebuild_category_stats(BlogCategory.objects.filter(pk=category.pk))
+        request = Request(APIRequestFactory().get('/api/posts/', {'stream': 'json'}))
+        rows = []
+
+        try:
+            for label, mode in MODES.items():
+                queryset = CategoryPostsView.category_posts(category.pk)
+                first_byte, total, size = self.timed(mode(queryset, request))
+                # A second run under tracemalloc, which slows everything down
+                tracemalloc.start()
+                for _ in mode(queryset.all(), request):
+                    pass
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rows.append({
+                    'mode': label,
+                    'first row ms': round(first_byte * 1000, 1),
+                    'total s': round(total, 2),
+                    'body MB': round(size / 2**20, 1),
+                    'peak MB': round(peak / 2**20, 1),
+                })
+        finally:
+            BlogPost.objects.filter(author=user).delete()
+            user.delete()
+            category.delete()
+
+        self.stdout.write(f"{options['posts']} posts, {options['content_size']} characters of content each")
+        self.stdout.write(format_table(rows, ['mode', 'first row ms', 'total s', 'body MB', 'peak MB']))
+
+    def timed(self, chunks):
+        started = time.perf_counter()
+        first_byte = None
+        size = 0
+        for chunk in chunks:
+            # Not counting an opening '[' sent before the first query
+            if first_byte is None and len(chunk) > 1:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+        return first_byte, time.perf_counter() - started, size
@@ -0,0 +1,76 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from blogc.benchmarks import format_table
+from blogc.revocation import BlacklistRefreshToken, revoked
+from blogc.views import ClaimsTokenRefreshSerializer, MyTokenObtainPairSerializer
+
+MODES = {
+    # simplejwt's own serializer: a blacklist SELECT per check, User loads in blacklist()/outstand()
+    'stock': (TokenRefreshSerializer, RefreshToken),
+    'bloom filter': (ClaimsTokenRefreshSerializer, BlacklistRefreshToken),
+}
+
+
+class Command(BaseCommand):
+    help = 'Refresh-token rotation and blacklist-check throughput: stock simplejwt vs the in-process filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refreshes', type=int, default=200, help='Chained refreshes per mode')
+        parser.add_argument('--checks', type=int, default=2000, help='Blacklist checks per mode')
+        parser.add_argument('--revoked', type=int, default=10000, help='Blacklisted tokens to seed')
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        user = User.objects.create_user(username=prefix, password=None)
+        expires = timezone.now() + timedelta(days=1)
+        outstanding = OutstandingToken.objects.bulk_create([
+            OutstandingToken(jti=f'{prefix}-{i}', token='', expires_at=expires) for i in range(options['revoked'])
+        ], batch_size=1000)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=t) for t in outstanding], batch_size=1000)
+        revoked.reset()
+        rows = []
+
+        try:
+            for label, (serializer_class, token_class) in MODES.items():
+                token = str(MyTokenObtainPairSerializer.get_token(user))
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['refreshes']):
+                        serializer = serializer_class(data={'refresh': token})
+                        serializer.is_valid(raise_exception=True)
+                        token = serializer.validated_data['refresh']
+                refresh_elapsed = time.perf_counter() - started
+
+                # Checking a valid, unrevoked token: the common case
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as check_queries:
+                    for _ in range(options['checks']):
+                        token_class(token)
+                check_elapsed = time.perf_counter() - started
+
+                rows.append({
+                    'mode': label,
+                    'refreshes/s': round(options['refreshes'] / refresh_elapsed, 1),
+                    'queries/refresh': round(len(queries) / options['refreshes'], 2),
+                    'checks/s': round(options['checks'] / check_elapsed),
+                    'queries/check': round(len(check_queries) / options['checks'], 3),
+                })
+        finally:
+            OutstandingToken.objects.filter(user=user).delete()
+            OutstandingToken.objects.filter(jti__startswith=prefix).delete()
+            user.delete()
+            revoked.reset()
+
+        self.stdout.write(f"{options['revoked']} blacklisted tokens; filter stats: {revoked.stats}")
+        self.stdout.write(format_table(rows, ['mode', 'refreshes/s', 'queries/refresh', 'checks/s', 'queries/check']))
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from blogc.models import BlogCategoryStats, BlogPost
+
+# (label, URL, signed in); {post} and {category} are filled from the options
+ENDPOINTS = (
+    ('post list', '/api/posts/', False),
+    ('post list, signed in', '/api/posts/', True),
+    ('latest posts', '/api/posts/latest/', False),
+    ('my posts', '/api/posts/my-posts/', True),
+    ('category posts', '/api/categories/{category}/posts/', False),
+    ('post detail', '/api/posts/{post}/', False),
+    ('comments', '/api/posts/{post}/comments/', False),
+)
+
+# Plan lines meaning the database read more rows than it returns, or sorted them.
+# On PostgreSQL small tables get a Seq Scan whatever the indexes; use a realistic dataset.
+WARNINGS = {
+    'sqlite': ('USE TEMP B-TREE FOR ORDER BY',),
+    'postgresql': ('Seq Scan', 'Sort'),
+}
+
+
+def is_full_scan(vendor, line, tables):
+    # SQLite: "SCAN <table>" without "USING ... INDEX" reads the whole table
+    # ("SCAN subquery" reads rows another step produced)
+    if vendor == 'sqlite':
+        words = line.split()
+        return words[0] == 'SCAN' and words[1] in tables and ' USING ' not in line
+    return False
+
+
+class Command(BaseCommand):
+    help = ("Run each post endpoint once and print the database's EXPLAIN plan for every query it makes, "
+            "to check which index each one uses")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--post', type=int, help='Post for the detail and comment endpoints (default: most comments)')
+        parser.add_argument('--category', type=int, help='Category for the category endpoint (default: most posts)')
+        parser.add_argument('--user', type=int, help='Signed-in user (default: the author of --post)')
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--strict', action='store_true', help='Fail if any plan sorts or scans a whole table')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if options['analyze'] and vendor != 'postgresql':
+            raise CommandError('--analyze needs PostgreSQL')
+        post = self.pick_post(options['post'])
+        category_id = options['category'] or self.busiest_category(post)
+        user = post.author if options['user'] is None else User.objects.filter(pk=options['user']).first()
+        if user is None:
+            raise CommandError('No such user')
+        prefix = connection.ops.explain_query_prefix(**({'analyze': True} if options['analyze'] else {}))
+
+        self.tables = set(connection.introspection.table_names())
+        client = APIClient(SERVER_NAME=self.host())
+        warnings = 0
+        # An anonymous cache hit (the response and its ETag) makes no queries, so nothing would be explained
+        caches = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=caches):
+            for label, url, signed_in in ENDPOINTS:
+                url = url.format(post=post.pk, category=category_id)
+                client.force_authenticate(user if signed_in else None)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{label}: GET {url} returned {response.status_code}')
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: GET {url} ({len(queries)} queries)'))
+                for query in queries:
+                    warnings += self.explain(prefix, query['sql'], vendor)
+
+        if warnings:
+            message = f'{warnings} plan line(s) sort or scan a whole table'
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every query is answered from an index'))
+
+    def explain(self, prefix, sql, vendor):
+        """Print the plan for one captured query; returns how many of its lines are flagged."""
+        self.stdout.write(f'  {sql if len(sql) < 300 else sql[:297] + "..."}')
+        if not sql.lstrip('(').upper().startswith('SELECT'):
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            rows = cursor.fetchall()
+        flagged = 0
+        for row in rows:
+            # SQLite: (id, parent, notused, detail); PostgreSQL: one line of text per row
+            line = row[3] if vendor == 'sqlite' else ' '.join(str(value) for value in row)
+            bad = is_full_scan(vendor, line, self.tables) or any(word in line for word in WARNINGS.get(vendor, ()))
+            flagged += bad
+            self.stdout.write(('  ! ' if bad else '    ') + line)
+        return flagged
+
+    def pick_post(self, post_id):
+        posts = BlogPost.objects.select_related('author')
+        post = posts.filter(pk=post_id).first() if post_id else posts.order_by('-comments_count', '-id').first()
+        if post is None:
+            raise CommandError('No such post' if post_id else 'No posts to explain; create some first')
+        return post
+
+    def busiest_category(self, post):
+        stats = BlogCategoryStats.objects.order_by('-total_posts').first()
+        return stats.category_id if stats else post.category_id
+
+    def host(self):
+        return next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('.', '*'))), 'localhost')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from blogc.models import BlogPost
+from blogc.images import process_post_image
+
+
+class Command(BaseCommand):
+    help = 'Generate thumb/card/full WebP and JPEG variants for existing post images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        posts = BlogPost.objects.exclude(image='').exclude(image__isnull=True)
+        done = skipped = failed = 0
+        for post_id, image_name, variants in posts.values_list('id', 'image', 'image_variants').iterator():
+            if not options['force'] and variants.get('source') == image_name:
+                skipped += 1
+                continue
+            if process_post_image(post_id, force=options['force']):
+                done += 1
+                self.stdout.write(f'Processed post {post_id}: {image_name}')
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'Failed post {post_id}: {image_name}'))
+        self.stdout.write(self.style.SUCCESS(f'{done} processed, {skipped} already done, {failed} failed'))
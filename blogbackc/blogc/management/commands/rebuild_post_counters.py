@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blogc.counters import rebuild_category_stats, rebuild_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized post counters and the per-category stats table'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            updated = rebuild_post_counters()
+            categories = rebuild_category_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} posts and {categories} categories'))
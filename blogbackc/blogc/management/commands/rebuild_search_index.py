@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from blogc.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all blog posts'
+
+    def handle(self, *args, **kwargs):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('No search backend for this database')
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {backend.__class__.__name__}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from blogc.models import BlogPost
+from blogc.uploads import upload_pending
+
+
+class Command(BaseCommand):
+    help = 'Retry background image uploads left pending (e.g. after a restart)'
+
+    def handle(self, *args, **kwargs):
+        pending = BlogPost.objects.filter(image_status=BlogPost.IMAGE_PENDING).values_list('id', flat=True)
+        for post_id in list(pending):
+            status = upload_pending(post_id)
+            self.stdout.write(f'Post {post_id}: {status}')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,55 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from blogc.models import BlogCategory, BlogPost
+
+
+class Command(BaseCommand):
+    help = 'Create many same-titled posts from concurrent threads and check every slug is unique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:8]
+        title = f'Stress test {token}'
+        user = User.objects.create_user(username=f'slug-stress-{token}', password=None)
+        category = BlogCategory.objects.create(name=f'Slug stress {token}', slug=f'slug-stress-{token}')
+        errors = Counter()
+
+        def create(i):
+            try:
+                BlogPost.objects.create(title=title, author=user, category=category, content=f'Post {i}')
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            finally:
+                close_old_connections()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                list(pool.map(create, range(options['posts'])))
+            elapsed = time.perf_counter() - started
+
+            slugs = list(BlogPost.objects.filter(category=category).values_list('slug', flat=True))
+            self.stdout.write(
+                f'{len(slugs)} posts created by {options["workers"]} workers in {elapsed:.1f}s '
+                f'({len(slugs) / elapsed:.0f} posts/s), {len(set(slugs))} distinct slugs'
+            )
+            for name, count in errors.items():
+                self.stdout.write(self.style.ERROR(f'{count} x {name}'))
+        finally:
+            # Cascades to the posts
+            user.delete()
+            category.delete()
+
+        if errors or len(slugs) != options['posts'] or len(set(slugs)) != len(slugs):
+            raise CommandError('Slug allocation failed under concurrency')
+        self.stdout.write(self.style.SUCCESS('OK'))
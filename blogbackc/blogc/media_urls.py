@@ -0,0 +1,84 @@
+# media_urls.py
+"""
+Public URLs for stored media without a storage call per row.
+
+S3 (with or without a custom domain) and local FileSystemStorage both
+build URLs as <prefix> + filepath_to_uri(name). MediaURLResolver asks
+each storage for a URL once, derives that prefix, and from then on
+serializing a page of posts is string concatenation. Storages whose URLs
+don't follow the pattern (e.g. signed S3 URLs) are detected by the probe
+and keep going through storage.url().
+"""
+import threading
+
+from django.core.signals import setting_changed
+from django.utils.encoding import filepath_to_uri
+
+PROBE_NAMES = ('blogc-probe/a.png', 'blogc-probe/b c.png')
+UNSUPPORTED = object()
+
+
+class MediaURLResolver:
+    def __init__(self):
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._prefixes.clear()
+
+    def prefix_for(self, storage):
+        key = id(storage)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            prefix = self._probe(storage)
+            with self._lock:
+                self._prefixes[key] = prefix
+        return prefix
+
+    def _probe(self, storage):
+        prefixes = set()
+        for name in PROBE_NAMES:
+            url = storage.url(name)
+            suffix = filepath_to_uri(name)
+            if '?' in url or not url.endswith(suffix):
+                return UNSUPPORTED
+            prefixes.add(url[:-len(suffix)])
+        return prefixes.pop() if len(prefixes) == 1 else UNSUPPORTED
+
+    def url(self, name, storage, request=None):
+        """Absolute URL for `name` in `storage` (relative if there's no request)."""
+        prefix = self.prefix_for(storage)
+        if prefix is UNSUPPORTED:
+            url = storage.url(name)
+        else:
+            url = prefix + filepath_to_uri(name).lstrip('/')
+        if request is not None and not url.startswith(('http://', 'https://')):
+            url = self.origin(request) + url
+        return url
+
+    def origin(self, request):
+        # scheme://host, worked out once per request
+        origin = getattr(request, '_blogc_media_origin', None)
+        if origin is None:
+            origin = request.build_absolute_uri('/').rstrip('/')
+            request._blogc_media_origin = origin
+        return origin
+
+
+resolver = MediaURLResolver()
+
+
+def media_url(field_file, request=None):
+    """Public URL of a FieldFile (e.g. post.image), or None if it's empty."""
+    if not field_file:
+        return None
+    return resolver.url(field_file.name, field_file.storage, request)
+
+
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in ('MEDIA_URL', 'MEDIA_ROOT', 'STORAGES') or setting.startswith('AWS_'):
+        resolver.clear()
+
+
+setting_changed.connect(_reset_on_setting_change)
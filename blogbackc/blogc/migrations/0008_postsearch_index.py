@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# A frozen copy of blogc.search's DDL as of this migration, so later changes
+# to search.py can't change what this migration does. Databases without a
+# built-in backend (BACKENDS in search.py) get no index. The author table is
+# filled in from the historical BlogPost.author, so a custom user model works.
+SOURCE = """
+    FROM blogc_blogpost p
+    INNER JOIN %(user_table)s u ON u.%(user_pk)s = p.author_id
+    LEFT OUTER JOIN blogc_blogcategory c ON c.id = p.category_id
+"""
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS blogc_postsearch "
+        "USING fts5(title, content, category, author, tokenize='porter unicode61')",
+        "INSERT INTO blogc_postsearch (rowid, title, content, category, author) "
+        "SELECT p.id, p.title, p.content, COALESCE(c.name, ''), %(username)s" + SOURCE,
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS blogc_postsearch ("
+        "post_id bigint PRIMARY KEY REFERENCES blogc_blogpost (id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS blogc_postsearch_document_gin ON blogc_postsearch USING GIN (document)",
+        "INSERT INTO blogc_postsearch (post_id, document) "
+        "SELECT p.id, "
+        "setweight(to_tsvector('english', p.title), 'A') || "
+        "setweight(to_tsvector('english', COALESCE(c.name, '')), 'B') || "
+        "setweight(to_tsvector('simple', %(username)s), 'B') || "
+        "setweight(to_tsvector('english', p.content), 'D')" + SOURCE,
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    quote = schema_editor.connection.ops.quote_name
+    user = apps.get_model('blogc', 'BlogPost')._meta.get_field('author').related_model
+    username = user._meta.get_field(getattr(user, 'USERNAME_FIELD', 'username')).column
+    names = {
+        'user_table': quote(user._meta.db_table),
+        'user_pk': quote(user._meta.pk.column),
+        'username': f'u.{quote(username)}',
+    }
+    for sql in CREATE.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql % names)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute('DROP TABLE IF EXISTS blogc_postsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0007_blogpost_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:18
+
+import blogc.storage_backends
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0008_postsearch_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=blogc.storage_backends.media_storage, upload_to='post_images/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+def mark_existing_images_ready(apps, schema_editor):
+    BlogPost = apps.get_model('blogc', 'BlogPost')
+    BlogPost.objects.exclude(image='').exclude(image__isnull=True).update(image_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0009_blogpost_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No image'), ('pending', 'Uploading'), ('ready', 'Ready'), ('failed', 'Upload failed')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='pending_image',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(mark_existing_images_ready, migrations.RunPython.noop),
+    ]
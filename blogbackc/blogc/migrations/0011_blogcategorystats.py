@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_stats(apps, schema_editor):
+    BlogCategory = apps.get_model('blogc', 'BlogCategory')
+    BlogCategoryStats = apps.get_model('blogc', 'BlogCategoryStats')
+    BlogPost = apps.get_model('blogc', 'BlogPost')
+
+    BlogCategoryStats.objects.bulk_create(
+        [BlogCategoryStats(category_id=pk) for pk in BlogCategory.objects.values_list('pk', flat=True)]
+    )
+    posts = BlogPost.objects.filter(category=OuterRef('category')).order_by().values('category')
+    BlogCategoryStats.objects.update(
+        total_posts=Coalesce(Subquery(posts.annotate(c=Count('pk')).values('c')), 0),
+        total_comments=Coalesce(Subquery(posts.annotate(c=Sum('comments_count')).values('c')), 0),
+        total_likes=Coalesce(Subquery(posts.annotate(c=Sum('likes_count')).values('c')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0010_blogpost_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogCategoryStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='blogc.blogcategory')),
+                ('total_posts', models.PositiveIntegerField(default=0)),
+                ('total_comments', models.PositiveIntegerField(default=0)),
+                ('total_likes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
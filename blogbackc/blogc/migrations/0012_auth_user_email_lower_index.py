@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Case-insensitive email index on auth_user for blogc.backends.IdentifierBackend,
+    which looks users up by lower(email). auth_user belongs to
+    django.contrib.auth, so the index is created with plain SQL.
+    """
+
+    dependencies = [
+        ('blogc', '0011_blogcategorystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS blogc_auth_user_email_lower ON auth_user (LOWER(email))',
+            'DROP INDEX IF EXISTS blogc_auth_user_email_lower',
+        ),
+    ]
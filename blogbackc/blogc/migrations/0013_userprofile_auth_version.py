@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0012_auth_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='auth_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,8 +2,9 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.utils.text import slugify  # Add this import
-from .storage_backends import MediaStorage
+from .excerpts import MAX_EXCERPT_LENGTH, summarize
+from .slugs import save_with_unique_slug
+from .storage_backends import media_storage
 
 # Extended profile to include blog admin flag and role
 class UserProfile(models.Model):
@@ -15,6 +16,8 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     is_blog_admin = models.BooleanField(default=False)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='admin')
+    # Bumped when role/is_blog_admin change; JWTs carrying an older one are refused (see authentication.py)
+    auth_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
@@ -28,33 +31,88 @@ class BlogCategory(models.Model):
         return self.name
 
 
+class BlogCategoryStats(models.Model):
+    """Per-category totals, kept in step incrementally by blogc.counters."""
+    category = models.OneToOneField(BlogCategory, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_posts = models.PositiveIntegerField(default=0)
+    total_comments = models.PositiveIntegerField(default=0)
+    total_likes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'Stats for {self.category_id}'
+
+
 class BlogPost(models.Model):
+    IMAGE_NONE = 'none'
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_NONE, 'No image'),
+        (IMAGE_PENDING, 'Uploading'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Upload failed'),
+    ]
+
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     category = models.ForeignKey(BlogCategory, on_delete=models.SET_NULL, null=True, related_name='posts')
     content = models.TextField()
-    image = models.ImageField(upload_to='post_images/', storage=MediaStorage(), null=True, blank=True)
+    image = models.ImageField(upload_to='post_images/', storage=media_storage, null=True, blank=True)
+    # Resized copies of `image`, written by blogc.images:
+    # {"source": <image name>, "thumb": {"webp": <name>, "jpeg": <name>, "width": .., "height": ..}, ...}
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Set while blogc.uploads pushes a spooled upload to storage
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default=IMAGE_NONE)
+    pending_image = models.CharField(max_length=500, blank=True)
     published = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in sync by blogc.counters
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Derived from `content` by save(); see blogc.excerpts
+    excerpt = models.CharField(max_length=MAX_EXCERPT_LENGTH, blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveIntegerField(default=0)  # minutes
+
+    SUMMARY_FIELDS = ('excerpt', 'word_count', 'reading_time')
 
     class Meta:
         ordering = ['-created_at']
+        # One per list query, each ending in the keyset pagination order
+        # (created_at, id) so pages are read in index order without a sort.
+        # `manage.py explain_queries` shows which one each endpoint uses.
+        indexes = [
+            # /posts/
+            models.Index(fields=['-created_at', '-id'], name='blogc_post_created_idx'),
+            # /posts/latest/
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(published=True),
+                         name='blogc_post_published_idx'),
+            # /categories/<pk>/posts/
+            models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(published=True),
+                         name='blogc_post_category_idx'),
+            # /posts/my-posts/
+            models.Index(fields=['author', '-created_at', '-id'], name='blogc_post_author_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        # FIXED: Proper indentation
+        # A pending upload keeps its status until blogc.uploads finishes it
+        if self.image_status != self.IMAGE_PENDING:
+            self.image_status = self.IMAGE_READY if self.image else self.IMAGE_NONE
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            for name, value in summarize(self.content).items():
+                setattr(self, name, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.SUMMARY_FIELDS}
         if not self.slug:
-            self.slug = slugify(self.title)
-            # Ensure unique slug
-            base_slug = self.slug
-            counter = 1
-            while BlogPost.objects.filter(slug=self.slug).exists():
-                self.slug = f"{base_slug}-{counter}"
-                counter += 1
+            # Picks a free slug in one query, retrying if a concurrent save takes it
+            return save_with_unique_slug(self, lambda: super(BlogPost, self).save(*args, **kwargs))
         super().save(*args, **kwargs)
 
 class Comment(models.Model):
@@ -66,6 +124,13 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # /posts/<id>/comments/ and the page embedded in post detail
+            models.Index(fields=['post', 'created_at', 'id'], condition=models.Q(active=True),
+                         name='blogc_comment_post_idx'),
+            # my_comments_count in viewer.py
+            models.Index(fields=['user', 'post'], condition=models.Q(active=True), name='blogc_comment_user_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.user.username} on {self.post.title}'
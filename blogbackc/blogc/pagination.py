@@ -0,0 +1,206 @@
+# pagination.py
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (<ordering field>, id).
+
+    The ordering field is taken from the queryset (so `?ordering=` from
+    OrderingFilter keeps working) and falls back to the model's Meta.ordering.
+    Pages are fetched with a `WHERE (field, id) < (value, id)` style filter
+    instead of OFFSET, and no COUNT(*) is issued: we read one extra row to
+    know whether there is a next page.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    tiebreak_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = list(self.window(queryset, request))
+        return self.build_page(rows)
+
+    def window(self, queryset, request):
+        """The unevaluated queryset for the page `request` asks for."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        return self.page_queryset(queryset)
+
+    def first_page(self, queryset, request, url):
+        """
+        The first page of `queryset`, for embedding in another resource.
+        Links point at `url`, the endpoint that serves the remaining pages.
+        """
+        return self.build_page(list(self.first_page_queryset(queryset, request, url)))
+
+    def first_page_queryset(self, queryset, request, url):
+        self.request = request
+        self.base_url = request.build_absolute_uri(url)
+        self.cursor = None
+        return self.page_queryset(queryset)
+
+    # Async twins of the above for the views in async_views.py
+    async def apaginate_queryset(self, queryset, request):
+        return self.build_page([row async for row in self.window(queryset, request).aiterator()])
+
+    async def afirst_page(self, queryset, request, url):
+        return self.build_page([row async for row in self.first_page_queryset(queryset, request, url).aiterator()])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    # ---- queryset side (no database access) ----
+
+    def get_ordering(self, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        field = ordering[0] if ordering else '-' + self.tiebreak_field
+        return field.lstrip('-'), field.startswith('-')
+
+    def page_queryset(self, queryset):
+        """
+        Return the sliced queryset for the current cursor. Kept separate from
+        paginate_queryset() so callers can evaluate it however they like.
+        """
+        self.field, self.descending = self.get_ordering(queryset)
+        cursor = getattr(self, 'cursor', None)
+        reverse = bool(cursor and cursor['r'])
+        descending = self.descending != reverse
+
+        if cursor:
+            op = 'lt' if descending else 'gt'
+            value = self.cursor_value(queryset, cursor['v'])
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{op}': value}) |
+                Q(**{self.field: value, f'{self.tiebreak_field}__{op}': cursor['id']})
+            )
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(prefix + self.field, prefix + self.tiebreak_field)
+        return queryset[:self.page_size + 1]
+
+    def cursor_value(self, queryset, value):
+        """The cursor's ordering value as a Python value of the ordering field."""
+        try:
+            field = self.ordering_field(queryset)
+            if field is not None:
+                value = field.to_python(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                # An annotation of unknown type (the search rank): numbers only
+                raise ValidationError(value)
+        except (AttributeError, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    def ordering_field(self, queryset):
+        annotation = queryset.query.annotations.get(self.field)
+        if annotation is not None:
+            try:
+                return annotation.output_field
+            except FieldError:
+                return None
+        model = queryset.model
+        *path, name = self.field.split(LOOKUP_SEP)
+        for step in path:
+            model = model._meta.get_field(step).related_model
+        return model._meta.get_field(name)
+
+    # ---- result side ----
+
+    def build_page(self, rows):
+        cursor = getattr(self, 'cursor', None)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if cursor and cursor['r']:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # ---- cursor encoding ----
+
+    def _link(self, row, reverse):
+        value = getattr(row, self.field)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.isoformat()
+        payload = {'v': value, 'id': getattr(row, self.tiebreak_field), 'r': int(reverse)}
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(payload))
+
+    def encode_cursor(self, payload):
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            cursor = {'v': payload['v'], 'id': payload['id'], 'r': int(payload.get('r', 0))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # The ordering value is checked against its field in page_queryset()
+        if type(cursor['id']) is not int:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+class PostCursorPagination(KeysetPagination):
+    page_size = settings.BLOGC_SETTINGS['MAX_POSTS_PER_PAGE']
+
+
+class LatestPostsPagination(PostCursorPagination):
+    page_size = 5
+
+
+class CommentCursorPagination(KeysetPagination):
+    page_size = settings.BLOGC_SETTINGS.get('COMMENTS_PER_PAGE', 20)
+    max_page_size = settings.BLOGC_SETTINGS['MAX_COMMENTS_PER_POST']
@@ -10,18 +10,12 @@ class IsBlogAdmin(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        # Get profile using the correct related name
+        # A ClaimsUser answers from its token; a User from its profile row.
+        # No profile means no admin rights (signals.ensure_user_profile creates one).
         try:
             profile = request.user.profile
             return bool(profile and profile.is_blog_admin)
-        except UserProfile.DoesNotExist:
-            # If profile doesn't exist, try to create it
-            UserProfile.objects.get_or_create(
-                user=request.user, 
-                defaults={'role': 'user', 'is_blog_admin': False}
-            )
-            return False
-        except AttributeError:
+        except (UserProfile.DoesNotExist, AttributeError):
             return False
 
 
@@ -40,5 +34,6 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if prof and getattr(prof, 'is_blog_admin', False):
             return True
         
-        # Otherwise, only the author can edit/delete
-        return obj.author == request.user
+        # Otherwise, only the author can edit/delete (comments use `user`)
+        owner_id = getattr(obj, 'author_id', None) or getattr(obj, 'user_id', None)
+        return owner_id == request.user.id
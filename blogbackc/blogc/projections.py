@@ -0,0 +1,413 @@
+# projections.py
+"""
+Compiled read-only serializers for the hot list endpoints.
+
+On a list, DRF builds a model instance per row, then for every field of
+every row resolves its source, checks for None and calls
+to_representation, nested serializers included. A projection does that
+resolution once per serializer class: Projection walks the
+serializer's fields and records, for each output key:
+
+- a plain model field: the column to read (`author__username` for a
+  nested serializer) and whether its to_representation is the identity
+  (strings, ints and bools are) or must still be called (datetimes,
+  which get an inlined ISO 8601 conversion);
+- a nested serializer: its own plan, or None when the FK is null;
+- a SerializerMethodField: the columns and function registered for it
+  in METHODS below, since a method on an instance can't be compiled.
+
+The page is then fetched with values_list() and each row turned into a
+dict by index. Nothing is instantiated per row. The output is the same
+JSON as the serializer's (ProjectionContractTests checks that byte for
+byte), so only serializers listed in PROJECTED are projected, and a
+field the compiler doesn't understand is an ImproperlyConfigured error,
+not a silent difference. BLOGC_SETTINGS['PROJECTION_SERIALIZERS'] =
+False goes back to the serializers.
+
+With a sparse fieldset (see fieldsets.py) the plan is compiled for just
+the selected fields, so values_list() reads only their columns; one
+Projection is cached per fieldset. narrow() gives the serializer path
+the same saving with .only().
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from . import images
+from .fieldsets import requested_fields
+from .media_urls import resolver
+from .models import BlogPost
+from .serializers import (
+    BlogPostListSerializer, CommentSerializer, PostImageFieldsMixin, UserSerializer, ViewerFlagsMixin,
+)
+from .viewer import DEFAULT_FLAGS, viewer_flags
+
+# Serializer field -> model fields whose values it returns unchanged
+IDENTITY_FIELDS = {
+    serializers.CharField: {'CharField', 'TextField', 'SlugField', 'EmailField', 'URLField'},
+    serializers.IntegerField: {
+        'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+        'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+    },
+    serializers.BooleanField: {'BooleanField'},
+}
+
+_image_storage = BlogPost._meta.get_field('image').storage
+
+# Compiled fieldsets kept per serializer class; past this, others are compiled per request
+MAX_PROJECTIONS = 64
+
+# model -> columns an instance must always load: read by its post_init signal
+# handler, so deferring them would cost a query per row (see narrow)
+ALWAYS_LOADED = {
+    BlogPost: ('category',),
+}
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def _flag(name):
+    def get(context, pk):
+        return context['viewer_flags'].get(pk, DEFAULT_FLAGS)[name]
+    return get
+
+
+def _image(context, name):
+    # PostImageFieldsMixin.get_image
+    if not name:
+        return None
+    try:
+        return resolver.url(name, _image_storage, context.get('request'))
+    except Exception as e:
+        print(f"Error getting image URL for {name}: {e}")
+        return None
+
+
+def _image_srcset(context, name, variants):
+    return images.srcset_for(name, variants, _image_storage, context.get('request'))
+
+
+# serializer class or mixin -> {method field: (columns, function(context, *column values))}
+METHODS = {
+    UserSerializer: {
+        # No profile row reads as NULL through the LEFT JOIN
+        'role': (('profile__role',), lambda context, role: 'user' if role is None else role),
+        'is_blog_admin': (('profile__is_blog_admin',), lambda context, flag: bool(flag)),
+    },
+    ViewerFlagsMixin: {
+        'liked_by_me': (('id',), _flag('liked_by_me')),
+        'my_comments_count': (('id',), _flag('my_comments_count')),
+    },
+    PostImageFieldsMixin: {
+        'image': (('image',), _image),
+        'image_srcset': (('image', 'image_variants'), _image_srcset),
+    },
+}
+
+
+def _prepare_viewer_flags(rows, context):
+    # ViewerFlagsListSerializer: one lookup for the page
+    request = context.get('request')
+    flags = context.setdefault('viewer_flags', {})
+    flags.update(viewer_flags(getattr(request, 'user', None), [row.id for row in rows if row.id not in flags]))
+
+
+# serializer class -> (keys, function(rows, context)) run once per page
+# before the rows are built, if the plan has any of the keys
+PREPARE = {
+    BlogPostListSerializer: (('liked_by_me', 'my_comments_count'), _prepare_viewer_flags),
+}
+
+# serializer class -> ((key, annotation), ...): keys its to_representation
+# adds after the fields when the queryset has the annotation and it isn't None
+EXTRAS = {
+    BlogPostListSerializer: (('highlight', 'search_highlight'),),
+}
+
+PROJECTED = (BlogPostListSerializer, CommentSerializer)
+
+
+class Plan:
+    """How to build one serializer's output from a values_list() row."""
+
+    def __init__(self, serializer_class, steps, columns):
+        self.serializer_class = serializer_class
+        # (key, kind, args); kind is 'value', 'nested' or 'method'
+        self.steps = steps
+        self.columns = columns
+
+    def bind(self, positions, tz):
+        """
+        A function(row, context) -> dict, for rows laid out as `positions`
+        ({column: index}), with datetimes in `tz`.
+        """
+        getters = []
+        for key, kind, args in self.steps:
+            if kind == 'value':
+                column, convert = args
+                if isinstance(convert, serializers.DateTimeField):
+                    getters.append((key, _datetime_getter(positions[column], convert, tz)))
+                else:
+                    getters.append((key, _value_getter(positions[column], convert)))
+            elif kind == 'nested':
+                null_column, plan = args
+                getters.append((key, _nested_getter(positions[null_column], plan.bind(positions, tz))))
+            else:
+                columns, func = args
+                getters.append((key, _method_getter([positions[c] for c in columns], func)))
+
+        def build(row, context):
+            return {key: get(row, context) for key, get in getters}
+        return build
+
+
+def _value_getter(index, convert):
+    if convert is None:
+        get = itemgetter(index)
+        return lambda row, context: get(row)
+
+    def get_converted(row, context):
+        value = row[index]
+        return None if value is None else convert(value)
+    return get_converted
+
+
+def _datetime_getter(index, field, tz):
+    # DateTimeField.to_representation for ISO 8601 output, with the
+    # timezone looked up once per page rather than once per value
+    def get_datetime(row, context):
+        value = row[index]
+        if value is None:
+            return None
+        if tz is None or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return get_datetime
+
+
+def _nested_getter(index, build):
+    def get_nested(row, context):
+        return None if row[index] is None else build(row, context)
+    return get_nested
+
+
+def _method_getter(indexes, func):
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda row, context: func(context, row[index])
+    return lambda row, context: func(context, *[row[i] for i in indexes])
+
+
+def _column(model, field, prefix):
+    """(values() path, model field) for a field's source, checked against the model."""
+    path = []
+    model_field = None
+    for attr in field.source_attrs:
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is None or model_field.many_to_many or model_field.one_to_many:
+            raise ImproperlyConfigured(f'{field.parent.__class__.__name__}.{field.field_name}: '
+                                       f'{".".join(field.source_attrs)} is not a column of {model.__name__}')
+        path.append(attr)
+        if model_field.is_relation:
+            model = model_field.related_model
+    return prefix + '__'.join(path), model_field
+
+
+def _is_identity(field, model_field):
+    internal_type = model_field.get_internal_type()
+    return any(
+        isinstance(field, field_class) and internal_type in model_types
+        for field_class, model_types in IDENTITY_FIELDS.items()
+    )
+
+
+def _is_iso_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return (
+        type(field) is serializers.DateTimeField and not hasattr(field, 'timezone')
+        and isinstance(output_format, str) and output_format.lower() == ISO_8601
+    )
+
+
+def _methods(serializer_class):
+    methods = {}
+    for klass in reversed(serializer_class.__mro__):
+        methods.update(METHODS.get(klass, {}))
+    return methods
+
+
+def _compile(serializer, prefix, columns, strict=True):
+    """
+    The Plan for `serializer`. With strict=False a to_representation
+    override is allowed, for callers that only want the columns.
+    """
+    serializer_class = type(serializer)
+    own = serializer_class.to_representation is not serializers.Serializer.to_representation
+    if strict and own and serializer_class not in EXTRAS:
+        raise ImproperlyConfigured(f'{serializer_class.__name__} overrides to_representation; '
+                                   f'register what it adds in projections.EXTRAS')
+    model = serializer.Meta.model
+    methods = _methods(serializer_class)
+    steps = []
+
+    def use(column):
+        if column not in columns:
+            columns.append(column)
+        return column
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        name = field.field_name
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in methods:
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: '
+                                           f'register the method field in projections.METHODS')
+            method_columns, func = methods[name]
+            steps.append((name, 'method', ([use(prefix + c) for c in method_columns], func)))
+        elif isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: many=True is not projected')
+            fk_column = use(_column(model, field, prefix)[0])
+            nested = _compile(field, fk_column + '__', columns, strict)
+            steps.append((name, 'nested', (fk_column, nested)))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            # values('<fk>') is the related pk
+            steps.append((name, 'value', (use(_column(model, field, prefix)[0]), None)))
+        elif isinstance(field, serializers.RelatedField) or field.source == '*':
+            raise ImproperlyConfigured(f'{serializer_class.__name__}.{name}: {type(field).__name__} is not projected')
+        else:
+            column, model_field = _column(model, field, prefix)
+            if _is_identity(field, model_field):
+                convert = None
+            elif _is_iso_datetime(field):
+                convert = field  # see Plan.bind
+            else:
+                convert = field.to_representation
+            steps.append((name, 'value', (use(column), convert)))
+    return Plan(serializer_class, steps, columns)
+
+
+class Projection:
+    def __init__(self, serializer_class, fieldset=None):
+        self.serializer_class = serializer_class
+        self.fieldset = fieldset
+        self.plan = _compile(serializer_class(context={'fieldset': fieldset}), '', [])
+        keys, prepare = PREPARE.get(serializer_class, ((), None))
+        self.prepare = prepare if any(step[0] in keys for step in self.plan.steps) else None
+        self.extras = EXTRAS.get(serializer_class, ())
+        self._bound = {}
+
+    def values(self, queryset):
+        """
+        `queryset` as named values_list() rows with the plan's columns, plus
+        its ordering fields so pagination can build cursors from the rows.
+        """
+        columns = list(self.plan.columns)
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        # Expressions (OrderBy) aren't columns pagination can read back
+        for name in (*(name for name in ordering if isinstance(name, str)), 'id'):
+            name = name.lstrip('-')
+            if name not in columns:
+                columns.append(name)
+        for _, annotation in self.extras:
+            if annotation in queryset.query.annotations and annotation not in columns:
+                columns.append(annotation)
+        return queryset.values_list(*columns, named=True)
+
+    def _builder(self, fields):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        builder = self._bound.get((fields, tz))
+        if builder is None:
+            positions = {name: index for index, name in enumerate(fields)}
+            build = self.plan.bind(positions, tz)
+            extras = [(key, positions[annotation]) for key, annotation in self.extras if annotation in positions]
+            if extras:
+                build = _with_extras(build, extras)
+            builder = self._bound[fields, tz] = build
+        return builder
+
+    def serialize(self, rows, context):
+        """The serializer's many=True .data for rows from values()."""
+        rows = list(rows)
+        if not rows:
+            return []
+        if self.prepare is not None:
+            self.prepare(rows, context)
+        # Named rows order annotations after fields, so index by the row's own layout
+        build = self._builder(rows[0]._fields)
+        return [build(row, context) for row in rows]
+
+
+def _with_extras(build, extras):
+    def build_with_extras(row, context):
+        data = build(row, context)
+        for key, index in extras:
+            if row[index] is not None:
+                data[key] = row[index]
+        return data
+    return build_with_extras
+
+
+_projections = {}
+
+
+def get_projection(serializer_class, fieldset=None):
+    """The compiled Projection for serializer_class, or None to use the serializer."""
+    if not _setting('PROJECTION_SERIALIZERS', True) or serializer_class not in PROJECTED:
+        return None
+    key = (serializer_class, fieldset)
+    projection = _projections.get(key)
+    if projection is None:
+        projection = Projection(serializer_class, fieldset)
+        if fieldset is None or len(_projections) < MAX_PROJECTIONS:
+            _projections[key] = projection
+    return projection
+
+
+def narrow(queryset, serializer_class, fieldset):
+    """
+    `queryset` loading only what serializer_class reads with `fieldset`:
+    .only() those columns, joining only the relations they come from.
+    Unchanged for fieldset None, unless the default fields leave some
+    optional ones out.
+    """
+    if fieldset is None and not getattr(serializer_class, 'optional_fields', ()):
+        return queryset
+    model = queryset.model
+    columns = _compile(serializer_class(context={'fieldset': fieldset}), '', [], strict=False).columns
+    concrete = {field.name for field in model._meta.concrete_fields}
+    # Plus the pk and ordering fields, which pagination reads off the instances
+    ordering = [name.lstrip('-') for name in queryset.query.order_by or model._meta.ordering if isinstance(name, str)]
+    names = {*columns, model._meta.pk.name, *ALWAYS_LOADED.get(model, ()), *(set(ordering) & concrete)}
+    relations = {column.rsplit('__', 1)[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*names)
+
+
+def serialize_page(paginator, queryset, request, serializer_class, context=None):
+    """
+    paginator.paginate_queryset() and serializer_class(page, many=True).data
+    in one, projected when serializer_class has a projection, and limited
+    to the fields the request selects with ?fields=/?omit=.
+    """
+    context = {'request': request} if context is None else context
+    fieldset = context['fieldset'] = requested_fields(request, serializer_class)
+    projection = get_projection(serializer_class, fieldset)
+    if projection is None:
+        page = paginator.paginate_queryset(narrow(queryset, serializer_class, fieldset), request)
+        return serializer_class(page, many=True, context=context).data
+    page = paginator.paginate_queryset(projection.values(queryset), request)
+    return projection.serialize(page, context)
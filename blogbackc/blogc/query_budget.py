@@ -0,0 +1,137 @@
+# query_budget.py
+"""
+Per-endpoint SQL query budgets.
+
+Views declare the most queries a handler may run with @query_budget(n),
+on the handler method (get(), a viewset action) or, for generic views
+whose get() is inherited, on the class.
+The number covers the whole request, authentication included, on a
+response-cache miss, and must not depend on how many rows are in the
+tables: an N+1 shows up as a budget that only holds for small data.
+
+QueryBudgetTests (tests.py) requests every budgeted GET endpoint in
+blogc.urls against seeded data of several sizes. QueryBudgetMiddleware
+is an optional dev-mode check that logs requests going over budget,
+with the SQL and the stack that issued each query.
+"""
+import logging
+import traceback
+
+from django.db import connection
+from django.urls import URLPattern, URLResolver
+
+logger = logging.getLogger(__name__)
+
+
+def query_budget(max_queries, method='GET'):
+    """Declare the maximum number of SQL queries for a view handler or view class."""
+    def decorator(target):
+        if isinstance(target, type):
+            target.query_budgets = {**getattr(target, 'query_budgets', {}), method.upper(): max_queries}
+        else:
+            target.query_budget = max_queries
+        return target
+    return decorator
+
+
+def view_handler(view_func, method):
+    """The function that handles `method` for a resolved view, or None."""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return view_func
+    actions = getattr(view_func, 'actions', None)
+    name = actions.get(method.lower()) if actions else method.lower()
+    return getattr(view_class, name, None) if name else None
+
+
+def budget_for(view_func, method):
+    budget = getattr(view_handler(view_func, method), 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budgets', {}).get(method.upper())
+    return budget
+
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name, pattern.callback, prefix + str(pattern.pattern)
+
+
+def iter_endpoints():
+    """Yield (url name, view function, route) for each named route in blogc.urls."""
+    from . import urls
+
+    seen = set()
+    for name, view_func, route in _walk(urls.urlpatterns):
+        # The router adds a ".json"-style format route under the same name
+        if name not in seen:
+            seen.add(name)
+            yield name, view_func, route
+
+
+def unbudgeted_endpoints(method='GET', ignore=('api-root',)):
+    """Names of routes that accept `method` but declare no budget for it."""
+    missing = []
+    for name, view_func, route in iter_endpoints():
+        if name in ignore or view_handler(view_func, method) is None:
+            continue
+        if budget_for(view_func, method) is None:
+            missing.append(name)
+    return missing
+
+
+class QueryCounter:
+    """Context manager recording every query run on the default connection."""
+
+    def __init__(self, with_stacks=False):
+        self.with_stacks = with_stacks
+        self.queries = []
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = None
+        if self.with_stacks:
+            # Project frames only; the ORM/DRF frames are the same every time
+            stack = [f for f in traceback.extract_stack()[:-1] if 'site-packages' not in f.filename]
+        self.queries.append((sql, stack))
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """
+    Log requests that run more queries than their view's budget.
+    Meant for development; enabled in settings with QUERY_BUDGET_MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter(with_stacks=True) as counter:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        budget = budget_for(match.func, request.method) if match else None
+        if budget is not None and len(counter) > budget:
+            lines = [
+                f'{request.method} {request.get_full_path()} ({match.view_name}) ran '
+                f'{len(counter)} queries, budget is {budget}:'
+            ]
+            for i, (sql, stack) in enumerate(counter.queries, 1):
+                lines.append(f'  [{i}] {sql}')
+                lines.extend('      ' + line for line in ''.join(traceback.format_list(stack[-4:])).splitlines())
+            logger.warning('\n'.join(lines))
+        return response
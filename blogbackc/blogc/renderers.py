@@ -0,0 +1,59 @@
+# renderers.py
+"""
+JSON rendering through orjson when it's installed.
+
+dumps() gives the same bytes as DRF's JSONRenderer in its default compact
+form: no spaces, non-ASCII left as UTF-8, U+2028/U+2029 escaped, and
+datetimes, Decimals and lazy strings encoded by DRF's JSONEncoder. Anything
+orjson can't take (ints beyond 64 bits, say) goes through the standard
+encoder instead, as does everything when orjson isn't installed.
+
+Not covered: floats that print in exponent form (orjson writes 1e-7
+where json writes 1e-07) and NaN/Infinity (null rather than an error).
+None of the API's payloads carry floats.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+if orjson is not None:
+    # Datetimes go to DRF's encoder, which formats them its own way
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _escape_separators(data):
+    # JSONRenderer escapes these so the output is also valid JavaScript
+    if b'\xe2\x80' in data:
+        data = data.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return data
+
+
+def _dumps_stdlib(obj):
+    return _escape_separators(_encoder.encode(obj).encode())
+
+
+def dumps(obj):
+    """obj as compact JSON bytes, identical to JSONRenderer().render(obj)."""
+    if orjson is None:
+        return _dumps_stdlib(obj)
+    try:
+        return _escape_separators(orjson.dumps(obj, default=_encoder.default, option=_OPTIONS))
+    except (TypeError, orjson.JSONEncodeError):
+        return _dumps_stdlib(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer via dumps(); indented output (?indent= in Accept) still uses the stdlib path."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
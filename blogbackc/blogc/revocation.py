@@ -0,0 +1,230 @@
+# revocation.py
+"""
+Refresh-token revocation without a query per check.
+
+Revoked JTIs are stored durably by simplejwt's token_blacklist app
+(OutstandingToken / BlacklistedToken). Its stock check runs a SELECT on
+every refresh; BlacklistRefreshToken asks RevokedTokens instead, an
+in-process Bloom filter of blacklisted JTIs:
+
+- a miss (the normal case: the token was never revoked) answers
+  without touching the database;
+- a hit may be a false positive (about BLACKLIST_FILTER_ERROR_RATE of
+  them), so it is confirmed with one query.
+
+The filter is brought up to date incrementally, at most every
+BLACKLIST_SYNC_INTERVAL seconds, and rebuilt from scratch every
+BLACKLIST_REBUILD_INTERVAL (or when it fills up) so pruned entries drop
+out. Blacklist ids are handed out at insert but rows show up at commit,
+so a row can appear below ids already seen; each sync therefore re-reads
+every row above the highest id seen BLACKLIST_SYNC_MARGIN seconds ago,
+not just the rows above the newest. A token revoked by another process
+passes the filter for up to BLACKLIST_SYNC_INTERVAL, provided the
+revoking transaction commits within BLACKLIST_SYNC_MARGIN of its insert;
+one that takes longer is only seen at the next rebuild. Rotation still
+can't be replayed, because blacklisting the old token on refresh is an
+insert that fails if the token was already blacklisted.
+
+Expired tokens are pruned from both tables every BLACKLIST_PRUNE_INTERVAL
+seconds on a background thread (simplejwt's flushexpiredtokens command
+does the same from cron).
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevokedTokens:
+    def __init__(self):
+        self._filter = None
+        self._last_id = 0
+        # (monotonic time, highest id seen by then), oldest first
+        self._seen = deque()
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._next_prune = None
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'filter_hits': 0, 'confirmed': 0, 'syncs': 0, 'rebuilds': 0, 'pruned': 0}
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self._seen.clear()
+            self._next_sync = 0.0
+
+    def _rows(self, after_id=0):
+        return (
+            BlacklistedToken.objects.filter(id__gt=after_id).order_by('id')
+            .values_list('id', 'token__jti').iterator(chunk_size=2000)
+        )
+
+    def _rebuild(self, now):
+        total = BlacklistedToken.objects.count()
+        capacity = max(_setting('BLACKLIST_FILTER_CAPACITY', 100_000), 2 * total)
+        bloom = BloomFilter(capacity, _setting('BLACKLIST_FILTER_ERROR_RATE', 0.001))
+        last_id = 0
+        for row_id, jti in self._rows():
+            bloom.add(jti)
+            last_id = row_id
+        self._filter, self._last_id = bloom, last_id
+        self._seen.append((time.monotonic(), last_id))
+        self._next_rebuild = now + _setting('BLACKLIST_REBUILD_INTERVAL', 3600)
+        self.stats['rebuilds'] += 1
+
+    def sync(self, force=False):
+        """Load blacklist rows added since the last sync (or rebuild) if it's due."""
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            if self._filter is None or now >= self._next_rebuild or self._filter.count >= self._filter.capacity:
+                self._rebuild(now)
+            else:
+                for row_id, jti in self._rows(self._floor(now)):
+                    # Rows inside the margin are read again; count them once
+                    if jti not in self._filter:
+                        self._filter.add(jti)
+                    self._last_id = max(self._last_id, row_id)
+                self._seen.append((time.monotonic(), self._last_id))
+            self._next_sync = now + _setting('BLACKLIST_SYNC_INTERVAL', 5)
+            self.stats['syncs'] += 1
+            self._schedule_prune(now)
+
+    def _floor(self, now):
+        """
+        The highest id seen by a sync that finished BLACKLIST_SYNC_MARGIN
+        seconds before `now`: every row inserted since has a larger id,
+        committed or not. 0 (read everything) until there is one.
+        """
+        cutoff = now - _setting('BLACKLIST_SYNC_MARGIN', 60)
+        while len(self._seen) > 1 and self._seen[1][0] <= cutoff:
+            self._seen.popleft()
+        if self._seen and self._seen[0][0] <= cutoff:
+            return self._seen[0][1]
+        return 0
+
+    def add(self, jti):
+        """Record a JTI this process just blacklisted."""
+        self.sync()
+        with self._lock:
+            self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        self.sync()
+        self.stats['checks'] += 1
+        if jti not in self._filter:
+            return False
+        self.stats['filter_hits'] += 1
+        confirmed = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        self.stats['confirmed'] += confirmed
+        return confirmed
+
+    # ---- pruning ----
+
+    def _schedule_prune(self, now):
+        interval = _setting('BLACKLIST_PRUNE_INTERVAL', 6 * 3600)
+        if not interval:
+            return
+        if self._next_prune is None:
+            self._next_prune = now + interval
+        elif now >= self._next_prune:
+            self._next_prune = now + interval
+            threading.Thread(target=self._prune_in_background, name='blogc-token-prune', daemon=True).start()
+
+    def _prune_in_background(self):
+        try:
+            self.stats['pruned'] += prune_expired()
+        except Exception:
+            logger.exception('Pruning expired tokens failed')
+        finally:
+            close_old_connections()
+
+
+def prune_expired():
+    """Delete expired outstanding tokens and their blacklist rows. Returns the number of tokens deleted."""
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+    # Children first, in bulk, so the delete doesn't collect rows in Python
+    BlacklistedToken.objects.filter(token__in=expired).delete()
+    deleted, _ = expired.delete()
+    return deleted
+
+
+revoked = RevokedTokens()
+
+
+class BlacklistRefreshToken(RefreshToken):
+    """A RefreshToken whose blacklist check goes through `revoked`."""
+
+    def check_blacklist(self):
+        if revoked.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('Token is blacklisted')
+
+    def _outstanding_defaults(self):
+        return {
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+            'created_at': self.current_time,
+            'token': str(self),
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+        }
+
+    def blacklist(self):
+        """Blacklist this token; TokenError if it already was (a replayed refresh)."""
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults=self._outstanding_defaults())
+        try:
+            with transaction.atomic():
+                entry = BlacklistedToken.objects.create(token=token)
+        except IntegrityError:
+            raise TokenError('Token is blacklisted')
+        revoked.add(jti)
+        return entry
+
+    def outstand(self):
+        # A freshly rotated JTI: no need for get_or_create
+        return OutstandingToken.objects.create(jti=self.payload[api_settings.JTI_CLAIM], **self._outstanding_defaults())
@@ -0,0 +1,258 @@
+# search.py
+"""
+Full-text search over blog posts.
+
+Each backend owns a side table (blogc_postsearch) holding one document per
+post built from its title, content, category name and author username:
+
+- SQLiteFTSBackend: an FTS5 virtual table, ranked with bm25()
+- PostgresSearchBackend: a weighted tsvector column behind a GIN index
+
+The index is kept in sync from the signals in signals.py (a saved or
+deleted post, a renamed category, a renamed author) and is queried by
+PostSearchFilter, which replaces DRF's icontains SearchFilter.
+Set BLOGC_SEARCH_BACKEND to a dotted path to plug in another backend.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+
+from .models import BlogPost
+
+TABLE = 'blogc_postsearch'
+POST_TABLE = 'blogc_blogpost'
+
+
+def _source():
+    """
+    The FROM clause of the rebuild queries - posts `p`, their author `u`
+    and category `c` - and the author's username column. The author table
+    is whatever model BlogPost.author points at.
+    """
+    quote = connection.ops.quote_name
+    user = BlogPost._meta.get_field('author').related_model._meta
+    username = user.get_field(user.model.USERNAME_FIELD).column
+    source = (
+        f'FROM {POST_TABLE} p '
+        f'INNER JOIN {quote(user.db_table)} u ON u.{quote(user.pk.column)} = p.author_id '
+        f'LEFT OUTER JOIN blogc_blogcategory c ON c.id = p.category_id'
+    )
+    return source, f'u.{quote(username)}'
+
+
+class SearchBackend:
+    """Base class: subclasses provide the SQL for one database vendor."""
+    # Whether a larger search_rank means a better match
+    rank_descending = True
+    highlight_start = '<mark>'
+    highlight_stop = '</mark>'
+
+    def document(self, post):
+        category = post.category.name if post.category_id else ''
+        return [post.title, post.content, category, post.author.get_username()]
+
+    def create_index(self, schema_editor):
+        raise NotImplementedError
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE {self.id_column} = %s', [post_id])
+
+    def reindex(self, where='', params=()):
+        """
+        Rebuild the documents of the posts matching `where`, SQL over the
+        posts table aliased `p`; every post when it's empty.
+        """
+        raise NotImplementedError
+
+    def rebuild(self):
+        self.reindex()
+
+    def reindex_category(self, category_id):
+        self.reindex('p.category_id = %s', [category_id])
+
+    def reindex_author(self, user_id):
+        self.reindex('p.author_id = %s', [user_id])
+
+    def search(self, queryset, query, highlight=False):
+        """
+        Restrict `queryset` to posts matching `query`, annotated with
+        `search_rank` (and `search_highlight` if asked) and ordered by rank.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    id_column = 'rowid'
+    # bm25() returns lower (more negative) scores for better matches
+    rank_descending = False
+    # Column weights for bm25(): title, content, category, author
+    weights = (10.0, 1.0, 4.0, 4.0)
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+            f"USING fts5(title, content, category, author, tokenize='porter unicode61')"
+        )
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, title, content, category, author) VALUES (%s, %s, %s, %s, %s)',
+                [post.pk, *self.document(post)]
+            )
+
+    def reindex(self, where='', params=()):
+        condition = f' WHERE {where}' if where else ''
+        with connection.cursor() as cursor:
+            if where:
+                cursor.execute(
+                    f'DELETE FROM {TABLE} WHERE rowid IN (SELECT p.id FROM {POST_TABLE} p{condition})', params
+                )
+            else:
+                cursor.execute(f'DELETE FROM {TABLE}')
+            source, author = _source()
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, title, content, category, author) '
+                f"SELECT p.id, p.title, p.content, COALESCE(c.name, ''), {author} {source}{condition}",
+                params
+            )
+
+    def match_expression(self, query):
+        # Quote every term so user input can't inject FTS5 syntax; the
+        # trailing * makes each term a prefix match ("trav" finds "travel").
+        terms = query.replace(',', ' ').split()
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def search(self, queryset, query, highlight=False):
+        match = self.match_expression(query)
+        if not match:
+            return queryset
+        weights = ', '.join(str(w) for w in self.weights)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [match]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT bm25({TABLE}, {weights}) FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s AND rowid = {POST_TABLE}.id', [match]
+        ))
+        if highlight:
+            queryset = queryset.annotate(search_highlight=RawSQL(
+                f"SELECT snippet({TABLE}, -1, %s, %s, '…', 24) FROM {TABLE} "
+                f"WHERE {TABLE} MATCH %s AND rowid = {POST_TABLE}.id",
+                [self.highlight_start, self.highlight_stop, match]
+            ))
+        return queryset.order_by('search_rank')
+
+
+class PostgresSearchBackend(SearchBackend):
+    id_column = 'post_id'
+    config = 'english'
+    document_sql = (
+        "setweight(to_tsvector(%(config)s, %(title)s), 'A') || "
+        "setweight(to_tsvector(%(config)s, %(category)s), 'B') || "
+        "setweight(to_tsvector('simple', %(author)s), 'B') || "
+        "setweight(to_tsvector(%(config)s, %(content)s), 'D')"
+    )
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            f'post_id bigint PRIMARY KEY REFERENCES {POST_TABLE} (id) ON DELETE CASCADE, '
+            f'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_document_gin ON {TABLE} USING GIN (document)'
+        )
+
+    def index_post(self, post):
+        title, content, category, author = self.document(post)
+        document = self.document_sql % {
+            'config': '%s', 'title': '%s', 'category': '%s', 'author': '%s', 'content': '%s',
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TABLE} (post_id, document) VALUES (%s, {document}) '
+                f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                [post.pk, self.config, title, self.config, category, author, self.config, content]
+            )
+
+    def reindex(self, where='', params=()):
+        source, author = _source()
+        document = self.document_sql % {
+            'config': f"'{self.config}'", 'title': 'p.title', 'category': "COALESCE(c.name, '')",
+            'author': author, 'content': 'p.content',
+        }
+        with connection.cursor() as cursor:
+            if not where:
+                cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(
+                f'INSERT INTO {TABLE} (post_id, document) '
+                f'SELECT p.id, {document} {source}'
+                + (f' WHERE {where} ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document' if where else ''),
+                params
+            )
+
+    def search(self, queryset, query, highlight=False):
+        if not query.strip():
+            return queryset
+        tsquery = f"websearch_to_tsquery('{self.config}', %s)"
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT post_id FROM {TABLE} WHERE document @@ {tsquery}', [query]
+        )).annotate(search_rank=RawSQL(
+            # double precision so the rank survives a round trip through a cursor
+            f'SELECT ts_rank_cd(document, {tsquery})::double precision FROM {TABLE} '
+            f'WHERE post_id = {POST_TABLE}.id', [query]
+        ))
+        if highlight:
+            options = f'StartSel={self.highlight_start}, StopSel={self.highlight_stop}, MaxFragments=2'
+            queryset = queryset.annotate(search_highlight=RawSQL(
+                f"ts_headline('{self.config}', {POST_TABLE}.content, {tsquery}, %s)",
+                [query, options]
+            ))
+        return queryset.order_by('-search_rank')
+
+
+BACKENDS = {
+    'sqlite': 'blogc.search.SQLiteFTSBackend',
+    'postgresql': 'blogc.search.PostgresSearchBackend',
+}
+
+_backends = {}
+
+
+def get_search_backend(vendor=None):
+    """Return the backend for `vendor` (default: the current connection), or None."""
+    vendor = vendor or connection.vendor
+    if vendor not in _backends:
+        path = getattr(settings, 'BLOGC_SEARCH_BACKEND', None) or BACKENDS.get(vendor)
+        _backends[vendor] = import_string(path)() if path else None
+    return _backends[vendor]
+
+
+class PostSearchFilter(SearchFilter):
+    """
+    `?search=` backed by the full-text index. Pass `?highlight=true` to get a
+    highlighted snippet per result. Falls back to DRF's icontains search on
+    databases without a backend.
+    """
+    highlight_param = 'highlight'
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        highlight = request.query_params.get(self.highlight_param, '').lower() in ('1', 'true', 'yes')
+        return backend.search(queryset, query, highlight=highlight)
@@ -3,8 +3,14 @@ from django.contrib.auth.models import User, Group
 from django.utils.text import slugify
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth import authenticate
-
-from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
+from django.urls import reverse
+
+from .models import BlogCategory, BlogCategoryStats, BlogPost, Comment, Like, UserProfile
+from . import images
+from .fieldsets import SparseFieldsMixin
+from .media_urls import media_url
+from .pagination import CommentCursorPagination, PostCursorPagination
+from .viewer import DEFAULT_FLAGS, viewer_flags
 # from .utils import SendMail
 
 
@@ -110,13 +116,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get("password")
 
         if email and password:
-            try:
-                user_obj = User.objects.get(email=email)
-                username = user_obj.username
-            except User.DoesNotExist:
-                raise serializers.ValidationError("Invalid email or password.")
-
-            user = authenticate(request=self.context.get("request"), username=username, password=password)
+            user = authenticate(request=self.context.get("request"), email=email, password=password)
             if not user:
                 raise serializers.ValidationError("Invalid email or password.")
         else:
@@ -139,97 +139,158 @@ class BlogCategorySerializer(serializers.ModelSerializer):
 # -------------------
 # Blog Post Serializers
 # -------------------
-class BlogPostListSerializer(serializers.ModelSerializer):
+class ViewerFlagsListSerializer(serializers.ListSerializer):
+    """Looks up liked_by_me/my_comments_count for the whole page at once."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        if "liked_by_me" in self.child.fields or "my_comments_count" in self.child.fields:
+            request = self.context.get("request")
+            flags = self.context.setdefault("viewer_flags", {})
+            flags.update(viewer_flags(getattr(request, "user", None), [p.pk for p in posts if p.pk not in flags]))
+        return super().to_representation(posts)
+
+
+class ViewerFlagsMixin:
+    """`liked_by_me` and `my_comments_count` for the requesting user."""
+
+    def _viewer_flags(self, obj):
+        flags = self.context.setdefault("viewer_flags", {})
+        if obj.pk not in flags:
+            # Serialized on its own rather than through ViewerFlagsListSerializer
+            request = self.context.get("request")
+            flags.update(viewer_flags(getattr(request, "user", None), [obj.pk]))
+        return flags.get(obj.pk, DEFAULT_FLAGS)
+
+    def get_liked_by_me(self, obj):
+        return self._viewer_flags(obj)["liked_by_me"]
+
+    def get_my_comments_count(self, obj):
+        return self._viewer_flags(obj)["my_comments_count"]
+
+
+class PostImageFieldsMixin:
+    """`image` and `image_srcset` for the post read serializers."""
+
+    def get_image(self, obj):
+        try:
+            return media_url(obj.image, self.context.get('request'))
+        except Exception as e:
+            # Log the error for debugging
+            print(f"Error getting image URL for object {obj.id}: {e}")
+            return None
+
+    def get_image_srcset(self, obj):
+        return images.image_srcset(obj, self.context.get('request'))
+
+
+class BlogPostListSerializer(SparseFieldsMixin, ViewerFlagsMixin, PostImageFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = BlogCategorySerializer(read_only=True)
-    likes_count = serializers.IntegerField(source="likes.count", read_only=True)
-    comments_count = serializers.IntegerField(source="comments.count", read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
+    my_comments_count = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Set by PostSearchFilter when ?search=...&highlight=true
+        highlight = getattr(instance, "search_highlight", None)
+        if highlight is not None:
+            data["highlight"] = highlight
+        return data
 
-    def get_image(self, obj):
-        if obj.image:
-            try:
-                # Get the URL from the storage
-                url = obj.image.url
-                # Ensure we have a complete URL
-                if not url.startswith(('http://', 'https://')):
-                    # If URL is relative, try to build absolute URL
-                    request = self.context.get('request')
-                    if request:
-                        url = request.build_absolute_uri(url)
-                    else:
-                        clean_url = url.lstrip('/')
-                        url = f'https://blogbackc.s3.eu-north-1.amazonaws.com/media/{clean_url}'
-                
-                return url
-                
-            except Exception as e:
-                # Log the error for debugging
-                print(f"Error getting image URL for object {obj.id}: {e}")
-                return None
-        return None
+    # The body is the largest column; lists only send it for ?fields=...,content
+    optional_fields = ("content",)
 
     class Meta:
         model = BlogPost
+        list_serializer_class = ViewerFlagsListSerializer
         fields = (
             "id", "title", "slug", "author", "category", "published",
-            "created_at", "likes_count", "comments_count", "content", "image"
+            "created_at", "likes_count", "comments_count", "liked_by_me", "my_comments_count",
+            "content", "image", "image_srcset", "excerpt", "word_count", "reading_time"
         )
 
 
-class BlogPostDetailSerializer(serializers.ModelSerializer):
+class BlogPostDetailSerializer(SparseFieldsMixin, ViewerFlagsMixin, PostImageFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = BlogCategorySerializer(read_only=True)
-    likes_count = serializers.IntegerField(source="likes.count", read_only=True)
-    comments = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
+    my_comments_count = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
-
-    def get_image(self, obj):
-        if obj.image:
-            try:
-                # Get the URL from the storage
-                url = obj.image.url             
-                # Ensure we have a complete URL
-                if not url.startswith(('http://', 'https://')):
-                    request = self.context.get('request')
-                    if request:
-                        url = request.build_absolute_uri(url)
-                    else:
-                        clean_url = url.lstrip('/')
-                        url = f'https://blogbackc.s3.eu-north-1.amazonaws.com/media/{clean_url}'
-                
-                return url
-            except Exception as e:
-                print(f"Error getting image URL for object {obj.id}: {e}")
-                return None
-        return None
-    def get_comments(self, obj):
-        qs = obj.comments.filter(active=True)
-        return CommentSerializer(qs, many=True).data
+    image_srcset = serializers.SerializerMethodField()
+
+    extra_fields = ("comments",)
+
+    def to_representation(self, instance):
+        # First page of comments only; comments_next continues at
+        # /posts/<id>/comments/. Pass the comments queryset as context["comments"],
+        # or a CommentCursorPagination that already holds the page as
+        # context["comments_paginator"] (the async views fetch it themselves).
+        data = super().to_representation(instance)
+        if not self.selects("comments"):
+            return data
+        paginator = self.context.get("comments_paginator")
+        if paginator is None:
+            paginator = CommentCursorPagination()
+            paginator.first_page(
+                self.context["comments"], self.context.get("request"), reverse("post-comments", args=[instance.pk])
+            )
+        data["comments"] = CommentSerializer(paginator.page, many=True).data
+        data["comments_next"] = paginator.get_next_link()
+        return data
 
     # ADD THE MISSING META CLASS
     class Meta:
         model = BlogPost
         fields = (
-            "id", "title", "slug", "author", "category", "content", "image",
-            "published", "created_at", "updated_at", "likes_count", "comments"
+            "id", "title", "slug", "author", "category", "content", "image", "image_srcset",
+            "published", "created_at", "updated_at", "likes_count", "comments_count", "liked_by_me",
+            "my_comments_count", "word_count", "reading_time"
         )
 
 class BlogCategoryDetailSerializer(serializers.ModelSerializer):
-    posts = BlogPostListSerializer(many=True, read_only=True)
-    total_posts = serializers.IntegerField(source="posts.count", read_only=True)
+    """
+    Totals come from the BlogCategoryStats row. `posts` is the first page
+    of the category's published posts; `posts_next` continues it at
+    /categories/<pk>/posts/. Pass the posts queryset as context["posts"].
+    """
+    total_posts = serializers.SerializerMethodField()
     total_comments = serializers.SerializerMethodField()
     total_likes = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogCategory
-        fields = ("id", "name", "slug", "total_posts", "total_comments", "total_likes", "posts")
+        fields = ("id", "name", "slug", "total_posts", "total_comments", "total_likes")
+
+    def _stats(self, obj):
+        try:
+            return obj.stats
+        except BlogCategoryStats.DoesNotExist:
+            return BlogCategoryStats(category=obj)
+
+    def get_total_posts(self, obj):
+        return self._stats(obj).total_posts
 
     def get_total_comments(self, obj):
-        return Comment.objects.filter(post__category=obj).count()
+        return self._stats(obj).total_comments
 
     def get_total_likes(self, obj):
-        return Like.objects.filter(post__category=obj).count()        
+        return self._stats(obj).total_likes
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get("request")
+        paginator = PostCursorPagination()
+        page = paginator.first_page(self.context["posts"], request, reverse("category-posts", args=[instance.pk]))
+        data["posts"] = BlogPostListSerializer(page, many=True, context=self.context).data
+        data["posts_next"] = paginator.get_next_link()
+        return data
 
 class BlogPostCreateSerializer(serializers.ModelSerializer):
     category_id = serializers.IntegerField(write_only=True, required=True)
@@ -237,7 +298,8 @@ class BlogPostCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BlogPost
-        fields = ("id", "title", "content", "category_id", "image", "published")
+        fields = ("id", "title", "content", "category_id", "image", "image_status", "published")
+        read_only_fields = ("image_status",)
 
     def validate_category_id(self, value):
         if not BlogCategory.objects.filter(pk=value).exists():
@@ -1,8 +1,15 @@
 # signals.py
-from django.db.models.signals import post_save
+import threading
+
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, BlogCategory, BlogCategoryStats, BlogPost, Comment, Like
+from .counters import adjust_post_counters, move_post_stats
+from .search import get_search_backend
+from .images import schedule_variants
+from .authentication import versions
+from . import cache
 
 @receiver(post_save, sender=User)
 def ensure_user_profile(sender, instance, created, **kwargs):
@@ -20,3 +27,243 @@ def ensure_user_profile(sender, instance, created, **kwargs):
                 "role": "user",
                 "is_blog_admin": False,
             })
+
+
+# Claims in issued JWTs go stale when the role changes (see authentication.py)
+@receiver(post_init, sender=UserProfile)
+def remember_profile_role(sender, instance, **kwargs):
+    instance._loaded_role = (instance.role, instance.is_blog_admin)
+
+
+@receiver(pre_save, sender=UserProfile)
+def bump_auth_version(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if getattr(instance, '_loaded_role', None) != (instance.role, instance.is_blog_admin):
+        instance.auth_version += 1
+
+
+@receiver(post_save, sender=UserProfile)
+def forget_auth_version(sender, instance, **kwargs):
+    instance._loaded_role = (instance.role, instance.is_blog_admin)
+    versions.forget(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def forget_user_auth_version(sender, instance, **kwargs):
+    # is_active may have changed
+    versions.forget(instance.pk)
+
+
+# Keep the full-text index in step with the posts table
+@receiver(post_save, sender=BlogPost)
+def index_post(sender, instance, raw=False, **kwargs):
+    backend = get_search_backend()
+    if backend is not None and not raw:
+        backend.index_post(instance)
+
+
+@receiver(post_save, sender=BlogPost)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image and instance.image_variants.get('source') != instance.image.name:
+        schedule_variants(instance.pk)
+    elif not instance.image and instance.image_variants:
+        # process_post_image() leaves stale files alone; clear the mapping
+        BlogPost.objects.filter(pk=instance.pk).update(image_variants={})
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_post(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove_post(instance.pk)
+
+
+# Documents include the category name and author username. Read from
+# __dict__ so a deferred field isn't loaded just to remember it.
+@receiver(post_init, sender=BlogCategory)
+def remember_category_name(sender, instance, **kwargs):
+    instance._loaded_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=BlogCategory)
+def reindex_category_posts(sender, instance, created, raw=False, **kwargs):
+    name = instance.__dict__.get('name')
+    backend = get_search_backend()
+    if backend is not None and not (created or raw) and getattr(instance, '_loaded_name', None) != name:
+        backend.reindex_category(instance.pk)
+    instance._loaded_name = name
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+def reindex_author_posts(sender, instance, created, raw=False, **kwargs):
+    username = instance.__dict__.get('username')
+    backend = get_search_backend()
+    if backend is not None and not (created or raw) and getattr(instance, '_loaded_username', None) != username:
+        backend.reindex_author(instance.pk)
+    instance._loaded_username = username
+
+
+@receiver(post_init, sender=BlogPost)
+def remember_post_category(sender, instance, **kwargs):
+    # Lets the handlers below update the old category when a post moves
+    instance._loaded_category_id = instance.category_id
+
+
+# Per-category totals (see counters.py). Registered before the cache
+# receiver, which resets _loaded_category_id.
+@receiver(post_save, sender=BlogPost)
+def update_category_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        move_post_stats(instance.pk, new_category_id=instance.category_id)
+    else:
+        move_post_stats(instance.pk, getattr(instance, '_loaded_category_id', None), instance.category_id)
+
+
+@receiver(pre_delete, sender=BlogPost)
+def remove_post_from_category_stats(sender, instance, **kwargs):
+    # pre_delete: the counters are read from the post's row, which is still there
+    move_post_stats(instance.pk, old_category_id=instance.category_id)
+    # The Collector sends every pre_delete before deleting anything, so the
+    # post's comments and likes are deleted after this and must not be
+    # subtracted from the category a second time
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=BlogPost)
+def forget_deleted_post(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+
+
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    posts = getattr(_deleting, 'posts', None)
+    if posts is None:
+        posts = _deleting.posts = set()
+    return posts
+
+
+# Post counters (see counters.py). Every ORM write goes through these,
+# cascades from a deleted user or QuerySet.delete() included; blogc.likes'
+# raw SQL applies its own deltas. comments_count counts active comments.
+@receiver(post_init, sender=Comment)
+def remember_comment_active(sender, instance, **kwargs):
+    instance._loaded_active = instance.__dict__.get('active')
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    active = instance.__dict__.get('active')
+    previous = False if created else getattr(instance, '_loaded_active', None)
+    if not raw and active is not None and previous is not None and active != previous:
+        adjust_post_counters(instance.post_id, comments=1 if active else -1)
+    instance._loaded_active = active
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.__dict__.get('active', True) and instance.post_id not in _deleting_posts():
+        adjust_post_counters(instance.post_id, comments=-1)
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_post_counters(instance.post_id, likes=1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, **kwargs):
+    if instance.post_id not in _deleting_posts():
+        adjust_post_counters(instance.post_id, likes=-1)
+
+
+@receiver(post_save, sender=BlogCategory)
+def create_category_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BlogCategoryStats.objects.get_or_create(category=instance)
+
+
+# Bump response-cache generations (see cache.py)
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_post_cache(sender, instance, **kwargs):
+    cache.invalidate_post(instance.pk, instance.category_id)
+    previous = getattr(instance, '_loaded_category_id', None)
+    if previous and previous != instance.category_id:
+        cache.invalidate(cache.category_scope(previous))
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_post_activity_cache(sender, instance, **kwargs):
+    post = sender._meta.get_field('post').get_cached_value(instance, None)
+    if post is not None:
+        category_id = post.category_id
+    else:
+        category_id = BlogPost.objects.filter(pk=instance.post_id).values_list('category_id', flat=True).first()
+    cache.invalidate_post(instance.post_id, category_id)
+
+
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def invalidate_category_cache(sender, instance, **kwargs):
+    cache.invalidate_category(instance.pk)
+
+
+# Post payloads embed their author and the post detail its commenters
+# (UserSerializer). Every post and category page is cached under GLOBAL or
+# CATEGORIES, so bumping both drops the stale ones without finding them.
+USER_CACHE_FIELDS = ('username', 'first_name', 'last_name', 'email')
+PROFILE_CACHE_FIELDS = ('role', 'is_blog_admin')
+
+
+def _cached_fields(instance, fields):
+    return tuple(instance.__dict__.get(name) for name in fields)
+
+
+def _invalidate_user_pages(user_id):
+    # Users with nothing on show (a signup filling in its profile) don't flush the cache
+    if BlogPost.objects.filter(author_id=user_id).exists() or Comment.objects.filter(user_id=user_id).exists():
+        cache.invalidate(cache.GLOBAL, cache.CATEGORIES)
+
+
+@receiver(post_init, sender=User)
+def remember_user_cache_fields(sender, instance, **kwargs):
+    instance._loaded_cache_fields = _cached_fields(instance, USER_CACHE_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cache(sender, instance, created, raw=False, **kwargs):
+    fields = _cached_fields(instance, USER_CACHE_FIELDS)
+    if not (created or raw) and getattr(instance, '_loaded_cache_fields', None) != fields:
+        _invalidate_user_pages(instance.pk)
+    instance._loaded_cache_fields = fields
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_cache_fields(sender, instance, **kwargs):
+    instance._loaded_cache_fields = _cached_fields(instance, PROFILE_CACHE_FIELDS)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_cache(sender, instance, created, raw=False, **kwargs):
+    fields = _cached_fields(instance, PROFILE_CACHE_FIELDS)
+    if not (created or raw) and getattr(instance, '_loaded_cache_fields', None) != fields:
+        _invalidate_user_pages(instance.user_id)
+    instance._loaded_cache_fields = fields
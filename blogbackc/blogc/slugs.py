@@ -0,0 +1,92 @@
+# slugs.py
+"""
+Unique slug allocation.
+
+next_free_slug() finds the highest taken "<base>-<n>" in one query: a
+prefix scan over the unique slug index, longest slug first, then the
+highest. save_with_unique_slug() saves inside a savepoint and, if a
+concurrent insert took the slug in the meantime (IntegrityError on the
+unique index), allocates again and retries after a short jittered
+backoff. Retries also skip a random number of suffixes, so under heavy
+contention a few numbers may be left unused.
+"""
+import random
+import re
+import time
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils.text import slugify
+
+MAX_ATTEMPTS = 10
+# Retries back off with jitter so racing writers stop picking the same slug
+RETRY_BACKOFF = 0.005
+# Room left for "-<n>" when a slug is cut to the field's max_length
+SUFFIX_ROOM = 11
+
+
+def base_slug(title, max_length=255):
+    base = slugify(title) or 'post'
+    if len(base) > max_length - SUFFIX_ROOM:
+        base = base[:max_length - SUFFIX_ROOM].rstrip('-')
+    return base
+
+
+def _prefix_filter(field, prefix):
+    if connection.vendor == 'postgresql':
+        # LIKE 'prefix%' can use the varchar_pattern_ops "_like" index
+        # Django creates for unique CharFields; a plain range can't under
+        # a non-C collation.
+        return Q(**{f'{field}__startswith': prefix})
+    # SQLite's LIKE is case-insensitive and skips the index; a range on
+    # the BINARY-collated index is the same prefix scan. '.' sorts right
+    # after '-'.
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + '.'})
+
+
+def next_free_slug(model, base, field='slug', skip=0):
+    """
+    The first free slug for `base`: base, then base-1, base-2, ...
+    `skip` jumps that many suffixes further, to step around writers
+    racing for the same one.
+    """
+    taken = (
+        model._default_manager
+        .filter(
+            Q(**{field: base}) |
+            (_prefix_filter(field, base + '-') & Q(**{f'{field}__regex': rf'^{re.escape(base)}-[0-9]+$'}))
+        )
+        .order_by(Length(field).desc(), f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    if taken is None and not skip:
+        return base
+    last = 0 if taken in (None, base) else int(taken.rsplit('-', 1)[1])
+    return f'{base}-{last + 1 + skip}'
+
+
+def save_with_unique_slug(instance, save, field='slug', source='title'):
+    """
+    Give `instance` a free slug derived from its `source` field and call
+    `save()`, retrying with a fresh slug if a concurrent save wins the race.
+    """
+    model = type(instance)
+    max_length = model._meta.get_field(field).max_length
+    base = base_slug(getattr(instance, source), max_length)
+    for attempt in range(MAX_ATTEMPTS):
+        # After a lost race, spread the retries over a widening window
+        skip = random.randrange(2 ** attempt) if attempt else 0
+        slug = next_free_slug(model, base, field, skip)
+        setattr(instance, field, slug)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            setattr(instance, field, '')
+            taken = model._default_manager.filter(**{field: slug}).exists()
+            if not taken or attempt == MAX_ATTEMPTS - 1:
+                # Some other constraint failed, or we kept losing: give up
+                raise
+            time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
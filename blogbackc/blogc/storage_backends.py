@@ -1,6 +1,7 @@
 # blogc/storage_backends.py
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
+from django.core.files.storage import default_storage
 
 class MediaStorage(S3Boto3Storage):
     location = 'media'
@@ -18,4 +19,15 @@ class MediaStorage(S3Boto3Storage):
         params.pop('BucketOwnerEnforced', None)
         params.pop('ACL', None)
         
-        return params
\ No newline at end of file
+        return params
+
+
+def media_storage():
+    """
+    Storage for uploaded post images: S3 when AWS credentials are
+    configured, otherwise the local default storage (MEDIA_ROOT), which
+    keeps development and tests offline.
+    """
+    if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
+        return MediaStorage()
+    return default_storage
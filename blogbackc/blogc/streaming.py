@@ -0,0 +1,112 @@
+# streaming.py
+"""
+Streamed JSON for whole-table list endpoints.
+
+A Response holds every serialized row, and the rendered body, in memory
+before the first byte goes out. With ?stream=json (a JSON array) or
+?stream=ndjson (one object per line), the post list and my-posts
+endpoints instead return every matching row, unpaginated, as a
+StreamingHttpResponse. Rows are read with .iterator(chunk_size=...) and
+serialized STREAM_CHUNK_SIZE at a time, so peak memory stays flat as the
+table grows (a chunk or so, plus reference cycles from earlier chunks
+that the garbage collector hasn't reached yet), and list serializers
+still batch their per-page lookups (viewer flags) once per chunk.
+
+Streamed responses bypass the response cache and conditional GET.
+bench_streaming compares peak memory and time to first byte.
+"""
+from functools import wraps
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from .fieldsets import requested_fields
+from .projections import get_projection, narrow
+from .renderers import dumps
+
+NDJSON = 'ndjson'
+JSON = 'json'
+CONTENT_TYPES = {JSON: 'application/json', NDJSON: 'application/x-ndjson'}
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def stream_format(request):
+    """JSON, NDJSON or None (a normal response) for `request`."""
+    # A query parameter rather than Accept, which DRF's content negotiation owns
+    requested = request.query_params.get('stream')
+    if requested is not None and requested not in CONTENT_TYPES:
+        raise ValidationError({'stream': f'Unknown format {requested!r}; use "json" or "ndjson"'})
+    return requested
+
+
+def iter_chunks(queryset, chunk_size):
+    """Lists of up to chunk_size rows, fetched with a server-side cursor where the database has one."""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def stream_rows(queryset, serialize, fmt, chunk_size=None):
+    """
+    Encoded bytes for every row of `queryset`. `serialize` turns a list of
+    rows into a list of dicts (e.g. a many=True serializer's .data).
+    """
+    chunk_size = chunk_size or _setting('STREAM_CHUNK_SIZE', 500)
+    first = True
+    if fmt == JSON:
+        yield b'['
+    for chunk in iter_chunks(queryset, chunk_size):
+        encoded = [dumps(item) for item in serialize(chunk)]
+        if fmt == NDJSON:
+            yield b''.join(item + b'\n' for item in encoded)
+        else:
+            yield (b'' if first else b',') + b','.join(encoded)
+        first = False
+    if fmt == JSON:
+        yield b']'
+
+
+def streaming_response(queryset, serialize, fmt):
+    response = StreamingHttpResponse(stream_rows(queryset, serialize, fmt), content_type=CONTENT_TYPES[fmt])
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def streamable(queryset_method, serializer_class):
+    """
+    Serve ?stream= requests of a list view method as a streamed response.
+
+    `queryset_method` names a view method taking the URL kwargs that
+    returns the unpaginated queryset. Goes outside @conditional_response
+    and @cached_response.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            fmt = stream_format(request)
+            if fmt is None:
+                return view_method(self, request, *args, **kwargs)
+
+            queryset = getattr(self, queryset_method)(**kwargs)
+            fieldset = requested_fields(request, serializer_class)
+            projection = get_projection(serializer_class, fieldset)
+            if projection is not None:
+                queryset = projection.values(queryset)
+            else:
+                queryset = narrow(queryset, serializer_class, fieldset)
+
+            def serialize(rows):
+                # A fresh context per chunk, so nothing accumulates across the stream
+                context = {'request': request, 'fieldset': fieldset}
+                if projection is not None:
+                    return projection.serialize(rows, context)
+                return serializer_class(rows, many=True, context=context).data
+
+            return streaming_response(queryset, serialize, fmt)
+        return wrapper
+    return decorator
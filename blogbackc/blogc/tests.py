@@ -1,9 +1,41 @@
-from django.test import TestCase
+import base64
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, SimpleTestCase, override_settings
+from PIL import Image
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth.models import User
 from rest_framework.test import APIRequestFactory, APITestCase, APIClient
 from django.urls import reverse
-from .models import UserProfile, BlogCategory
+from django.core.management import call_command
+from django.core.cache import cache
+from .cache import cache_stats
+from .cache_backends import SQLiteCache
+from .images import VARIANTS
+from .media_urls import MediaURLResolver, UNSUPPORTED, resolver
+from . import hashing, images, likes, revocation, slugs
+from .slugs import next_free_slug
+from .uploads import upload_pending, upload_stats
+import asyncio
+import threading
+from .models import UserProfile, BlogCategory, BlogCategoryStats, BlogPost, Comment, Like
 from .permissions import IsBlogAdmin
+from .counters import rebuild_category_stats, rebuild_post_counters
+from .query_budget import budget_for, iter_endpoints, unbudgeted_endpoints
+from .views import MyTokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import AccessToken
 
 class PermissionTests(TestCase):
     def setUp(self):
@@ -166,4 +198,1879 @@ class PostCreationTests(APITestCase):
             except:
                 response = self.client.post('/api/posts/', data)
         
-        self.assertEqual(response.status_code, 401)  # Unauthorized
\ No newline at end of file
+        self.assertEqual(response.status_code, 401)  # Unauthorized
+
+
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader',
+            email='reader@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Counters', slug='counters')
+        self.post = BlogPost.objects.create(
+            title='Counted post',
+            author=self.user,
+            category=self.category,
+            content='Body'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_like_toggle_updates_counter(self):
+        url = reverse('post-like', args=[self.post.id])
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_create_and_delete_update_counter(self):
+        response = self.client.post(
+            reverse('post-comments', args=[self.post.id]), {'body': 'Nice'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        response = self.client.delete(reverse('comment-detail', args=[response.data['id']]))
+        self.assertEqual(response.status_code, 204)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_rebuild_command_recomputes_counters(self):
+        Like.objects.create(post=self.post, user=self.user)
+        Comment.objects.create(post=self.post, user=self.user, body='One')
+        Comment.objects.create(post=self.post, user=self.user, body='Two')
+        Comment.objects.create(post=self.post, user=self.user, body='Hidden', active=False)
+        BlogPost.objects.filter(pk=self.post.pk).update(likes_count=0, comments_count=0)
+
+        call_command('rebuild_post_counters', stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 2)
+
+    def assertCounters(self, likes, comments):
+        self.post.refresh_from_db()
+        stats = BlogCategoryStats.objects.get(category=self.category)
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (likes, comments))
+        self.assertEqual((stats.total_likes, stats.total_comments), (likes, comments))
+
+    def test_deleting_a_user_removes_their_likes_and_comments_from_counters(self):
+        other = User.objects.create_user(username='passerby', password='testpass123')
+        Like.objects.create(post=self.post, user=other)
+        Comment.objects.create(post=self.post, user=other, body='Bye')
+        Comment.objects.create(post=self.post, user=self.user, body='Stays')
+        self.assertCounters(likes=1, comments=2)
+
+        other.delete()
+
+        self.assertCounters(likes=0, comments=1)
+
+    def test_queryset_delete_updates_counters(self):
+        Comment.objects.create(post=self.post, user=self.user, body='One')
+        Comment.objects.create(post=self.post, user=self.user, body='Two')
+
+        Comment.objects.filter(post=self.post).delete()
+
+        self.assertCounters(likes=0, comments=0)
+
+    def test_only_active_comments_are_counted(self):
+        comment = Comment.objects.create(post=self.post, user=self.user, body='One')
+        Comment.objects.create(post=self.post, user=self.user, body='Hidden', active=False)
+        self.assertCounters(likes=0, comments=1)
+
+        comment.active = False
+        comment.save()
+        self.assertCounters(likes=0, comments=0)
+
+        Comment.objects.filter(post=self.post).delete()
+        self.assertCounters(likes=0, comments=0)
+
+    def test_deleting_a_post_subtracts_its_counters_from_the_category_once(self):
+        other = BlogPost.objects.create(title='Other', author=self.user, category=self.category, content='Body')
+        Like.objects.create(post=other, user=self.user)
+        Comment.objects.create(post=other, user=self.user, body='Gone')
+        Comment.objects.create(post=self.post, user=self.user, body='Stays')
+
+        other.delete()
+
+        self.assertCounters(likes=0, comments=1)
+        self.assertEqual(BlogCategoryStats.objects.get(category=self.category).total_posts, 1)
+
+    def test_list_serializer_reads_counter_columns(self):
+        BlogPost.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=3)
+
+        response = self.client.get(reverse('post-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['likes_count'], 7)
+        self.assertEqual(response.data['results'][0]['comments_count'], 3)
+
+
+class PostPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='writer',
+            email='writer@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Paging', slug='paging')
+        # Several posts share a timestamp so the id tie-break is exercised
+        stamp = timezone.now()
+        self.posts = [
+            BlogPost.objects.create(
+                title=f'Post {i}',
+                author=self.user,
+                category=self.category,
+                content='Body',
+                created_at=stamp - timedelta(minutes=i // 3)
+            )
+            for i in range(30)
+        ]
+        self.client = APIClient()
+
+    def collect(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_pages_cover_every_post_once(self):
+        seen = self.collect(reverse('post-list') + '?page_size=7')
+
+        expected = [p.id for p in sorted(self.posts, key=lambda p: (p.created_at, p.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_ordering_param_is_respected(self):
+        seen = self.collect(reverse('post-list') + '?ordering=created_at&page_size=4')
+
+        expected = [p.id for p in sorted(self.posts, key=lambda p: (p.created_at, p.id))]
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_same_page(self):
+        first = self.client.get(reverse('post-list') + '?page_size=5').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+
+        self.assertEqual(
+            [p['id'] for p in back['results']],
+            [p['id'] for p in first['results']]
+        )
+
+    def test_no_count_or_offset_queries(self):
+        first = self.client.get(reverse('post-list') + '?page_size=5').data
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first['next'])
+
+        sql = ' '.join(q['sql'].upper() for q in ctx.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_tampered_cursor_is_rejected(self):
+        for payload in ({'v': 'garbage', 'id': 1}, {'v': None, 'id': 1}, {'v': '2024-01-01T00:00:00', 'id': 'x'}):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get(reverse('post-list') + f'?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, payload)
+
+    def test_latest_returns_five(self):
+        response = self.client.get(reverse('post-latest'))
+
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_my_posts_is_paginated(self):
+        self.client.force_authenticate(user=self.user)
+
+        seen = self.collect(reverse('post-my-posts'))
+
+        self.assertEqual(len(seen), 30)
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='searcher',
+            email='searcher@test.com',
+            password='testpass123'
+        )
+        self.travel = BlogCategory.objects.create(name='Wanderlust', slug='wanderlust')
+        self.in_title = BlogPost.objects.create(
+            title='Thailand travel notes', author=self.user, category=self.travel,
+            content='Beaches and food.'
+        )
+        self.in_body = BlogPost.objects.create(
+            title='Weekend plans', author=self.user, category=self.travel,
+            content='Maybe some travel, maybe not.'
+        )
+        self.unrelated = BlogPost.objects.create(
+            title='Football', author=self.user, category=None,
+            content='Match report.'
+        )
+        self.client = APIClient()
+
+    def search(self, query, **params):
+        params['search'] = query
+        response = self.client.get(reverse('post-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_title_matches_rank_above_body_matches(self):
+        ids = [p['id'] for p in self.search('travel')]
+
+        self.assertEqual(ids, [self.in_title.id, self.in_body.id])
+
+    def test_matches_category_and_author(self):
+        self.assertEqual(len(self.search('wanderlust')), 2)
+        self.assertEqual(len(self.search('searcher')), 3)
+
+    def test_renamed_category_and_author_are_reindexed(self):
+        self.travel.name = 'Roaming'
+        self.travel.save()
+        self.user.username = 'explorer'
+        self.user.save()
+
+        self.assertEqual(self.search('wanderlust'), [])
+        self.assertEqual(len(self.search('roaming')), 2)
+        self.assertEqual(self.search('searcher'), [])
+        self.assertEqual(len(self.search('explorer')), 3)
+
+        # Saves that don't rename anything leave the index alone
+        with mock.patch('blogc.search.SQLiteFTSBackend.reindex') as reindex:
+            User.objects.get(pk=self.user.pk).save()
+            User.objects.only('id').get(pk=self.user.pk).save(update_fields=['last_login'])
+            BlogCategory.objects.get(pk=self.travel.pk).save()
+        reindex.assert_not_called()
+
+    def test_highlight(self):
+        results = self.search('beaches', highlight='true')
+
+        self.assertIn('<mark>Beaches</mark>', results[0]['highlight'])
+        self.assertNotIn('highlight', self.search('beaches')[0])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.unrelated.title = 'Cricket'
+        self.unrelated.save()
+        self.assertEqual(self.search('football'), [])
+        self.assertEqual(len(self.search('cricket')), 1)
+
+        self.in_title.delete()
+        self.assertEqual([p['id'] for p in self.search('travel')], [self.in_body.id])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"travel OR ('), [])
+
+    def test_ranked_results_paginate(self):
+        for i in range(6):
+            BlogPost.objects.create(
+                title=f'Travel {i}', author=self.user, category=self.travel, content='travel'
+            )
+        seen = []
+        url = reverse('post-list') + '?search=travel&page_size=3'
+        while url:
+            data = self.client.get(url).data
+            seen.extend(p['id'] for p in data['results'])
+            url = data['next']
+
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cacher',
+            email='cacher@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Cached', slug='cached')
+        self.post = BlogPost.objects.create(
+            title='Cached post', author=self.user, category=self.category, content='Body'
+        )
+        self.client = APIClient()
+
+    def test_second_anonymous_read_is_a_hit(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(cache_stats()['hits'], 1)
+
+    def test_comment_invalidates_post_and_lists(self):
+        detail = reverse('post-detail', args=[self.post.id])
+        listing = reverse('post-list')
+        self.assertEqual(self.client.get(listing).data['results'][0]['comments_count'], 0)
+        self.client.get(detail)
+
+        Comment.objects.create(post=self.post, user=self.user, body='Hi')
+
+        self.assertEqual(len(self.client.get(detail).data['comments']), 1)
+        self.assertEqual(self.client.get(listing).data['results'][0]['comments_count'], 1)
+
+    def test_category_rename_invalidates_category_endpoints(self):
+        self.client.get(reverse('category-list'))
+        self.client.get(reverse('category-detail-public', args=[self.category.id]))
+
+        self.category.name = 'Renamed'
+        self.category.save()
+
+        names = [c['name'] for c in self.client.get(reverse('category-list')).data]
+        self.assertIn('Renamed', names)
+        self.assertEqual(
+            self.client.get(reverse('category-detail-public', args=[self.category.id])).data['name'],
+            'Renamed'
+        )
+        self.assertGreater(cache_stats()['invalidations'], 0)
+
+    def test_author_changes_invalidate_post_pages(self):
+        urls = [
+            reverse('post-list'),
+            reverse('post-detail', args=[self.post.id]),
+            reverse('category-detail-public', args=[self.category.id]),
+        ]
+        for url in urls:
+            self.client.get(url)
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(self.client.get(urls[0]).data['results'][0]['author']['first_name'], 'Renamed')
+        self.assertEqual(self.client.get(urls[1]).data['author']['first_name'], 'Renamed')
+        self.assertEqual(self.client.get(urls[2]).data['posts'][0]['author']['first_name'], 'Renamed')
+
+        profile = self.user.profile
+        profile.role = 'admin'
+        profile.save()
+        self.assertEqual(self.client.get(urls[1]).data['author']['role'], 'admin')
+
+    def test_login_doesnt_invalidate(self):
+        self.client.get(reverse('post-list'))
+        invalidations = cache_stats()['invalidations']
+
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(cache_stats()['invalidations'], invalidations)
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse('post-list'))
+        self.client.get(reverse('post-list'))
+
+        self.assertEqual(cache_stats()['hits'], 0)
+
+
+def _incr_shared(location, times):
+    backend = SQLiteCache(location, {})
+    for _ in range(times):
+        backend.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.tmp.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_ttl(self):
+        self.cache.set('post', {'id': 1}, timeout=60)
+        self.cache.set('gone', 'x', timeout=0)
+
+        self.assertEqual(self.cache.get('post'), {'id': 1})
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertFalse(self.cache.add('post', 'other'))
+        self.assertTrue(self.cache.add('gone', 'back'))
+
+    def test_visible_to_other_instances(self):
+        self.cache.set('shared', 'value')
+
+        self.assertEqual(SQLiteCache(self.location, {}).get('shared'), 'value')
+
+    def test_evicts_least_recently_used(self):
+        for i in range(10):
+            self.cache.set(f'k{i}', i)
+            # Distinct access times without waiting for LRU_RESOLUTION
+            self.cache._db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (i, self.cache.make_key(f'k{i}')))
+        self.cache._db.execute('UPDATE cache SET accessed = 100 WHERE key = ?', (self.cache.make_key('k0'),))
+
+        self.cache.set('k10', 10)
+
+        self.assertEqual(self.cache.get('k0'), 0)
+        self.assertIsNone(self.cache.get('k1'))
+        self.assertLessEqual(self.cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0], 10)
+
+    def test_size_is_checked_every_cull_interval_writes(self):
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_INTERVAL': 5}})
+        counts = []
+        cache._db.set_trace_callback(lambda sql: 'COUNT(*)' in sql and counts.append(sql))
+
+        for i in range(12):
+            cache.set(f'k{i}', i)
+
+        self.assertEqual(len(counts), 2)
+        self.assertLessEqual(cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0], 12)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        ctx = multiprocessing.get_context('fork')
+        procs = [ctx.Process(target=_incr_shared, args=(self.location, 200)) for _ in range(4)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+
+        self.assertEqual(self.cache.get('counter'), 800)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='etagger',
+            email='etagger@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Conditional', slug='conditional')
+        self.post = BlogPost.objects.create(
+            title='Conditional post', author=self.user, category=self.category, content='Body'
+        )
+        self.client = APIClient()
+
+    def like(self):
+        liker = APIClient()
+        liker.force_authenticate(self.user)
+        self.assertEqual(liker.post(reverse('post-like', args=[self.post.id])).status_code, 201)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # The anonymous ETag is cached with the response
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_signed_in_etag_runs_only_the_aggregate(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_like_changes_etag(self):
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+
+        self.like()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_signed_in_like_changes_etag(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+
+        BlogPost.objects.filter(pk=self.post.pk).update(likes_count=1)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since_is_not_answered(self):
+        # Counters change without touching updated_at
+        url = reverse('post-latest')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        self.like()
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+    def test_category_posts(self):
+        url = reverse('category-posts', args=[self.category.id])
+        response = self.client.get(url)
+
+        self.assertEqual([p['id'] for p in response.data['results']], [self.post.id])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+def _png_upload(name='photo.png', size=(2000, 1000)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (200, 50, 50, 255)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'IMAGE_VARIANTS_ASYNC': False})
+class ImageVariantTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.user = User.objects.create_user(
+            username='photographer',
+            email='photographer@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Photos', slug='photos')
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def create_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = BlogPost.objects.create(
+                title='Photo post', author=self.user, category=self.category,
+                content='Body', image=_png_upload()
+            )
+        post.refresh_from_db()
+        return post
+
+    def test_variants_are_generated_after_commit(self):
+        post = self.create_post()
+
+        self.assertEqual(post.image_variants['source'], post.image.name)
+        for variant, size in VARIANTS.items():
+            entry = post.image_variants[variant]
+            self.assertEqual(entry['width'], size)
+            for fmt in ('webp', 'jpeg'):
+                self.assertTrue(post.image.storage.exists(entry[fmt]))
+        with post.image.storage.open(post.image_variants['thumb']['webp']) as fh:
+            self.assertEqual(Image.open(fh).format, 'WEBP')
+
+    def test_serializers_expose_srcset(self):
+        post = self.create_post()
+
+        data = self.client.get(reverse('post-detail', args=[post.id])).data
+
+        self.assertEqual(set(data['image_srcset']), set(VARIANTS))
+        self.assertTrue(data['image_srcset']['card']['webp'].startswith('http://testserver/'))
+
+    def test_backfill_command(self):
+        post = self.create_post()
+        BlogPost.objects.filter(pk=post.pk).update(image_variants={})
+
+        call_command('generate_image_variants', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants['source'], post.image.name)
+
+    def test_variants_of_a_replaced_image_are_deleted(self):
+        post = self.create_post()
+        built = []
+
+        def build_then_replace(field_file):
+            built.append(real_build(field_file))
+            BlogPost.objects.filter(pk=post.pk).update(image='post_images/newer.png')
+            return built[-1]
+
+        real_build = images.build_variants
+        with mock.patch.object(images, 'build_variants', build_then_replace):
+            self.assertIsNone(images.process_post_image(post.pk, force=True))
+
+        names = [built[0][variant][fmt] for variant in VARIANTS for fmt in ('webp', 'jpeg')]
+        self.assertFalse(any(post.image.storage.exists(name) for name in names))
+
+
+class AsyncUploadTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp.name, 'media'),
+            BLOGC_SETTINGS={
+                **settings.BLOGC_SETTINGS,
+                'ASYNC_UPLOADS': True,
+                'UPLOAD_SPOOL_DIR': os.path.join(self.tmp.name, 'spool'),
+                'UPLOAD_WORKERS': 0,
+                'UPLOAD_RETRY_BACKOFF': 0,
+                'IMAGE_VARIANTS_ASYNC': False,
+            },
+        )
+        self.override.enable()
+        self.admin_user = User.objects.create_user(
+            username='uploader',
+            email='uploader@test.com',
+            password='testpass123'
+        )
+        self.admin_user.profile.is_blog_admin = True
+        self.admin_user.profile.save()
+        self.category = BlogCategory.objects.create(name='Uploads', slug='uploads')
+        self.client.force_authenticate(user=self.admin_user)
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp.cleanup()
+
+    def create(self):
+        data = {
+            'title': 'Async image', 'content': 'Body',
+            'category_id': self.category.id, 'image': _png_upload(size=(400, 300)),
+        }
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('post-list'), data, format='multipart')
+        return response, callbacks
+
+    def test_post_is_committed_pending_then_uploaded(self):
+        response, callbacks = self.create()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['image_status'], 'pending')
+        post = BlogPost.objects.get(pk=response.data['id'])
+        self.assertFalse(post.image)
+        self.assertTrue(os.path.exists(post.pending_image))
+
+        for callback in callbacks:
+            callback()
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_status, BlogPost.IMAGE_READY)
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertEqual(post.pending_image, '')
+        self.assertGreater(upload_stats()['end_to_end']['count'], 0)
+
+    def test_upload_is_retried(self):
+        response, callbacks = self.create()
+        real_save = FileSystemStorage.save
+        attempts = []
+
+        def flaky_save(storage, *args, **kwargs):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OSError('storage unavailable')
+            return real_save(storage, *args, **kwargs)
+
+        with mock.patch.object(FileSystemStorage, 'save', flaky_save):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(BlogPost.objects.get(pk=response.data['id']).image_status, BlogPost.IMAGE_READY)
+
+    def test_upload_marked_failed_after_retries(self):
+        response, callbacks = self.create()
+
+        with mock.patch.object(FileSystemStorage, 'save', side_effect=OSError('down')):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(BlogPost.objects.get(pk=response.data['id']).image_status, BlogPost.IMAGE_FAILED)
+
+    def replace_pending_image(self, post_id):
+        # As if the image was replaced by another upload that is still pending
+        newer = os.path.join(self.tmp.name, 'spool', 'newer__photo.png')
+        BlogPost.objects.filter(pk=post_id).update(pending_image=newer)
+        return newer
+
+    def test_upload_superseded_by_a_newer_image_is_discarded(self):
+        response, _ = self.create()
+        post = BlogPost.objects.get(pk=response.data['id'])
+        real_save = FileSystemStorage.save
+
+        def save_then_replace(storage, *args, **kwargs):
+            name = real_save(storage, *args, **kwargs)
+            self.replace_pending_image(post.pk)
+            return name
+
+        with mock.patch.object(FileSystemStorage, 'save', save_then_replace):
+            self.assertEqual(upload_pending(post.pk), BlogPost.IMAGE_PENDING)
+
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertTrue(post.pending_image.endswith('newer__photo.png'))
+        # Neither the uploaded copy nor the old spool file is left behind
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'post_images')), [])
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'spool')), [])
+
+    def test_failed_upload_leaves_a_newer_image_alone(self):
+        response, _ = self.create()
+        post_id = response.data['id']
+
+        def fail_after_replace(*args, **kwargs):
+            self.replace_pending_image(post_id)
+            raise OSError('down')
+
+        with mock.patch.object(FileSystemStorage, 'save', side_effect=fail_after_replace):
+            self.assertEqual(upload_pending(post_id), BlogPost.IMAGE_PENDING)
+
+        self.assertEqual(BlogPost.objects.get(pk=post_id).image_status, BlogPost.IMAGE_PENDING)
+
+
+class MediaURLTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='gallery',
+            email='gallery@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Gallery', slug='gallery')
+        BlogPost.objects.bulk_create([
+            BlogPost(title=f'Post {i}', slug=f'gallery-{i}', author=self.user, category=self.category,
+                     content='Body', published=True, image=f'post_images/photo {i}.jpg')
+            for i in range(50)
+        ])
+        resolver.clear()
+
+    def test_list_makes_no_storage_calls_after_warm_up(self):
+        url = reverse('post-list') + '?page_size=100'
+        self.client.get(url)
+        cache.clear()
+
+        with mock.patch.object(FileSystemStorage, 'url', wraps=FileSystemStorage.url, autospec=True) as storage_url:
+            data = self.client.get(url).data
+
+        self.assertEqual(storage_url.call_count, 0)
+        post = BlogPost.objects.get(title='Post 7')
+        image = next(row['image'] for row in data['results'] if row['id'] == post.id)
+        self.assertEqual(image, 'http://testserver' + post.image.storage.url(post.image.name))
+        self.assertIn('photo%207.jpg', image)
+
+    def test_s3_urls_match_storage(self):
+        from storages.backends.s3 import S3Storage
+
+        for options in ({'custom_domain': 'cdn.example.com'}, {'querystring_auth': False}):
+            storage = S3Storage(bucket_name='blogbackc', location='media', **options)
+            name = 'post_images/a b.png'
+            self.assertEqual(MediaURLResolver().url(name, storage), storage.url(name))
+
+    def test_signed_urls_fall_back_to_storage(self):
+        from storages.backends.s3 import S3Storage
+
+        storage = S3Storage(bucket_name='blogbackc', location='media', querystring_auth=True,
+                            access_key='key', secret_key='secret', region_name='eu-north-1')
+        resolver = MediaURLResolver()
+
+        self.assertIs(resolver.prefix_for(storage), UNSUPPORTED)
+        self.assertIn('Signature', resolver.url('post_images/a.png', storage))
+
+
+class CategoryStatsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='curator',
+            email='curator@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Stats', slug='stats')
+        self.other = BlogCategory.objects.create(name='Other stats', slug='other-stats')
+        self.client.force_authenticate(user=self.user)
+
+    def create_posts(self, count, category=None):
+        return [
+            BlogPost.objects.create(title=f'Stats post {i}', author=self.user,
+                                    category=category or self.category, content='Body')
+            for i in range(count)
+        ]
+
+    def stats(self, category):
+        return BlogCategoryStats.objects.values('total_posts', 'total_comments', 'total_likes').get(category=category)
+
+    def test_stats_follow_posts_likes_and_comments(self):
+        first, second = self.create_posts(2)
+        self.client.post(reverse('post-like', args=[first.id]))
+        self.client.post(reverse('post-comments', args=[first.id]), {'body': 'One'})
+        self.client.post(reverse('post-comments', args=[second.id]), {'body': 'Two'})
+        self.assertEqual(self.stats(self.category), {'total_posts': 2, 'total_comments': 2, 'total_likes': 1})
+
+        first.refresh_from_db()
+        first.category = self.other
+        first.save()
+        self.assertEqual(self.stats(self.category), {'total_posts': 1, 'total_comments': 1, 'total_likes': 0})
+        self.assertEqual(self.stats(self.other), {'total_posts': 1, 'total_comments': 1, 'total_likes': 1})
+
+        second.delete()
+        self.assertEqual(self.stats(self.category), {'total_posts': 0, 'total_comments': 0, 'total_likes': 0})
+
+        # Incremental totals agree with a full rebuild
+        expected = {c.pk: self.stats(c) for c in (self.category, self.other)}
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertEqual({c.pk: self.stats(c) for c in (self.category, self.other)}, expected)
+
+    def test_detail_embeds_first_page_with_cursor(self):
+        self.create_posts(15)
+
+        data = self.client.get(reverse('category-detail-public', args=[self.category.id])).data
+
+        self.assertEqual(data['total_posts'], 15)
+        self.assertEqual(len(data['posts']), settings.BLOGC_SETTINGS['MAX_POSTS_PER_PAGE'])
+        self.assertIn(reverse('category-posts', args=[self.category.id]), data['posts_next'])
+        rest = self.client.get(data['posts_next']).data
+        self.assertEqual(len(data['posts']) + len(rest['results']), 15)
+        self.assertIsNone(rest['next'])
+
+    def test_detail_query_count_does_not_grow_with_category(self):
+        url = reverse('category-detail-public', args=[self.category.id])
+        self.create_posts(3)
+        cache.clear()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        self.create_posts(30)
+        for post in BlogPost.objects.filter(category=self.category)[:10]:
+            Like.objects.create(post=post, user=self.user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url)
+
+        self.assertEqual(len(large), len(small))
+
+
+class SlugAllocatorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='slugger',
+            email='slugger@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Slugs', slug='slugs')
+
+    def make(self, slug, title='Same title'):
+        return BlogPost(title=title, slug=slug, author=self.user, category=self.category, content='Body')
+
+    def test_next_suffix_in_one_query(self):
+        BlogPost.objects.bulk_create(
+            [self.make('same-title')] +
+            [self.make(f'same-title-{i}') for i in range(1, 12)] +
+            [self.make('same-title-draft'), self.make('same-titles'), self.make('same-title-2-99')]
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(next_free_slug(BlogPost, 'same-title'), 'same-title-12')
+        self.assertEqual(next_free_slug(BlogPost, 'other-title'), 'other-title')
+
+    def test_save_assigns_unique_slugs(self):
+        first = BlogPost.objects.create(title='Same title', author=self.user, category=self.category, content='A')
+        second = BlogPost.objects.create(title='Same title', author=self.user, category=self.category, content='B')
+
+        self.assertEqual((first.slug, second.slug), ('same-title', 'same-title-1'))
+
+    def test_retries_when_a_concurrent_save_takes_the_slug(self):
+        BlogPost.objects.bulk_create([self.make('same-title')])
+        real_next = slugs.next_free_slug
+        # The first lookup "races" with another insert and returns a taken slug
+        answers = iter(['same-title'])
+
+        def racing_next(*args, **kwargs):
+            return next(answers, None) or real_next(*args, **kwargs)
+
+        with mock.patch.object(slugs, 'next_free_slug', racing_next):
+            post = BlogPost.objects.create(title='Same title', author=self.user, category=self.category, content='B')
+
+        self.assertTrue(post.slug.startswith('same-title-'))
+        self.assertEqual(BlogPost.objects.filter(slug__startswith='same-title').count(), 2)
+
+
+class CommentPaginationTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='host',
+            email='host@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Threads', slug='threads')
+        self.post = BlogPost.objects.create(
+            title='Busy post', author=self.author, category=self.category, content='Body'
+        )
+
+    def add_comments(self, count):
+        users = [
+            User.objects.create_user(username=f'commenter{i}', email=f'c{i}@test.com', password=None)
+            for i in range(User.objects.count(), User.objects.count() + count)
+        ]
+        Comment.objects.bulk_create([
+            Comment(post=self.post, user=user, body=f'Comment {i}') for i, user in enumerate(users)
+        ])
+
+    def test_detail_embeds_first_page_and_cursor(self):
+        self.add_comments(30)
+        page_size = settings.BLOGC_SETTINGS['COMMENTS_PER_PAGE']
+
+        data = self.client.get(reverse('post-detail', args=[self.post.id])).data
+
+        self.assertEqual(len(data['comments']), page_size)
+        self.assertEqual(data['comments'][0]['body'], 'Comment 0')
+        self.assertIn(reverse('post-comments', args=[self.post.id]), data['comments_next'])
+
+        # The total, for clients showing it before every page is loaded
+        rebuild_post_counters()
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('post-detail', args=[self.post.id])).data['comments_count'], 30)
+
+        # Anonymous readers can follow the cursor
+        rest = self.client.get(data['comments_next']).data
+        self.assertEqual(len(rest['results']), 30 - page_size)
+        self.assertEqual(rest['results'][0]['body'], f'Comment {page_size}')
+        self.assertIsNone(rest['next'])
+
+    def test_posting_a_comment_still_requires_login(self):
+        response = self.client.post(reverse('post-comments', args=[self.post.id]), {'body': 'Hi'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        urls = [reverse('post-detail', args=[self.post.id]), reverse('post-comments', args=[self.post.id])]
+
+        def count_queries():
+            counts = []
+            for url in urls:
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                counts.append(len(queries))
+            return counts
+
+        self.add_comments(3)
+        small = count_queries()
+        self.add_comments(60)
+        self.assertEqual(count_queries(), small)
+
+
+class QueryBudgetTests(APITestCase):
+    """Every budgeted GET endpoint in blogc.urls, against 10/100/1000 rows."""
+    # Talk to S3 rather than the database
+    EXTERNAL = {'s3-test'}
+
+    def seed(self, rows):
+        users = [
+            User.objects.create_user(username=f'budget{i}', email=f'budget{i}@test.com', password=None)
+            for i in range(10)
+        ]
+        admin = users[0]
+        admin.profile.is_blog_admin = True
+        admin.profile.save()
+        categories = [BlogCategory.objects.create(name=f'Budget {i}', slug=f'budget-{i}') for i in range(3)]
+        posts = BlogPost.objects.bulk_create([
+            BlogPost(title=f'Budget post {i}', slug=f'budget-post-{i}', author=users[i % len(users)],
+                     category=categories[i % len(categories)], content='Body ' * 50)
+            for i in range(rows)
+        ])
+        hot = posts[0]
+        comments = Comment.objects.bulk_create([
+            Comment(post=hot if i % 2 else posts[i % rows], user=users[i % len(users)], body=f'Comment {i}')
+            for i in range(rows)
+        ])
+        Like.objects.bulk_create([Like(post=posts[i], user=users[i % len(users)]) for i in range(rows)])
+        rebuild_post_counters()
+        rebuild_category_stats()
+        self.objects = {'post': hot, 'category': categories[0], 'comment': comments[1]}
+        return admin
+
+    def url_for(self, name, route):
+        kwargs = {}
+        if '<int:post_id>' in route:
+            kwargs['post_id'] = self.objects['post'].pk
+        if 'pk>' in route:
+            target = 'comment' if name.startswith('comment') else 'category' if 'categor' in name else 'post'
+            kwargs['pk'] = self.objects[target].pk
+        return reverse(name, kwargs=kwargs)
+
+    def check_budgets(self, rows):
+        admin = self.seed(rows)
+        # Carries the role claims, like the tokens the login view issues
+        token = str(MyTokenObtainPairSerializer.get_token(admin).access_token)
+        for name, view_func, route in iter_endpoints():
+            budget = budget_for(view_func, 'GET')
+            if budget is None or name in self.EXTERNAL:
+                continue
+            url = self.url_for(name, route)
+            for auth in (None, f'Bearer {token}'):
+                self.client.credentials(**({'HTTP_AUTHORIZATION': auth} if auth else {}))
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        # Streamed bodies run their queries as they're read
+                        b''.join(response.streaming_content)
+                with self.subTest(endpoint=name, rows=rows, authenticated=bool(auth)):
+                    self.assertLess(response.status_code, 500)
+                    self.assertLessEqual(len(queries), budget, '\n'.join(q['sql'] for q in queries))
+
+    def test_every_get_endpoint_has_a_budget(self):
+        self.assertEqual(unbudgeted_endpoints(), [])
+
+    def test_budgets_at_10_rows(self):
+        self.check_budgets(10)
+
+    def test_budgets_at_100_rows(self):
+        self.check_budgets(100)
+
+    def test_budgets_at_1000_rows(self):
+        self.check_budgets(1000)
+
+    def test_middleware_logs_violations_with_sql(self):
+        from .views import CategoryListView
+
+        middleware = settings.MIDDLEWARE + ['blogc.query_budget.QueryBudgetMiddleware']
+        with override_settings(MIDDLEWARE=middleware), \
+                mock.patch.object(CategoryListView, 'query_budgets', {'GET': 0}), \
+                self.assertLogs('blogc.query_budget', 'WARNING') as logs:
+            cache.clear()
+            self.client.get(reverse('category-list'))
+
+        self.assertIn('category-list', logs.output[0])
+        self.assertIn('blogc_blogcategory', logs.output[0])
+        self.assertIn('views.py', logs.output[0])
+
+
+class ViewerFlagsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='fan',
+            email='fan@test.com',
+            password='testpass123'
+        )
+        self.category = BlogCategory.objects.create(name='Fans', slug='fans')
+        self.posts = [
+            BlogPost.objects.create(title=f'Fan post {i}', author=self.user, category=self.category, content='Body')
+            for i in range(5)
+        ]
+        Like.objects.create(post=self.posts[1], user=self.user)
+        Comment.objects.create(post=self.posts[1], user=self.user, body='One')
+        Comment.objects.create(post=self.posts[1], user=self.user, body='Two')
+        Comment.objects.create(post=self.posts[3], user=self.user, body='Three')
+
+    def test_list_flags_in_one_query(self):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get(reverse('post-list')).data['results']
+
+        flags = {row['id']: (row['liked_by_me'], row['my_comments_count']) for row in results}
+        self.assertEqual(flags[self.posts[1].id], (True, 2))
+        self.assertEqual(flags[self.posts[3].id], (False, 1))
+        self.assertEqual(flags[self.posts[0].id], (False, 0))
+        self.assertEqual(sum('blogc_like' in q['sql'] for q in queries), 1)
+
+    def test_detail_flags_follow_like_toggle(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('post-detail', args=[self.posts[0].id])
+        self.assertFalse(self.client.get(url).data['liked_by_me'])
+
+        self.client.post(reverse('post-like', args=[self.posts[0].id]))
+
+        self.assertTrue(self.client.get(url).data['liked_by_me'])
+
+    def test_anonymous_skips_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get(reverse('post-list')).data['results']
+
+        self.assertFalse(any(row['liked_by_me'] for row in results))
+        self.assertFalse(any('blogc_like' in q['sql'] for q in queries))
+
+
+class LikeToggleTests(APITestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'liker{i}', email=f'liker{i}@test.com', password=None)
+            for i in range(3)
+        ]
+        self.category = BlogCategory.objects.create(name='Likes', slug='likes')
+        self.post = BlogPost.objects.create(
+            title='Viral post', author=self.users[0], category=self.category, content='Body'
+        )
+        self.url = reverse('post-like', args=[self.post.id])
+
+    def assertLikes(self, count):
+        self.post.refresh_from_db()
+        self.assertEqual(Like.objects.filter(post=self.post).count(), count)
+        self.assertEqual(self.post.likes_count, count)
+        self.assertEqual(BlogCategoryStats.objects.get(category=self.category).total_likes, count)
+
+    def test_toggle_is_a_conditional_write(self):
+        self.client.force_authenticate(user=self.users[1])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 201)
+        self.assertLikes(1)
+        # No read-before-write on the like table
+        self.assertFalse(any(q['sql'].startswith('SELECT') and 'blogc_like' in q['sql'] for q in queries))
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLikes(0)
+
+    def test_missing_post_is_404(self):
+        self.client.force_authenticate(user=self.users[1])
+        self.assertEqual(self.client.post(reverse('post-like', args=[self.post.id + 100])).status_code, 404)
+
+    def test_toggle_invalidates_cached_responses(self):
+        detail = reverse('post-detail', args=[self.post.id])
+        self.assertEqual(self.client.get(detail).data['likes_count'], 0)
+
+        self.client.force_authenticate(user=self.users[1])
+        self.client.post(self.url)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(detail).data['likes_count'], 1)
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'LIKE_BUFFER': True})
+    def test_buffered_toggles_are_flushed_in_one_batch(self):
+        with mock.patch.object(likes.LikeBuffer, '_start_flusher'):
+            for user in self.users:
+                self.client.force_authenticate(user=user)
+                self.assertEqual(self.client.post(self.url).status_code, 201)
+            # Liked then unliked before the flush: nothing to write
+            self.assertEqual(self.client.post(self.url).status_code, 200)
+            self.assertLikes(0)
+            self.assertFalse(self.client.get(reverse('post-detail', args=[self.post.id])).data['liked_by_me'])
+            self.client.force_authenticate(user=self.users[0])
+            self.assertTrue(self.client.get(reverse('post-detail', args=[self.post.id])).data['liked_by_me'])
+
+            self.assertEqual(likes.buffer.flush(), 3)
+
+        self.assertLikes(2)
+        self.assertEqual(len(likes.buffer), 0)
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'LIKE_BUFFER': True, 'LIKE_BATCH_SIZE': 1})
+    def test_full_buffer_is_flushed_by_the_flusher(self):
+        self.client.force_authenticate(user=self.users[1])
+        with mock.patch.object(likes.LikeBuffer, '_start_flusher'), \
+                mock.patch.object(likes.LikeBuffer, '_write', side_effect=RuntimeError('database down')):
+            # A failing flush doesn't fail the toggle that filled the buffer
+            self.assertEqual(self.client.post(self.url).status_code, 201)
+            self.assertTrue(likes.buffer._full.is_set())
+            self.assertEqual(len(likes.buffer), 1)
+        self.assertEqual(likes.buffer.flush(), 1)
+        likes.buffer._full.clear()
+        self.assertLikes(1)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'HASH_WORKERS': 0},
+)
+class IdentifierBackendTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='Reader@Example.com', password='secret-pass')
+        self.url = reverse('token_obtain_pair')
+
+    def login(self, identifier, password='secret-pass'):
+        return self.client.post(self.url, {'username': identifier, 'password': password}, format='json')
+
+    def count_hashes(self, identifier, password='secret-pass'):
+        from django.contrib.auth.hashers import MD5PasswordHasher
+
+        with mock.patch.object(MD5PasswordHasher, 'encode', autospec=True,
+                               side_effect=MD5PasswordHasher.encode) as encode:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.login(identifier, password)
+        return response, encode.call_count, queries
+
+    def test_email_login_is_case_insensitive(self):
+        response = self.login('reader@example.COM')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(self.login('reader').status_code, 200)
+
+    def test_one_hash_and_one_lookup_per_attempt(self):
+        for identifier, password in [
+            ('reader@example.com', 'secret-pass'),
+            ('reader@example.com', 'wrong'),
+            ('reader', 'wrong'),
+            ('nobody@example.com', 'secret-pass'),
+            ('nobody', 'secret-pass'),
+        ]:
+            with self.subTest(identifier=identifier, password=password):
+                response, hashes, queries = self.count_hashes(identifier, password)
+                self.assertEqual(hashes, 1)
+                lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'auth_user' in q['sql']]
+                self.assertEqual(len(lookups), 1, lookups)
+
+    def test_username_containing_at_sign_wins_over_email(self):
+        other = User.objects.create_user(username='reader@example.com', email='x@example.com', password='other-pass')
+        self.assertEqual(self.login('reader@example.com', 'other-pass').status_code, 200)
+        self.assertEqual(AccessToken(self.login('reader@example.com', 'other-pass').json()['access'])['user_id'],
+                         str(other.id))
+
+    def test_shared_email_is_refused(self):
+        User.objects.create_user(username='twin', email='reader@example.com', password='secret-pass')
+        self.assertEqual(self.login('reader@example.com').status_code, 400)
+        self.assertEqual(self.login('reader').status_code, 200)
+        # Costs one hash like any other failed attempt, so timing doesn't tell the email is shared
+        for password in ('secret-pass', 'wrong'):
+            response, hashes, _ = self.count_hashes('reader@example.com', password)
+            self.assertEqual((response.status_code, hashes), (400, 1))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'HASH_WORKERS': 0},
+)
+class HashingPoolTests(APITestCase):
+    def test_register_then_login_through_the_pool(self):
+        completed = hashing.pool.stats()['completed']
+        response = self.client.post(reverse('auth-register'), {
+            'username': 'newcomer', 'email': 'newcomer@test.com', 'password': 'secret-pass',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'newcomer')
+        self.assertNotIn('password', response.json())
+        self.assertTrue(User.objects.get(username='newcomer').check_password('secret-pass'))
+
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'newcomer', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'newcomer')
+        self.assertEqual(hashing.pool.stats()['completed'], completed + 2)
+
+    def test_invalid_input_is_400(self):
+        response = self.client.post(reverse('auth-register'), {'username': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json())
+        response = self.client.post(reverse('token_obtain_pair'), '{nope', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_saturated_pool_is_503(self):
+        with mock.patch.object(hashing.pool, 'run', side_effect=hashing.PoolSaturated):
+            response = self.client.post(reverse('token_obtain_pair'), {'username': 'a', 'password': 'b'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'HASH_WORKERS': 1, 'HASH_QUEUE_LIMIT': 1})
+    def test_pool_is_bounded(self):
+        pool = hashing.HashingPool()
+        release = threading.Event()
+
+        async def storm():
+            jobs = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(hashing.PoolSaturated):
+                await pool.run(release.wait, 5)
+            stats = pool.stats()
+            release.set()
+            return stats, await asyncio.gather(*jobs)
+
+        stats, results = asyncio.run(storm())
+        self.assertEqual(results, [True, True])
+        self.assertEqual(stats['running'] + stats['queued'], 2)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(pool.stats()['completed'], 2)
+        pool._executor.shutdown()
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'HASH_WORKERS': 1, 'HASH_QUEUE_LIMIT': 2})
+    def test_cancelled_job_gives_its_slot_back(self):
+        pool = hashing.HashingPool()
+        release = threading.Event()
+        calls = []
+
+        async def disconnect():
+            running = asyncio.ensure_future(pool.run(release.wait, 5))
+            queued = [asyncio.ensure_future(pool.run(calls.append, i)) for i in range(2)]
+            await asyncio.sleep(0.05)
+            for job in queued:
+                job.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+            stats = pool.stats()
+            release.set()
+            await running
+            return stats
+
+        stats = asyncio.run(disconnect())
+        self.assertEqual((stats['running'], stats['queued']), (1, 0))
+        pool._executor.shutdown(wait=True)
+        self.assertEqual(calls, [])
+        self.assertEqual((pool.stats()['running'], pool.stats()['queued'], pool.stats()['completed']), (0, 0, 1))
+
+
+class ClaimsAuthTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chief', email='chief@test.com', password=None)
+        self.admin.profile.is_blog_admin = True
+        self.admin.profile.role = 'admin'
+        self.admin.profile.save()
+        self.other = User.objects.create_user(username='other', email='other@test.com', password=None)
+        self.stats_url = reverse('debug-cache-stats')
+
+    def bearer(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_admin_reads_run_no_auth_queries(self):
+        refresh = MyTokenObtainPairSerializer.get_token(self.admin)
+        access = refresh.access_token
+        self.assertEqual((access['role'], access['is_blog_admin']), ('admin', True))
+        self.bearer(access)
+
+        self.assertEqual(self.client.get(self.stats_url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.stats_url).status_code, 200)
+        self.assertEqual(len(queries), 0, [q['sql'] for q in queries])
+
+    def test_role_change_invalidates_tokens_until_refresh(self):
+        refresh = MyTokenObtainPairSerializer.get_token(self.admin)
+        self.bearer(refresh.access_token)
+        self.assertEqual(self.client.get(self.stats_url).status_code, 200)
+
+        profile = UserProfile.objects.get(user=self.admin)
+        profile.is_blog_admin = False
+        profile.save()
+        self.assertEqual(self.client.get(self.stats_url).status_code, 401)
+
+        self.client.credentials()
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertFalse(access['is_blog_admin'])
+        self.bearer(access)
+        self.assertEqual(self.client.get(self.stats_url).status_code, 403)
+
+    def test_revoke_tokens_and_deactivation(self):
+        self.bearer(MyTokenObtainPairSerializer.get_token(self.other).access_token)
+        self.assertEqual(self.client.get(reverse('post-my-posts')).status_code, 200)
+        from .authentication import revoke_tokens
+
+        revoke_tokens(self.other.pk)
+        self.assertEqual(self.client.get(reverse('post-my-posts')).status_code, 401)
+
+        self.bearer(MyTokenObtainPairSerializer.get_token(self.other).access_token)
+        self.other.is_active = False
+        self.other.save()
+        self.assertEqual(self.client.get(reverse('post-my-posts')).status_code, 401)
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.bearer(AccessToken.for_user(self.admin))
+        self.assertEqual(self.client.get(self.stats_url).status_code, 200)
+
+    def test_claims_user_can_write_only_its_own_comments(self):
+        category = BlogCategory.objects.create(name='Claims', slug='claims')
+        post = BlogPost.objects.create(title='Claims', author=self.admin, category=category, content='Body')
+        self.bearer(MyTokenObtainPairSerializer.get_token(self.other).access_token)
+        response = self.client.post(reverse('post-comments', args=[post.id]), {'body': 'Mine'})
+        self.assertEqual(response.status_code, 201)
+        comment = Comment.objects.get(post=post)
+        self.assertEqual(comment.user_id, self.other.id)
+
+        admin_comment = Comment.objects.create(post=post, user=self.admin, body='Admin')
+        url = reverse('comment-detail', args=[admin_comment.id])
+        self.assertEqual(self.client.patch(url, {'body': 'Edited'}).status_code, 403)
+        self.assertEqual(self.client.patch(reverse('comment-detail', args=[comment.id]), {'body': 'Edited'}).status_code, 200)
+
+    def test_is_blog_admin_does_not_write(self):
+        UserProfile.objects.filter(user=self.other).delete()
+        user = User.objects.select_related('profile').get(pk=self.other.pk)
+        request = APIRequestFactory().get('/')
+        request.user = user
+        self.assertFalse(IsBlogAdmin().has_permission(request, None))
+        self.assertFalse(UserProfile.objects.filter(user=self.other).exists())
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rotator', email='rotator@test.com', password=None)
+        self.url = reverse('token_refresh')
+        revocation.revoked.reset()
+
+    def refresh(self, token):
+        return self.client.post(self.url, {'refresh': str(token)})
+
+    def test_rotated_token_cannot_be_replayed(self):
+        first = MyTokenObtainPairSerializer.get_token(self.user)
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+        second = response.data['refresh']
+
+        self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(second).status_code, 200)
+
+    def test_unrevoked_check_skips_the_blacklist_query(self):
+        token = MyTokenObtainPairSerializer.get_token(self.user)
+        revocation.revoked.sync(force=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(token).status_code, 200)
+        reads = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'blacklistedtoken' in q['sql']]
+        self.assertEqual(reads, [])
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'BLACKLIST_SYNC_INTERVAL': 0})
+    def test_tokens_revoked_elsewhere_are_picked_up(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        token = MyTokenObtainPairSerializer.get_token(self.user)
+        revocation.revoked.sync(force=True)
+        # As if another process revoked it (e.g. on logout)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    @override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'BLACKLIST_SYNC_INTERVAL': 0})
+    def test_rows_committed_out_of_id_order_are_picked_up(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        slow, fast = (MyTokenObtainPairSerializer.get_token(self.user) for _ in range(2))
+        # The slow transaction took id 5 but commits after id 10 has been synced
+        BlacklistedToken.objects.create(id=10, token=OutstandingToken.objects.get(jti=fast['jti']))
+        revocation.revoked.sync(force=True)
+        BlacklistedToken.objects.create(id=5, token=OutstandingToken.objects.get(jti=slow['jti']))
+        # (A refresh would fail anyway, on blacklisting the token again)
+        self.assertTrue(revocation.revoked.is_revoked(slow['jti']))
+
+    def test_bloom_filter(self):
+        bloom = revocation.BloomFilter(1000, 0.01)
+        keys = [f'jti-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_prune_expired(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        live = MyTokenObtainPairSerializer.get_token(self.user)
+        old = OutstandingToken.objects.create(
+            jti='expired', user=self.user, token='x', expires_at=timezone.now() - timedelta(days=1)
+        )
+        BlacklistedToken.objects.create(token=old)
+        self.assertEqual(revocation.prune_expired(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@test.com', password=None)
+        self.category = BlogCategory.objects.create(name='Async', slug='async')
+        self.posts = [
+            BlogPost.objects.create(title=f'Async {i}', author=self.user, category=self.category,
+                                    content='Body', published=True)
+            for i in range(12)
+        ]
+        self.post = self.posts[-1]
+        for i in range(3):
+            Comment.objects.create(post=self.post, user=self.user, body=f'Comment {i}')
+        Like.objects.create(post=self.post, user=self.user)
+        cache.clear()
+
+    def same_json(self, sync_url, async_url):
+        sync_response = self.client.get(sync_url)
+        cache.clear()
+        async_response = self.client.get(async_url)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # Links point at the endpoint that served them
+        expected = sync_response.json()
+        actual = async_response.json()
+        for body in (expected, actual):
+            if isinstance(body, dict):
+                body.pop('next', None)
+                body.pop('previous', None)
+        self.assertEqual(actual, expected)
+        return actual
+
+    def test_same_json_as_sync_endpoints(self):
+        pk = self.post.pk
+        self.same_json('/api/posts/', '/api/async/posts/')
+        self.same_json('/api/posts/latest/', '/api/async/posts/latest/')
+        self.same_json(f'/api/posts/{pk}/', f'/api/async/posts/{pk}/')
+        self.same_json(f'/api/posts/{pk}/comments/', f'/api/async/posts/{pk}/comments/')
+        self.same_json('/api/categories/', '/api/async/categories/')
+        self.same_json(f'/api/categories/{self.category.pk}/posts/', f'/api/async/categories/{self.category.pk}/posts/')
+
+    def test_viewer_flags_for_authenticated_user(self):
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = self.same_json(f'/api/posts/{self.post.pk}/', f'/api/async/posts/{self.post.pk}/')
+        self.assertTrue(data['liked_by_me'])
+        self.assertEqual(data['my_comments_count'], 3)
+        self.same_json('/api/posts/', '/api/async/posts/')
+
+    def test_cursor_pagination(self):
+        first = self.client.get('/api/async/posts/?page_size=8').json()
+        self.assertTrue(first['next'].startswith('http://testserver/api/async/posts/?cursor='))
+        second = self.client.get(first['next']).json()
+        seen = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(sorted(seen, reverse=True), sorted(p.pk for p in self.posts)[::-1])
+
+    def test_errors(self):
+        response = self.client.get('/api/async/posts/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), self.client.get('/api/posts/999999/').json())
+        self.assertEqual(self.client.get('/api/async/posts/?cursor=garbage').status_code, 404)
+        self.assertEqual(self.client.post('/api/async/posts/').status_code, 405)
+
+    def test_anonymous_responses_are_cached(self):
+        self.client.get('/api/async/posts/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/async/posts/').status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+
+@override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'STREAM_CHUNK_SIZE': 4})
+class StreamingListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', email='streamer@test.com', password=None)
+        self.category = BlogCategory.objects.create(name='Streams', slug='streams')
+        self.posts = [
+            BlogPost.objects.create(title=f'Stream {i}', author=self.user, category=self.category,
+                                    content='Line one\nline "two"', published=True)
+            for i in range(10)
+        ]
+        Like.objects.create(post=self.posts[3], user=self.user)
+
+    def body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_json_array_has_every_post(self):
+        import json
+
+        response = self.client.get('/api/posts/?stream=json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        rows = json.loads(self.body(response))
+        self.assertEqual([row['id'] for row in rows], [p.pk for p in reversed(self.posts)])
+        # Same rows as the paginated endpoint
+        page = self.client.get('/api/posts/').json()['results']
+        self.assertEqual(rows[:len(page)], page)
+
+    def test_ndjson(self):
+        import json
+
+        response = self.client.get('/api/posts/?stream=ndjson&fields=id,content')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.body(response).splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])['content'], 'Line one\nline "two"')
+
+    def test_viewer_flags_one_query_per_chunk(self):
+        import json
+
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/posts/my-posts/?stream=ndjson')
+        with CaptureQueriesContext(connection) as queries:
+            rows = [json.loads(line) for line in self.body(response).splitlines()]
+        # One SELECT for the rows plus a flags query per chunk of 4
+        self.assertEqual(len(queries), 1 + 3)
+        liked = [row['id'] for row in rows if row['liked_by_me']]
+        self.assertEqual(liked, [self.posts[3].pk])
+
+    def test_empty_and_unknown_format(self):
+        import json
+
+        BlogPost.objects.all().delete()
+        self.assertEqual(json.loads(self.body(self.client.get('/api/posts/?stream=json'))), [])
+        self.assertEqual(self.client.get('/api/posts/?stream=xml').status_code, 400)
+
+    def test_debug_images_streams(self):
+        import json
+
+        rows = json.loads(self.body(self.client.get(reverse('debug-images'))))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(set(rows[0]), {'id', 'title', 'image_url', 'image_starts_with_http', 'absolute_url'})
+
+
+class ProjectionContractTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='projector', email='projector@test.com',
+                                               first_name='Zoë', password=None)
+        UserProfile.objects.filter(user=self.author).update(role='admin', is_blog_admin=True)
+        self.bare = User.objects.create_user(username='bare', email='', password=None)
+        UserProfile.objects.filter(user=self.bare).delete()
+        self.category = BlogCategory.objects.create(name='Café', slug='cafe')
+        self.posts = [
+            BlogPost.objects.create(title='Line\u2028separator 🚀', author=self.author, category=self.category,
+                                    content='Travel "quoted" <b>tags</b>\nnewline'),
+            BlogPost.objects.create(title='No category', author=self.bare, category=None, content='Travel light'),
+            BlogPost.objects.create(title='With image', author=self.author, category=self.category, content='x'),
+        ]
+        variants = {'source': 'post_images/a.jpg'}
+        variants.update({name: {'webp': f'post_images/a-{name}.webp', 'jpeg': f'post_images/a-{name}.jpg',
+                                'width': width, 'height': width // 2} for name, width in VARIANTS.items()})
+        BlogPost.objects.filter(pk=self.posts[2].pk).update(image='post_images/a.jpg', image_variants=variants,
+                                                            likes_count=3, comments_count=2)
+        BlogPost.objects.filter(pk=self.posts[1].pk).update(image='post_images/stale.jpg', image_variants=variants)
+        Like.objects.create(post=self.posts[0], user=self.author)
+        for user in (self.author, self.bare):
+            Comment.objects.create(post=self.posts[0], user=user, body='Ünïcode comment')
+        self.request = APIRequestFactory().get('/api/posts/')
+
+    def assertSameBytes(self, serializer_class, queryset, user=None):
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.request import Request
+        from django.contrib.auth.models import AnonymousUser
+        from .projections import Projection
+        from .renderers import FastJSONRenderer
+
+        request = Request(self.request)
+        request.user = user or AnonymousUser()
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context={'request': request}).data)
+        projection = Projection(serializer_class)
+        actual = FastJSONRenderer().render(projection.serialize(projection.values(queryset), {'request': request}))
+        self.assertEqual(actual, expected)
+        return expected
+
+    def test_post_list_serializer(self):
+        from .serializers import BlogPostListSerializer
+
+        queryset = BlogPost.objects.select_related('author__profile', 'category')
+        body = self.assertSameBytes(BlogPostListSerializer, queryset)
+        self.assertIn(b'\\u2028', body)
+        self.assertIn(b'"image_srcset":{"thumb"', body)
+        self.assertSameBytes(BlogPostListSerializer, queryset, user=self.author)
+        with timezone.override('Asia/Bangkok'):
+            self.assertIn(b'+07:00"', self.assertSameBytes(BlogPostListSerializer, queryset))
+
+    def test_expression_ordering(self):
+        from django.db.models import F
+        from .serializers import BlogPostListSerializer
+
+        queryset = BlogPost.objects.select_related('author__profile', 'category').order_by(F('created_at').desc())
+        self.assertSameBytes(BlogPostListSerializer, queryset)
+
+    def test_comment_serializer(self):
+        from .serializers import CommentSerializer
+
+        self.assertSameBytes(CommentSerializer, Comment.objects.select_related('user__profile'))
+
+    def test_endpoints_match_serializers(self):
+        urls = ['/api/posts/?search=travel&highlight=true', '/api/posts/?ordering=updated_at&page_size=2',
+                '/api/posts/latest/', f'/api/categories/{self.category.pk}/posts/',
+                f'/api/posts/{self.posts[0].pk}/comments/', '/api/posts/?stream=json']
+        token = MyTokenObtainPairSerializer.get_token(self.author).access_token
+        for auth in (None, f'Bearer {token}'):
+            self.client.credentials(**({'HTTP_AUTHORIZATION': auth} if auth else {}))
+            for url in urls:
+                bodies = []
+                for enabled in (True, False):
+                    cache.clear()
+                    with override_settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS,
+                                                           'PROJECTION_SERIALIZERS': enabled}):
+                        response = self.client.get(url)
+                    bodies.append(b''.join(response.streaming_content) if response.streaming else response.content)
+                with self.subTest(url=url, authenticated=bool(auth)):
+                    self.assertEqual(bodies[0], bodies[1])
+        self.assertIn(b'"highlight"', self.client.get('/api/posts/?search=travel&highlight=true').content)
+
+    def test_unsupported_fields_are_refused(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from rest_framework import serializers
+        from .projections import Projection
+
+        class Unregistered(serializers.ModelSerializer):
+            shout = serializers.SerializerMethodField()
+
+            class Meta:
+                model = BlogPost
+                fields = ('id', 'shout')
+
+            def get_shout(self, obj):
+                return obj.title.upper()
+
+        with self.assertRaises(ImproperlyConfigured):
+            Projection(Unregistered)
+
+    def test_dumps_matches_json_renderer(self):
+        import datetime
+        import decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import dumps
+
+        data = {
+            'when': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1),
+            'price': decimal.Decimal('1.50'),
+            'lazy': gettext_lazy('Hello'),
+            'text': 'a b c é "q"',
+            'big': 2 ** 70,
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(dumps(data), JSONRenderer().render(data))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='sparse', email='sparse@test.com', password=None)
+        self.category = BlogCategory.objects.create(name='Sparse', slug='sparse')
+        self.post = BlogPost.objects.create(
+            title='Long read', author=self.author, category=self.category,
+            content='<p>Fish &amp; chips</p> ' + 'word ' * 448,
+        )
+        Comment.objects.create(post=self.post, user=self.author, body='First')
+
+    def content_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        content_column = [q['sql'] for q in queries if '"blogc_blogpost"."content"' in q['sql']]
+        return response, body, content_column
+
+    def test_summary_is_stored_on_save(self):
+        self.assertTrue(self.post.excerpt.startswith('Fish & chips word'))
+        self.assertTrue(self.post.excerpt.endswith('…'))
+        self.assertLessEqual(len(self.post.excerpt), 200)
+        self.assertEqual((self.post.word_count, self.post.reading_time), (451, 3))
+
+        self.post.content = 'Short <em>one</em>'
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.excerpt, self.post.word_count, self.post.reading_time), ('Short one', 2, 1))
+
+    def test_backfill_command(self):
+        BlogPost.objects.update(excerpt='', word_count=0, reading_time=0)
+        out = StringIO()
+        call_command('backfill_excerpts', stdout=out)
+        self.assertIn('Updated 1 posts', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.word_count, self.post.reading_time), (451, 3))
+        self.assertTrue(self.post.excerpt.startswith('Fish & chips'))
+
+    def test_list_fields_narrow_payload_and_sql(self):
+        from .fieldsets import available_fields
+        from .serializers import BlogPostListSerializer
+
+        for enabled in (True, False):
+            with self.subTest(projection=enabled), override_settings(
+                BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'PROJECTION_SERIALIZERS': enabled}
+            ):
+                for url in ('/api/posts/?fields=title,id,excerpt', '/api/async/posts/?fields=title,id,excerpt',
+                            f'/api/categories/{self.category.pk}/posts/?fields=id,title,excerpt',
+                            '/api/posts/?fields=id,title,excerpt&stream=ndjson'):
+                    cache.clear()
+                    response, body, content_sql = self.content_queries(url)
+                    self.assertEqual(response.status_code, 200, url)
+                    row = json.loads(body.splitlines()[0]) if 'stream=' in url else response.json()['results'][0]
+                    self.assertEqual(list(row), ['id', 'title', 'excerpt'], url)
+                    self.assertEqual(content_sql, [], url)
+
+                # content is only sent when ?fields= asks for it
+                cache.clear()
+                every = ','.join(available_fields(BlogPostListSerializer))
+                full = self.client.get(f'/api/posts/?fields={every}').json()['results'][0]
+                for url in ('/api/posts/', '/api/posts/?omit=content'):
+                    cache.clear()
+                    response, body, content_sql = self.content_queries(url)
+                    row = response.json()['results'][0]
+                    self.assertEqual(list(row), [name for name in full if name != 'content'], url)
+                    self.assertEqual(content_sql, [], url)
+                    self.assertLess(len(json.dumps(row)) * 3, len(json.dumps(full)), url)
+
+                cache.clear()
+                response = self.client.get('/api/posts/?omit=author')
+                self.assertEqual(list(response.json()['results'][0]),
+                                 [name for name in full if name not in ('content', 'author')])
+                self.assertEqual(self.client.get('/api/posts/?fields=id,content').json()['results'][0]['content'],
+                                 self.post.content)
+
+    def test_detail_fields(self):
+        for prefix in ('/api/', '/api/async/'):
+            url = f'{prefix}posts/{self.post.pk}/'
+            with self.subTest(url=url):
+                cache.clear()
+                response, body, content_sql = self.content_queries(url + '?fields=id,title,reading_time')
+                self.assertEqual(response.json(), {'id': self.post.pk, 'title': 'Long read', 'reading_time': 3})
+                self.assertEqual(content_sql, [])
+                cache.clear()
+                data = self.client.get(url + '?omit=content').json()
+                self.assertEqual(len(data['comments']), 1)
+                self.assertNotIn('content', data)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/posts/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+        self.assertEqual(self.client.get('/api/posts/?omit=nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/async/posts/?fields=nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/posts/?fields=id&omit=id').status_code, 400)
+        # The list has no `comments` key to select
+        self.assertEqual(self.client.get('/api/posts/?fields=comments').status_code, 400)
+
+
+class QueryIndexTests(APITestCase):
+    def test_endpoint_queries_use_the_indexes(self):
+        author = User.objects.create_user(username='indexed', email='indexed@test.com', password=None)
+        category = BlogCategory.objects.create(name='Indexed', slug='indexed')
+        for i in range(3):
+            post = BlogPost.objects.create(title=f'Indexed {i}', author=author, category=category, content='x')
+        Comment.objects.create(post=post, user=author, body='Hi')
+        out = StringIO()
+        call_command('explain_queries', '--strict', stdout=out)
+        plans = out.getvalue()
+        for index in ('blogc_post_created_idx', 'blogc_post_published_idx', 'blogc_post_category_idx',
+                      'blogc_post_author_idx', 'blogc_comment_post_idx', 'blogc_comment_user_idx'):
+            self.assertIn(index, plans)
+        self.assertNotIn('TEMP B-TREE', plans)
+
+
+# Pool threads can't see the test transaction's rows
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'HASH_WORKERS': 0},
+)
+class EndpointBenchTests(APITestCase):
+    def fingerprint(self):
+        posts = BlogPost.objects.order_by('created_at').values_list(
+            'title', 'content', 'excerpt', 'created_at', 'published', 'category__slug', 'author__username',
+            'likes_count', 'comments_count',
+        )
+        return list(posts), Comment.objects.count(), Like.objects.count()
+
+    def test_every_route_is_covered(self):
+        from .benchsuite import uncovered_routes
+
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_seeding_is_deterministic(self):
+        from .benchsuite import seed_dataset
+
+        seed_dataset(40, seed=3)
+        first = self.fingerprint()
+        for model in (Like, Comment, BlogPost, BlogCategory, User):
+            model.objects.all().delete()
+        seed_dataset(40, seed=3)
+        self.assertEqual(self.fingerprint(), first)
+        self.assertEqual(len(first[0]), 40)
+        self.assertTrue(first[1] and first[2])
+
+    def test_suite_drives_every_endpoint(self):
+        from .benchsuite import ENDPOINTS, run_suite, seed_dataset
+
+        dataset = seed_dataset(40)
+        # As bench_endpoints does by default, so anonymous GETs aren't cache hits
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            results = run_suite(dataset, requests=2)
+        self.assertEqual(list(results), [endpoint.label for endpoint in ENDPOINTS])
+        failed = {label: result['status'] for label, result in results.items() if not result['ok']}
+        self.assertEqual(failed, {})
+        self.assertGreater(results['GET post-list']['queries'], 0)
+        self.assertGreater(results['GET post-list']['bytes'], results['GET post-list ?fields=id,title,excerpt']['bytes'])
+        self.assertEqual(results['GET post-list']['count'], 2)
+
+    def test_compare_results(self):
+        from .benchsuite import compare_results
+
+        base = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3, 'bytes': 1000}
+        baseline = {'1k': {'GET a': base, 'GET b': base, 'GET c': base, 'GET gone': base}}
+        current = {'1k': {
+            'GET a': {**base, 'p50_ms': 11.0, 'p95_ms': 21.5, 'bytes': 1100},  # within the threshold
+            'GET b': {**base, 'p95_ms': 30.0, 'queries': 4},
+            'GET c': {**base, 'bytes': 1500},
+            'GET new': base,
+        }}
+        self.assertEqual(compare_results(baseline, current, threshold=0.2, min_delta_ms=2.0), [
+            '1k GET b: p95_ms 20.0 -> 30.0', '1k GET b: queries 3 -> 4', '1k GET c: bytes 1000 -> 1500',
+        ])
+        # Small absolute changes are noise however large in relative terms
+        tiny = {'1k': {'GET a': {**base, 'p50_ms': 0.5}}}
+        self.assertEqual(compare_results(tiny, {'1k': {'GET a': {**base, 'p50_ms': 1.5}}}), [])
@@ -0,0 +1,171 @@
+# uploads.py
+"""
+Background upload of post images.
+
+With BLOGC_SETTINGS['ASYNC_UPLOADS'] on, PostViewSet.perform_create
+spools the uploaded file to local disk, commits the post straight away
+with image_status='pending', and returns 201. upload_pending() then
+pushes the file to the post's image storage (S3 in production) from a
+worker thread, retrying with exponential backoff, and flips the post to
+'ready' (or 'failed').
+
+The spool path is stored on the post, so `manage.py resume_uploads` can
+finish uploads that were interrupted by a restart.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+
+from . import cache
+from .metrics import summarize
+from .images import process_post_image
+
+logger = logging.getLogger(__name__)
+
+# Recent timings in seconds, reported by upload_stats()
+_timings = {
+    'spool': deque(maxlen=1000),        # request thread: copy upload to local disk
+    'upload': deque(maxlen=1000),       # worker: storage.save() incl. retries
+    'end_to_end': deque(maxlen=1000),   # spooled -> post marked ready
+}
+_timings_lock = threading.Lock()
+_executor = None
+
+
+def _setting(name, default):
+    return settings.BLOGC_SETTINGS.get(name, default)
+
+
+def async_uploads_enabled():
+    return _setting('ASYNC_UPLOADS', False)
+
+
+def _record(kind, seconds):
+    with _timings_lock:
+        _timings[kind].append(seconds)
+
+
+def upload_stats():
+    with _timings_lock:
+        return {kind: summarize(list(samples)) for kind, samples in _timings.items()}
+
+
+def spool_dir():
+    path = _setting('UPLOAD_SPOOL_DIR', None) or os.path.join(settings.BASE_DIR, 'upload_spool')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool(uploaded_file):
+    """Copy an uploaded file to the local spool directory and return its path."""
+    started = time.perf_counter()
+    filename = os.path.basename(uploaded_file.name)
+    path = os.path.join(spool_dir(), f'{uuid.uuid4().hex}__{filename}')
+    with open(path, 'wb') as out:
+        for chunk in uploaded_file.chunks():
+            out.write(chunk)
+    _record('spool', time.perf_counter() - started)
+    return path
+
+
+def _original_name(spool_path):
+    return os.path.basename(spool_path).split('__', 1)[-1]
+
+
+def _current_status(post_id):
+    from .models import BlogPost
+
+    return BlogPost.objects.filter(pk=post_id).values_list('image_status', flat=True).first()
+
+
+def upload_pending(post_id):
+    """
+    Push one post's spooled image to storage. Returns the post's image
+    status afterwards (None if the post is gone). If the image was
+    replaced or cleared meanwhile, the post is left alone and the
+    uploaded copy is deleted again.
+    """
+    from .models import BlogPost
+
+    post = BlogPost.objects.filter(pk=post_id, image_status=BlogPost.IMAGE_PENDING).first()
+    if post is None:
+        return None
+    path = post.pending_image
+    # Only this upload's own pending state is ours to change
+    own = BlogPost.objects.filter(pk=post_id, image_status=BlogPost.IMAGE_PENDING, pending_image=path)
+    if not os.path.exists(path):
+        logger.error('Spooled image for post %s is missing: %s', post_id, path)
+        if own.update(image_status=BlogPost.IMAGE_FAILED):
+            cache.invalidate_post(post_id, post.category_id)
+        return _current_status(post_id)
+
+    field = BlogPost._meta.get_field('image')
+    retries = _setting('UPLOAD_RETRIES', 3)
+    backoff = _setting('UPLOAD_RETRY_BACKOFF', 0.5)
+    started = time.perf_counter()
+    name = None
+    for attempt in range(retries + 1):
+        try:
+            with open(path, 'rb') as fh:
+                target = field.generate_filename(post, _original_name(path))
+                name = field.storage.save(target, File(fh), max_length=field.max_length)
+            break
+        except Exception as e:
+            logger.warning('Upload attempt %s for post %s failed: %s', attempt + 1, post_id, e)
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+    _record('upload', time.perf_counter() - started)
+
+    if name is None:
+        if own.update(image_status=BlogPost.IMAGE_FAILED):
+            cache.invalidate_post(post_id, post.category_id)
+            return BlogPost.IMAGE_FAILED
+        os.remove(path)
+        return _current_status(post_id)
+
+    if not own.update(image=name, image_status=BlogPost.IMAGE_READY, pending_image=''):
+        logger.info('Image of post %s changed during its upload; discarding %s', post_id, name)
+        field.storage.delete(name)
+        os.remove(path)
+        return _current_status(post_id)
+    cache.invalidate_post(post_id, post.category_id)
+    _record('end_to_end', time.time() - os.path.getmtime(path))
+    os.remove(path)
+    logger.info('Uploaded image for post %s as %s', post_id, name)
+
+    # update() skips post_save, so build the resized variants here, right
+    # after the upload and on the same thread
+    process_post_image(post_id)
+    return BlogPost.IMAGE_READY
+
+
+def _run_in_worker(post_id):
+    try:
+        upload_pending(post_id)
+    except Exception:
+        logger.exception('Background upload crashed for post %s', post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_upload(post_id):
+    """
+    Upload after the current transaction commits: on a worker thread, or
+    inline when UPLOAD_WORKERS is 0.
+    """
+    global _executor
+    workers = _setting('UPLOAD_WORKERS', 2)
+    if not workers:
+        transaction.on_commit(lambda: upload_pending(post_id))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blogc-uploads')
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, post_id))
@@ -2,20 +2,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    RegisterView,
-    PublicTokenObtainPairView,
+    AsyncRegisterView,
+    AsyncLoginView,
     PublicTokenRefreshView,
     PostViewSet,
     CategoryListView,
     PublicCategoryDetailView,
+    CategoryPostsView,
     AdminCategoryDetailView,
     CommentListCreateView,
     CommentDetailView,
     ToggleLikeView,
     S3TestView,
-    DebugImageView
+    DebugImageView,
+    CacheStatsView,
+    UploadStatsView,
+    HashingStatsView
 )
-from . import views
+from . import async_views, views
 
 # Router setup (only for posts, not categories to avoid duplication)
 router = DefaultRouter()
@@ -23,13 +27,15 @@ router.register(r'posts', PostViewSet, basename='post')
 
 urlpatterns = [
     # Authentication
-    path('register/', RegisterView.as_view(), name='auth-register'),
-    path('login/', PublicTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    # Async: password hashing runs on a bounded pool (blogc/hashing.py)
+    path('register/', AsyncRegisterView.as_view(), name='auth-register'),
+    path('login/', AsyncLoginView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', PublicTokenRefreshView.as_view(), name='token_refresh'),
 
     # Categories
     path('categories/', CategoryListView.as_view(), name='category-list'),  # Public list, POST allowed for admins
     path('categories/<int:pk>/', PublicCategoryDetailView.as_view(), name='category-detail-public'),
+    path('categories/<int:pk>/posts/', CategoryPostsView.as_view(), name='category-posts'),
     path('admin/categories/<int:pk>/', AdminCategoryDetailView.as_view(), name='category-detail-admin'),
 
     path('', include(router.urls)),  # Posts CRUD via router
@@ -38,10 +44,21 @@ urlpatterns = [
     path('posts/<int:post_id>/comments/', CommentListCreateView.as_view(), name='post-comments'),
     path("comments/<int:pk>/", CommentDetailView.as_view(), name="comment-detail"),
 
+    # Async reads of the hot endpoints (blogc/async_views.py), same JSON as above
+    path('async/posts/', async_views.AsyncPostListView.as_view(), name='async-post-list'),
+    path('async/posts/latest/', async_views.AsyncLatestPostsView.as_view(), name='async-post-latest'),
+    path('async/posts/<int:pk>/', async_views.AsyncPostDetailView.as_view(), name='async-post-detail'),
+    path('async/posts/<int:post_id>/comments/', async_views.AsyncCommentListView.as_view(), name='async-post-comments'),
+    path('async/categories/', async_views.AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('async/categories/<int:pk>/posts/', async_views.AsyncCategoryPostsView.as_view(), name='async-category-posts'),
+
     # Likes
     path('posts/<int:post_id>/like-toggle/', ToggleLikeView.as_view(), name='post-like'),
     # for testing display of images
     path('s3-test/', S3TestView.as_view(), name='s3-test'),
     path('debug/storage', views.debug_storage, name='debug-storage'),
     path('debug-images/', DebugImageView.as_view(), name='debug-images'),
+    path('debug/cache-stats/', CacheStatsView.as_view(), name='debug-cache-stats'),
+    path('debug/upload-stats/', UploadStatsView.as_view(), name='debug-upload-stats'),
+    path('debug/hashing-stats/', HashingStatsView.as_view(), name='debug-hashing-stats'),
 ]
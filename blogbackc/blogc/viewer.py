@@ -0,0 +1,57 @@
+# viewer.py
+"""
+Per-user flags on posts: liked_by_me and my_comments_count.
+
+viewer_flags() answers for a whole page of posts with a single query
+(Like UNION Comment, both filtered with post_id__in), so list endpoints
+don't pay per row.
+Anonymous users get the defaults without touching the database.
+"""
+from django.db.models import Count, Value
+
+from .likes import buffer
+from .models import Comment, Like
+
+DEFAULT_FLAGS = {'liked_by_me': False, 'my_comments_count': 0}
+
+
+def _flags_query(user, post_ids):
+    # One round trip: the user's likes and per-post comment counts, UNIONed
+    likes = (
+        Like.objects.filter(user_id=user.pk, post_id__in=post_ids).order_by()
+        .annotate(kind=Value('like'), n=Value(1)).values_list('post_id', 'kind', 'n')
+    )
+    comments = (
+        Comment.objects.filter(user_id=user.pk, post_id__in=post_ids, active=True).order_by()
+        .values('post_id').annotate(kind=Value('comment'), n=Count('pk')).values_list('post_id', 'kind', 'n')
+    )
+    return likes.union(comments, all=True)
+
+
+def _build_flags(user, post_ids, rows):
+    flags = {pk: dict(DEFAULT_FLAGS) for pk in post_ids}
+    for post_id, kind, n in rows:
+        if kind == 'like':
+            flags[post_id]['liked_by_me'] = True
+        else:
+            flags[post_id]['my_comments_count'] = n
+    # Toggles still sitting in the like buffer (see likes.py)
+    for post_id, liked in buffer.pending(user.pk, post_ids).items():
+        flags[post_id]['liked_by_me'] = liked
+    return flags
+
+
+def viewer_flags(user, post_ids):
+    """{post_id: {"liked_by_me": bool, "my_comments_count": int}} for `user`."""
+    post_ids = list(post_ids)
+    if user is None or not user.is_authenticated or not post_ids:
+        return {}
+    return _build_flags(user, post_ids, _flags_query(user, post_ids))
+
+
+async def aviewer_flags(user, post_ids):
+    """viewer_flags() for async views."""
+    post_ids = list(post_ids)
+    if user is None or not user.is_authenticated or not post_ids:
+        return {}
+    return _build_flags(user, post_ids, [row async for row in _flags_query(user, post_ids)])
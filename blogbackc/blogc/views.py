@@ -2,7 +2,7 @@
 from rest_framework import generics, status, viewsets, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.generics import RetrieveAPIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -11,9 +11,9 @@ from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.utils.text import slugify
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import transaction
 
 from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
 from .serializers import (
@@ -23,10 +23,27 @@ from .serializers import (
     CommentSerializer, BlogCategoryDetailSerializer, LikeSerializer
 )
 from .permissions import IsBlogAdmin, IsAuthorOrReadOnly
-from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .likes import toggle_like
+from .pagination import CommentCursorPagination, PostCursorPagination, LatestPostsPagination
+from .fieldsets import requested_fields
+from .projections import narrow, serialize_page
+from .search import PostSearchFilter
+from .cache import cached_response, cache_stats, GLOBAL, CATEGORIES
+from .conditional import conditional_response
+from .streaming import JSON, stream_format, streamable, streaming_response
+from .query_budget import query_budget
+from . import hashing, uploads
+from .authentication import add_claims
+from .revocation import BlacklistRefreshToken
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 # for testing for the image display
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views import View
 import boto3
 from botocore.exceptions import ClientError
@@ -34,6 +51,7 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from .storage_backends import MediaStorage
 
+@query_budget(0)
 def debug_storage(request):
     # Test default storage
     default_storage_class = str(default_storage.__class__)
@@ -55,6 +73,7 @@ def debug_storage(request):
     })
 
 class S3TestView(View):
+    @query_budget(0)
     def get(self, request):
         try:
             s3 = boto3.client(
@@ -90,38 +109,37 @@ class S3TestView(View):
 class DebugImageView(APIView):
     permission_classes = [AllowAny]
     
+    @query_budget(2)
     def get(self, request):
-        posts = BlogPost.objects.all()
-        data = []
-        for post in posts:
-            data.append({
+        # Every post: streamed rather than built up in memory (see streaming.py)
+        posts = BlogPost.objects.only('id', 'title', 'image', 'category_id')
+
+        def serialize(chunk):
+            return [{
                 'id': post.id,
                 'title': post.title,
                 'image_url': post.image.url if post.image else None,
                 'image_starts_with_http': post.image.url.startswith('http') if post.image else False,
                 'absolute_url': request.build_absolute_uri(post.image.url) if post.image else None
-            })
-        return Response(data)
-# ----------------- Registration -----------------
-@method_decorator(csrf_exempt, name='dispatch')
-class RegisterView(generics.CreateAPIView):
-    serializer_class = RegisterSerializer
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    http_method_names = ['post', 'options']
+            } for post in chunk]
 
+        return streaming_response(posts, serialize, stream_format(request) or JSON)
+# ----------------- Registration -----------------
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # role/admin claims let ClaimsJWTAuthentication skip the user lookup
+        return add_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         email_or_username = attrs.get("email") or attrs.get("username")
         password = attrs.get("password")
 
         user = None
         if email_or_username and password:
+            # IdentifierBackend works out whether this is an email or a username
             user = authenticate(request=self.context.get('request'),
-            email=email_or_username, password=password)
-            if not user:
-                user = authenticate(request=self.context.get('request'),
-                username=email_or_username, password=password)
+            username=email_or_username, password=password)
 
         if not user:
             raise serializers.ValidationError(
@@ -136,15 +154,104 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
 
 
-class PublicTokenObtainPairView(TokenObtainPairView):
-    permission_classes = [AllowAny]
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAuthView(View):
+    """
+    Async base for login and registration. The serializer work, which
+    includes the password hash, runs on hashing.pool rather than on a
+    request worker or a per-request sync thread.
+    """
+    serializer_class = None
+    http_method_names = ['post', 'options']
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    async def post(self, request):
+        request = Request(request, parsers=[parser() for parser in self.parser_classes])
+        try:
+            data = request.data
+        except ParseError as e:
+            return self.render({'detail': str(e.detail)}, status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.serializer_class(data=data, context={'request': request})
+        try:
+            body, status_code = await hashing.pool.run(self.process, serializer)
+        except hashing.PoolSaturated:
+            response = self.render(
+                {'detail': 'Too many sign-ins in progress, please retry shortly.'},
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = '1'
+            return response
+        return self.render(body, status_code)
+
+    def process(self, serializer):
+        """Runs on the hashing pool; returns (body, status)."""
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        return self.perform(serializer)
+
+    def perform(self, serializer):
+        raise NotImplementedError
+
+    def render(self, data, status_code):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+class AsyncLoginView(AsyncAuthView):
     serializer_class = MyTokenObtainPairSerializer
-    authentication_classes = []
+
+    def perform(self, serializer):
+        return serializer.validated_data, status.HTTP_200_OK
+
+
+class AsyncRegisterView(AsyncAuthView):
+    serializer_class = RegisterSerializer
+
+    def perform(self, serializer):
+        serializer.save()
+        return serializer.data, status.HTTP_201_CREATED
+
+
+class HashingStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    @query_budget(1)
+    def get(self, request):
+        return Response(hashing.pool.stats())
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer that re-stamps the role claims (so a refresh
+    picks up role changes) and checks and records revocation through
+    blogc.revocation.
+    """
+    token_class = BlacklistRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.select_related('profile').filter(pk=refresh.payload.get(jwt_settings.USER_ID_CLAIM)).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        add_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            with transaction.atomic():
+                if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                    refresh.blacklist()
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
 
 
 class PublicTokenRefreshView(TokenRefreshView):
     permission_classes = [AllowAny]
     authentication_classes = []
+    serializer_class = ClaimsTokenRefreshSerializer
 
 
 # ----------------- Categories -----------------
@@ -162,6 +269,7 @@ class PublicTokenRefreshView(TokenRefreshView):
 #         if BlogCategory.objects.filter(name='Test Category').exists():
 #             return BlogCategory.objects.exclude(name='Test Category')
 #         return BlogCategory.objects.all()
+@query_budget(2)
 class CategoryListView(generics.ListCreateAPIView):
     serializer_class = BlogCategorySerializer
     permission_classes = [AllowAny]  # Start with simplest permissions
@@ -173,6 +281,7 @@ class CategoryListView(generics.ListCreateAPIView):
             print(f"Database error: {e}")
             return BlogCategory.objects.none()
     
+    @cached_response(CATEGORIES)
     def list(self, request, *args, **kwargs):
         try:
             queryset = self.get_queryset()
@@ -186,6 +295,7 @@ class CategoryListView(generics.ListCreateAPIView):
             )
 
 # Admin-only Category detail
+@query_budget(3)
 class AdminCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = BlogCategory.objects.all()
     serializer_class = BlogCategorySerializer
@@ -193,11 +303,21 @@ class AdminCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Public Category detail (read-only)
+@query_budget(4)
 class PublicCategoryDetailView(generics.RetrieveAPIView):
-    queryset = BlogCategory.objects.all()
+    queryset = BlogCategory.objects.select_related('stats')
     serializer_class = BlogCategoryDetailSerializer
     permission_classes = [AllowAny]
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['posts'] = CategoryPostsView.category_posts(self.kwargs['pk'])
+        return context
+
+    @cached_response('category:{pk}', CATEGORIES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 # List all categories (readonly)
 class BlogCategoryViewSet(ReadOnlyModelViewSet):
@@ -207,22 +327,40 @@ class BlogCategoryViewSet(ReadOnlyModelViewSet):
 
 
 # Public: list posts in a category
+@query_budget(4)
 class CategoryPostsView(generics.ListAPIView):
     serializer_class = BlogPostListSerializer
     permission_classes = [AllowAny]
+    pagination_class = PostCursorPagination
+
+    @staticmethod
+    def category_posts(category_id):
+        return BlogPost.objects.select_related('author__profile', 'category').filter(
+            category_id=category_id, published=True
+        )
 
     def get_queryset(self):
-        category_id = self.kwargs["pk"]
-        return BlogPost.objects.filter(category_id=category_id, published=True)
+        return self.category_posts(self.kwargs["pk"])
+
+    def list_queryset(self, **kwargs):
+        return self.get_queryset()
+
+    @conditional_response('list_queryset', 'category:{pk}', CATEGORIES, paginated=True)
+    def list(self, request, *args, **kwargs):
+        data = serialize_page(self.paginator, self.list_queryset(), request, self.serializer_class,
+                              self.get_serializer_context())
+        return self.get_paginated_response(data)
 
 
 # ----------------- Blog Posts -----------------
 @method_decorator(csrf_exempt, name='dispatch')
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = BlogPost.objects.select_related('author', 'category').all()
-    filter_backends = [SearchFilter, OrderingFilter]
+    queryset = BlogPost.objects.select_related('author__profile', 'category').all()
+    filter_backends = [PostSearchFilter, OrderingFilter]
+    # Only used when the database has no full-text backend (see search.py)
     search_fields = ['title', 'content', 'category__name', 'author__username']
     ordering_fields = ['created_at', 'updated_at']
+    pagination_class = PostCursorPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'latest']:
@@ -243,24 +381,30 @@ class PostViewSet(viewsets.ModelViewSet):
         return BlogPostCreateSerializer
 
     def perform_create(self, serializer):
-        title = serializer.validated_data.get('title')
-        base_slug = slugify(title)
-        slug = base_slug
-
-        # Ensure unique slug
-        counter = 1
-        while BlogPost.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-
+        # BlogPost.save() allocates the slug (see slugs.py)
         category_id = self.request.data.get('category_id')
         category = BlogCategory.objects.filter(pk=category_id).first()
         if not category:
             raise ValidationError({'category_id': 'This field is required'})
+
+        image = serializer.validated_data.get('image')
+        if image and uploads.async_uploads_enabled():
+            # Don't block the request on the storage PUT: spool the file
+            # and let blogc.uploads push it once the post is committed
+            serializer.validated_data.pop('image')
+            with transaction.atomic():
+                post = serializer.save(
+                    author_id=self.request.user.pk,
+                    category=category,
+                    image_status=BlogPost.IMAGE_PENDING,
+                    pending_image=uploads.spool(image),
+                )
+                uploads.schedule_upload(post.pk)
+            return
+
         serializer.save(
-            author=self.request.user,
+            author_id=self.request.user.pk,
             category=category,
-            slug=slug
         )
 
     def create(self, request, *args, **kwargs):
@@ -274,32 +418,77 @@ class PostViewSet(viewsets.ModelViewSet):
             print("Error creating post:", str(e))
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Querysets behind list/retrieve/latest/my-posts, shared with conditional_response and streamable
+    def list_queryset(self, **kwargs):
+        return self.filter_queryset(self.get_queryset())
+
+    def detail_queryset(self, pk, **kwargs):
+        return self.get_queryset().filter(pk=pk)
+
+    def latest_queryset(self, **kwargs):
+        return self.filter_queryset(self.get_queryset().filter(published=True))
+
+    def my_posts_queryset(self, **kwargs):
+        return self.filter_queryset(self.get_queryset().filter(author_id=self.request.user.pk))
+
+    @query_budget(4)
+    @streamable('list_queryset', BlogPostListSerializer)
+    @conditional_response('list_queryset', GLOBAL, paginated=True)
+    @cached_response(GLOBAL)
     def list(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        data = serialize_page(self.paginator, self.list_queryset(), request, BlogPostListSerializer)
+        return self.get_paginated_response(data)
 
+    @query_budget(5)
+    @conditional_response('detail_queryset', 'post:{pk}', CATEGORIES)
+    @cached_response('post:{pk}', CATEGORIES)
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = BlogPostDetailSerializer(instance, context={'request': request})
+        fieldset = requested_fields(request, BlogPostDetailSerializer)
+        instance = get_object_or_404(narrow(self.detail_queryset(kwargs['pk']), BlogPostDetailSerializer, fieldset))
+        self.check_object_permissions(request, instance)
+        serializer = BlogPostDetailSerializer(instance, context={
+            'request': request,
+            'fieldset': fieldset,
+            'comments': CommentListCreateView.post_comments(instance.pk),
+        })
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'], url_path='latest')
+    @query_budget(4)
+    @action(detail=False, methods=['get'], url_path='latest', pagination_class=LatestPostsPagination)
+    @conditional_response('latest_queryset', GLOBAL, paginated=True)
+    @cached_response(GLOBAL)
     def latest(self, request):
-        qs = BlogPost.objects.filter(published=True).order_by('-created_at')[:5]
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        data = serialize_page(self.paginator, self.latest_queryset(), request, BlogPostListSerializer)
+        return self.get_paginated_response(data)
 
+    @query_budget(3)
     @action(detail=False, methods=['get'], url_path='my-posts')
+    @streamable('my_posts_queryset', BlogPostListSerializer)
     def my_posts(self, request):
-        qs = BlogPost.objects.filter(author=request.user).order_by('-created_at')
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        data = serialize_page(self.paginator, self.my_posts_queryset(), request, BlogPostListSerializer)
+        return self.get_paginated_response(data)
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    @query_budget(1)
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class UploadStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    @query_budget(1)
+    def get(self, request):
+        return Response(uploads.upload_stats())
+
 
 class CheckUserPermissionsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
+        # Answered from the token's claims when request.user is a ClaimsUser
         user = request.user
         try:
             profile = user.profile
@@ -321,35 +510,49 @@ class CheckUserPermissionsView(APIView):
 
 # ----------------- Comments -----------------
 # ADD THIS COMBINED VIEW:
+@query_budget(2)
 @method_decorator(csrf_exempt, name='dispatch')
 class CommentListCreateView(generics.ListCreateAPIView):
     serializer_class = CommentSerializer
-    permission_classes = [IsAuthenticated]
+    # Reading is public: post detail links here for the rest of its comments
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentCursorPagination
+
+    @staticmethod
+    def post_comments(post_id):
+        return Comment.objects.select_related('user__profile').filter(
+            post_id=post_id, active=True
+        ).order_by('created_at')
 
     def get_queryset(self):
-        post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post__id=post_id, active=True).order_by('created_at')
+        return self.post_comments(self.kwargs['post_id'])
+
+    def list(self, request, *args, **kwargs):
+        data = serialize_page(self.paginator, self.get_queryset(), request, self.serializer_class,
+                              self.get_serializer_context())
+        return self.get_paginated_response(data)
 
     def perform_create(self, serializer):
         post_id = self.kwargs['post_id']
         post = get_object_or_404(BlogPost, pk=post_id)
-        serializer.save(user=self.request.user, post=post)
+        serializer.save(user_id=self.request.user.pk, post=post)
 
+@query_budget(2)
 @method_decorator(csrf_exempt, name='dispatch')
 class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('user__profile')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
 
     def perform_update(self, serializer):
         prof = getattr(self.request.user, "profile", None)
-        if self.request.user != serializer.instance.user and not (prof and prof.is_blog_admin):
+        if self.request.user.pk != serializer.instance.user_id and not (prof and prof.is_blog_admin):
             raise PermissionDenied("You do not have permission to edit this comment")
         serializer.save()
 
     def perform_destroy(self, instance):
         prof = getattr(self.request.user, "profile", None)
-        if self.request.user != instance.user and not (prof and prof.is_blog_admin):
+        if self.request.user.pk != instance.user_id and not (prof and prof.is_blog_admin):
             raise PermissionDenied("You do not have permission to delete this comment")
         instance.delete()
 
@@ -360,9 +563,10 @@ class ToggleLikeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, post_id):
-        post = get_object_or_404(BlogPost, pk=post_id)
-        like, created = Like.objects.get_or_create(post=post, user=request.user)
-        if created:
+        # One conditional write (or a buffered toggle); see likes.py
+        liked = toggle_like(post_id, request.user.pk)
+        if liked is None:
+            raise Http404('No BlogPost matches the given query.')
+        if liked:
             return Response({'message': 'liked'}, status=status.HTTP_201_CREATED)
-        like.delete()
         return Response({'message': 'unliked'}, status=status.HTTP_200_OK)
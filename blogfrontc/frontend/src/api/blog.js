@@ -7,16 +7,33 @@ import {
 } from "./config.js";
 
 // --- Posts ---
-export const getPosts = async () => {
+// Post lists (the list, latest, my-posts and a category's posts) are cursor-paginated:
+// resolves to { results, next }. Pass the previous page's `next` URL to
+// fetch the page after it. Lists leave out the full content; cards show
+// the stored excerpt.
+export const getPosts = async (next = null) => {
   try {
-    const res = await api.get(POSTS_URL);
-    return Array.isArray(res.data) ? res.data : [];
+    const res = await api.get(next || POSTS_URL);
+    if (Array.isArray(res.data)) {
+      return { results: res.data, next: null };
+    }
+    return {
+      results: Array.isArray(res.data?.results) ? res.data.results : [],
+      next: res.data?.next || null,
+    };
   } catch (error) {
     console.error("Error fetching posts:", error);
-    return [];
+    return { results: [], next: null };
   }
 };
 
+// Appends a page of posts, skipping any already shown (one created since
+// the first page loaded)
+export const appendPosts = (loaded, results) => [
+  ...loaded,
+  ...results.filter((post) => !loaded.some((p) => p.id === post.id)),
+];
+
 export const getPost = async (id) => {
   try {
     const res = await api.get(`${POSTS_URL}${id}/`);
@@ -101,20 +118,30 @@ export const toggleLike = async (postId) => {
 };
 
 // --- Comments ---
-export const getComments = async (postId) => {
+// Comments are cursor-paginated: resolves to { results, next }. Pass the
+// previous page's `next` URL to fetch the page after it.
+export const getCommentsPage = async (postId, next = null) => {
   try {
-    const res = await api.get(`${POSTS_URL}${postId}/comments/`);
-    // ✅ Handle different response structures
+    const res = await api.get(next || `${POSTS_URL}${postId}/comments/`);
     if (Array.isArray(res.data)) {
-      return res.data;
-    } else if (res.data && Array.isArray(res.data.results)) {
-      return res.data.results;
-    } else if (res.data && Array.isArray(res.data.comments)) {
-      return res.data.comments;
+      return { results: res.data, next: null };
     }
-    return [];
+    return {
+      results: Array.isArray(res.data?.results) ? res.data.results : [],
+      next: res.data?.next || null,
+    };
   } catch (error) {
     console.error(`Error fetching comments for post ${postId}:`, error);
+    throw error;
+  }
+};
+
+// First page only; use getCommentsPage to load the rest
+export const getComments = async (postId) => {
+  try {
+    const { results } = await getCommentsPage(postId);
+    return results;
+  } catch {
     return [];
   }
 };
@@ -1,13 +1,15 @@
 // AllPosts.jsx
 import { useState, useEffect, useContext } from "react";
 import { Link } from "react-router-dom";
-import { getPosts, getCategories } from "../../api/blog";
+import { getPosts, appendPosts, getCategories } from "../../api/blog";
 import BlogCard from "../../components/Blog/BlogCard";
 import { AuthContext } from "../../context/AuthContext";
 import "./AllPosts.css";
 
 const AllPosts = () => {
   const [posts, setPosts] = useState([]);
+  const [nextPostsUrl, setNextPostsUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedCategory, setSelectedCategory] = useState(null);
@@ -16,16 +18,13 @@ const AllPosts = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [postsData, categoriesData] = await Promise.all([
+        const [postsPage, categoriesData] = await Promise.all([
           getPosts(),
           getCategories(),
         ]);
-        
-        const results = Array.isArray(postsData)
-          ? postsData
-          : postsData?.results || [];
-          
-        setPosts(results);
+
+        setPosts(postsPage.results);
+        setNextPostsUrl(postsPage.next);
         setCategories(categoriesData);
       } catch (err) {
         console.error("Error fetching blog data:", err);
@@ -36,6 +35,14 @@ const AllPosts = () => {
     fetchData();
   }, []);
 
+  const loadMorePosts = async () => {
+    setIsLoadingMore(true);
+    const { results, next } = await getPosts(nextPostsUrl);
+    setPosts((loaded) => appendPosts(loaded, results));
+    setNextPostsUrl(next);
+    setIsLoadingMore(false);
+  };
+
   const filteredPosts = selectedCategory
     ? posts.filter(post => post.category === selectedCategory)
     : posts;
@@ -95,7 +102,7 @@ const AllPosts = () => {
                 <BlogCard key={post.id} post={post} />
               ))}
             </div>
-          ) : (
+          ) : nextPostsUrl ? null : (
             <div className="all-posts-empty">
               <div className="empty-state">
                 <h3>No posts found</h3>
@@ -114,6 +121,15 @@ const AllPosts = () => {
               </div>
             </div>
           )}
+          {nextPostsUrl && (
+            <button
+              className="load-more-posts-btn"
+              onClick={loadMorePosts}
+              disabled={isLoadingMore}
+            >
+              {isLoadingMore ? "Loading..." : "Load more posts"}
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -22,10 +22,11 @@ const BlogCard = ({ post, admin = false }) => {
   // Handle image URL - FIXED for Vite
   const imageUrl = getImageUrl(post.image)
 
-  // Strip HTML + create excerpt
-  const contentExcerpt = post.content
-    ? post.content.replace(/<[^>]*>/g, "").substring(0, 150) + "..."
-    : "No content available...";
+  // Lists carry a stored excerpt; a freshly created post only has its content
+  const contentExcerpt = post.excerpt
+    || (post.content
+      ? post.content.replace(/<[^>]*>/g, "").substring(0, 150) + "..."
+      : "No content available...");
 
   return (
     <div 
@@ -3,7 +3,7 @@ import { useNavigate } from "react-router-dom";
 import { format, formatDistanceToNow } from "date-fns";
 import {
   deletePost,
-  getComments,
+  getCommentsPage,
   addComment,
   updateComment,
   deleteComment,
@@ -17,8 +17,12 @@ const PostDetail = ({ post, onLike }) => {
   const { user } = useAuth();
   const navigate = useNavigate();
 
-  const [isLiked, setIsLiked] = useState(false);
+  const [isLiked, setIsLiked] = useState(Boolean(post.liked_by_me));
   const [comments, setComments] = useState([]);
+  const [nextCommentsUrl, setNextCommentsUrl] = useState(null);
+  // The server-side total; `comments` only holds the pages loaded so far
+  const [commentsCount, setCommentsCount] = useState(post.comments_count || 0);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [editingCommentId, setEditingCommentId] = useState(null);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [isLoadingComments, setIsLoadingComments] = useState(true);
@@ -27,11 +31,20 @@ const PostDetail = ({ post, onLike }) => {
     loadComments();
   }, [post.id]);
 
+  useEffect(() => {
+    setIsLiked(Boolean(post.liked_by_me));
+  }, [post.id, post.liked_by_me]);
+
+  useEffect(() => {
+    setCommentsCount(post.comments_count || 0);
+  }, [post.id, post.comments_count]);
+
   const loadComments = async () => {
     try {
       setIsLoadingComments(true);
-      const data = await getComments(post.id);
-      setComments(data);
+      const { results, next } = await getCommentsPage(post.id);
+      setComments(results);
+      setNextCommentsUrl(next);
     } catch (error) {
       console.error("Error loading comments:", error);
     } finally {
@@ -39,6 +52,23 @@ const PostDetail = ({ post, onLike }) => {
     }
   };
 
+  const loadMoreComments = async () => {
+    try {
+      setIsLoadingMore(true);
+      const { results, next } = await getCommentsPage(post.id, nextCommentsUrl);
+      // Skip any comment already shown (one added since the first page loaded)
+      setComments((loaded) => [
+        ...loaded,
+        ...results.filter((comment) => !loaded.some((c) => c.id === comment.id)),
+      ]);
+      setNextCommentsUrl(next);
+    } catch (error) {
+      console.error("Error loading more comments:", error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleLike = () => {
     onLike();
     setIsLiked(!isLiked);
@@ -59,6 +89,7 @@ const PostDetail = ({ post, onLike }) => {
     setIsSubmitting(true);
     try {
       await addComment(post.id, body);
+      setCommentsCount((count) => count + 1);
       await loadComments();
     } catch (err) {
       console.error("Failed to add comment:", err);
@@ -84,6 +115,7 @@ const PostDetail = ({ post, onLike }) => {
     if (window.confirm("Are you sure you want to delete this comment?")) {
       try {
         await deleteComment(id);
+        setCommentsCount((count) => Math.max(count - 1, 0));
         await loadComments();
       } catch (err) {
         console.error("Failed to delete comment:", err);
@@ -163,7 +195,7 @@ const PostDetail = ({ post, onLike }) => {
           
           <div className="comment-stat">
             <span className="comment-icon">💬</span>
-            <span className="comment-count">{comments.length} Comments</span>
+            <span className="comment-count">{commentsCount} Comments</span>
           </div>
         </div>
 
@@ -187,7 +219,7 @@ const PostDetail = ({ post, onLike }) => {
 
       <section className="comments-section">
         <div className="comments-header">
-          <h3>Comments ({comments.length})</h3>
+          <h3>Comments ({commentsCount})</h3>
           <button 
             className="refresh-btn"
             onClick={loadComments}
@@ -238,6 +270,16 @@ const PostDetail = ({ post, onLike }) => {
             ))
           )}
         </div>
+
+        {!isLoadingComments && nextCommentsUrl && (
+          <button
+            className="load-more-btn"
+            onClick={loadMoreComments}
+            disabled={isLoadingMore}
+          >
+            {isLoadingMore ? "Loading..." : "Load more comments"}
+          </button>
+        )}
       </section>
     </article>
   );
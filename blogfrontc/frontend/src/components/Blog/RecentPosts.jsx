@@ -20,7 +20,8 @@ const CustomNextArrow = ({ onClick }) => (
 );
 
 const RecentPosts = ({ posts }) => {
-  const getContentExcerpt = (content) => {
+  const getContentExcerpt = ({ excerpt, content }) => {
+    if (excerpt) return excerpt;
     if (!content) return "No content available...";
     return content.length > 120 ? content.substring(0, 120) + "..." : content;
   };
@@ -72,7 +73,7 @@ const RecentPosts = ({ posts }) => {
                 <h3 className="recent-post-title">
                   <Link to={`/blog/${post.id}`}>{post.title || "Untitled Post"}</Link>
                 </h3>
-                <p className="recent-post-excerpt">{getContentExcerpt(post.content)}</p>
+                <p className="recent-post-excerpt">{getContentExcerpt(post)}</p>
                 <div className="recent-post-meta">
                   {post.category?.title && (
                     <span className="recent-post-category">{post.category.title}</span>
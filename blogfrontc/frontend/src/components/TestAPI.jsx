@@ -14,7 +14,7 @@ export default function TestAPI() {
         console.log('Testing API connection...');
         
         // Test posts endpoint
-        const postsData = await getPosts();
+        const { results: postsData } = await getPosts();
         console.log('Posts data:', postsData);
         setPosts(postsData);
         
@@ -1,11 +1,13 @@
 import { useState, useEffect } from 'react';
-import { getPosts, createPost, getCategories } from '../../api/blog';
+import { getPosts, appendPosts, createPost, getCategories } from '../../api/blog';
 import BlogForm from '../../components/Blog/BlogForm';
 import BlogCard from '../../components/Blog/BlogCard';
 import './AdminDashboard.css';
 
 const AdminDashboard = () => {
   const [posts, setPosts] = useState([]);
+  const [nextPostsUrl, setNextPostsUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
   const [showForm, setShowForm] = useState(false);
   const [loading, setLoading] = useState(true);
@@ -13,11 +15,12 @@ const AdminDashboard = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [postsData, categoriesData] = await Promise.all([
+        const [postsPage, categoriesData] = await Promise.all([
           getPosts(),
           getCategories()
         ]);
-        setPosts(postsData);
+        setPosts(postsPage.results);
+        setNextPostsUrl(postsPage.next);
         setCategories(categoriesData);
       } catch (err) {
         console.error(err);
@@ -28,6 +31,14 @@ const AdminDashboard = () => {
     fetchData();
   }, []);
 
+  const loadMorePosts = async () => {
+    setIsLoadingMore(true);
+    const { results, next } = await getPosts(nextPostsUrl);
+    setPosts((loaded) => appendPosts(loaded, results));
+    setNextPostsUrl(next);
+    setIsLoadingMore(false);
+  };
+
   const handleCreatePost = async (postData) => {
     try {
       const newPost = await createPost(postData);
@@ -56,6 +67,11 @@ const AdminDashboard = () => {
             <BlogCard key={post.id} post={post} admin />
           ))}
         </div>
+        {nextPostsUrl && (
+          <button onClick={loadMorePosts} disabled={isLoadingMore} className="btn btn-secondary">
+            {isLoadingMore ? 'Loading...' : 'Load more posts'}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -1,12 +1,15 @@
 import { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
-import { getCategoryDetails } from "../../api/blog";
+import { getCategoryDetails, getPosts, appendPosts } from "../../api/blog";
 import BlogCard from "../../components/Blog/BlogCard";
 import "./CategoryDetail.css";  // ✅ bring in styles
 
 const CategoryDetail = () => {
   const { id } = useParams();
   const [category, setCategory] = useState(null);
+  const [posts, setPosts] = useState([]);
+  const [nextPostsUrl, setNextPostsUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -14,6 +17,9 @@ const CategoryDetail = () => {
       try {
         const data = await getCategoryDetails(id);
         setCategory(data);
+        // The first page of posts; posts_next continues at /categories/<id>/posts/
+        setPosts(data?.posts || []);
+        setNextPostsUrl(data?.posts_next || null);
       } catch (err) {
         console.error("Error fetching category details:", err);
       } finally {
@@ -23,6 +29,14 @@ const CategoryDetail = () => {
     fetchCategory();
   }, [id]);
 
+  const loadMorePosts = async () => {
+    setIsLoadingMore(true);
+    const { results, next } = await getPosts(nextPostsUrl);
+    setPosts((loaded) => appendPosts(loaded, results));
+    setNextPostsUrl(next);
+    setIsLoadingMore(false);
+  };
+
   if (loading) return <p className="loading-msg">Loading...</p>;
   if (!category) return <p className="error-msg">Category not found</p>;
 
@@ -40,12 +54,21 @@ const CategoryDetail = () => {
       <section className="category-posts">
         <h3 className="section-title">Posts in this Category</h3>
         <div className="posts-grid">
-          {category.posts.length > 0 ? (
-            category.posts.map((post) => <BlogCard key={post.id} post={post} />)
+          {posts.length > 0 ? (
+            posts.map((post) => <BlogCard key={post.id} post={post} />)
           ) : (
             <p className="no-posts">No posts yet in this category.</p>
           )}
         </div>
+        {nextPostsUrl && (
+          <button
+            className="load-more-btn"
+            onClick={loadMorePosts}
+            disabled={isLoadingMore}
+          >
+            {isLoadingMore ? "Loading..." : "Load more posts"}
+          </button>
+        )}
       </section>
     </div>
   );
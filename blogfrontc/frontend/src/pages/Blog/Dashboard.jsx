@@ -1,6 +1,6 @@
 import { useState, useEffect, useContext } from "react";
 import { useNavigate } from "react-router-dom";
-import { getPosts, getCategories } from "../../api/blog";
+import { getPosts, appendPosts, getCategories } from "../../api/blog";
 import Hero from "../../components/Common/Hero";
 import Categories from "../../components/Blog/Categories";
 import RecentPosts from "../../components/Blog/RecentPosts";
@@ -10,6 +10,8 @@ import "./Dashboard.css";
 
 const BlogDashboard = () => {
   const [posts, setPosts] = useState([]);
+  const [nextPostsUrl, setNextPostsUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showAll, setShowAll] = useState(false);
@@ -19,11 +21,12 @@ const BlogDashboard = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [postsData, categoriesData] = await Promise.all([
+        const [postsPage, categoriesData] = await Promise.all([
           getPosts(),
           getCategories(),
         ]);
-        setPosts(Array.isArray(postsData) ? postsData : []);
+        setPosts(postsPage.results);
+        setNextPostsUrl(postsPage.next);
         setCategories(Array.isArray(categoriesData) ? categoriesData : []);
       } catch (err) {
         console.error("Error fetching blog data:", err);
@@ -36,6 +39,14 @@ const BlogDashboard = () => {
     fetchData();
   }, []);
 
+  const loadMorePosts = async () => {
+    setIsLoadingMore(true);
+    const { results, next } = await getPosts(nextPostsUrl);
+    setPosts((loaded) => appendPosts(loaded, results));
+    setNextPostsUrl(next);
+    setIsLoadingMore(false);
+  };
+
   if (loading) {
     return (
       <div className="dashboard-loading">
@@ -117,6 +128,15 @@ const BlogDashboard = () => {
             data-aos="fade-up"
             data-aos-delay="400"
           >
+            {showAll && nextPostsUrl && (
+              <button
+                className="view-all-btn"
+                onClick={loadMorePosts}
+                disabled={isLoadingMore}
+              >
+                {isLoadingMore ? "Loading..." : "Load More Posts"}
+              </button>
+            )}
             <button
               className="view-all-btn"
               onClick={() => setShowAll(!showAll)}